@@ -0,0 +1,341 @@
+import os
+import sys
+import json
+import time
+import logging
+import shutil
+import argparse
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Los módulos se importan por nombre desde su carpeta, igual que cuando se ejecutan como script
+for _subdir in ('merge_daily', 'data_different_daily'):
+    _path = os.path.join(ROOT_DIR, _subdir)
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from csv_merger import build_directory_index, find_csv_files, read_and_standardize_csv, merge_csv_files
+from clean_data import process_colombia_cpi, clean_dataframe
+
+# Escalas predefinidas: archivos exportados, filas por archivo, copias "(N)" por patrón
+# y filas de la tabla de indicador
+SCALES = {
+    'actual': {'files': 515, 'rows': 2000, 'copies': 5, 'indicator_rows': 1000},
+    'grande': {'files': 10000, 'rows': 2000, 'copies': 5, 'indicator_rows': 100000},
+    'maxima': {'files': 100000, 'rows': 300, 'copies': 10, 'indicator_rows': 1000000}
+}
+
+# Fracción de exportaciones en español
+SPANISH_RATIO = 0.3
+
+# Archivo con los resultados de referencia por escala
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+EN_HEADER = ['Date', 'Price', 'Open', 'High', 'Low', 'Vol.', 'Change %']
+ES_HEADER = ['Fecha', 'Último', 'Apertura', 'Máximo', 'Mínimo', 'Vol.', '% var.']
+
+
+def _format_prices(values, locale):
+    """
+    Formatea precios con separador de miles como las exportaciones ("4,401.75" / "4.401,75").
+    """
+    text = pd.Series(values).map('{:,.2f}'.format)
+    if locale == 'es':
+        text = text.str.replace(',', '_', regex=False).str.replace('.', ',', regex=False).str.replace('_', '.', regex=False)
+    return text
+
+
+def _export_frame(rng, start, rows, locale):
+    """
+    Genera una exportación sintética de `rows` días hábiles desde `start`.
+    """
+    dates = pd.bdate_range(start, periods=rows)
+    close = 1000 + np.cumsum(rng.normal(0, 10, rows))
+    spread = np.abs(rng.normal(0, 5, rows))
+    volume = rng.integers(1, 999, rows)
+    suffix = rng.choice(['K', 'M', 'B'], rows)
+    change = rng.normal(0, 1, rows)
+
+    if locale == 'es':
+        date_text = dates.strftime('%d.%m.%Y')
+        volume_text = [f"{v / 10:.2f}".replace('.', ',') + s for v, s in zip(volume, suffix)]
+        change_text = pd.Series(change).map('{:.2f}%'.format).str.replace('.', ',', regex=False)
+    else:
+        date_text = dates.strftime('%m/%d/%Y')
+        volume_text = [f"{v / 10:.2f}{s}" for v, s in zip(volume, suffix)]
+        change_text = pd.Series(change).map('{:.2f}%'.format)
+
+    header = ES_HEADER if locale == 'es' else EN_HEADER
+    frame = pd.DataFrame({
+        header[0]: date_text,
+        header[1]: _format_prices(close, locale),
+        header[2]: _format_prices(close + rng.normal(0, 2, rows), locale),
+        header[3]: _format_prices(close + spread, locale),
+        header[4]: _format_prices(close - spread, locale),
+        header[5]: volume_text,
+        header[6]: change_text
+    })
+    # Las exportaciones vienen de la más reciente a la más antigua
+    return frame.iloc[::-1]
+
+
+def generate_exports(directory, files, rows, copies, seed=0):
+    """
+    Genera exportaciones sintéticas "<patrón> (N).csv" con copias que se solapan en fechas.
+
+    Cada patrón tiene hasta `copies` archivos; cada copia empieza un tramo más
+    adelante que la anterior y se solapa con ella en la mitad de sus filas.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    patterns = max(1, files // copies)
+
+    written = 0
+    for p in range(patterns):
+        locale = 'es' if rng.random() < SPANISH_RATIO else 'en'
+        base = f"Synthetic {p:06d} Historical Data"
+        for copy in range(copies):
+            if written >= files:
+                return written
+            start = pd.Timestamp('1990-01-01') + pd.offsets.BDay(copy * rows // 2)
+            name = f"{base}.csv" if copy == 0 else f"{base} ({copy}).csv"
+            _export_frame(rng, start, rows, locale).to_csv(os.path.join(directory, name), index=False)
+            written += 1
+    return written
+
+
+def generate_indicator(path, rows, seed=0):
+    """
+    Genera una tabla de indicador como las de data_different_daily/output.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('1900-01-01', periods=rows, freq='D')[::-1]
+    months = dates - pd.DateOffset(months=1)
+
+    def percent(values, blank_ratio):
+        text = pd.Series(values).map('{:.2f}%'.format)
+        return text.where(rng.random(rows) >= blank_ratio, ' ')
+
+    pd.DataFrame({
+        'Release Date': dates.strftime('%b %d, %Y') + ' (' + months.strftime('%b') + ')',
+        'Time': '11:00',
+        'Actual': percent(rng.normal(0, 1, rows), 0.01),
+        'Forecast': percent(rng.normal(0, 1, rows), 0.2),
+        'Previous': percent(rng.normal(0, 1, rows), 0.01)
+    }).to_csv(path, index=False)
+
+
+def prepare_data(work_dir, scale, seed=0):
+    """
+    Genera los datos de la escala en work_dir o reutiliza los generados antes con los mismos parámetros.
+
+    Returns:
+        tuple: (directorio de exportaciones, archivo de indicador)
+    """
+    marker = os.path.join(work_dir, 'dataset.json')
+    data_dir = os.path.join(work_dir, 'data')
+    indicator = os.path.join(work_dir, 'indicator.csv')
+    params = dict(scale, seed=seed)
+
+    if os.path.exists(marker):
+        with open(marker, 'r', encoding='utf-8') as f:
+            if json.load(f) == params:
+                return data_dir, indicator
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Generando {scale['files']} exportaciones de {scale['rows']} filas en {data_dir}...")
+    start = time.perf_counter()
+    generate_exports(data_dir, scale['files'], scale['rows'], scale['copies'], seed)
+    generate_indicator(indicator, scale['indicator_rows'], seed)
+    print(f"Datos generados en {time.perf_counter() - start:.1f} s")
+
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(params, f)
+    return data_dir, indicator
+
+
+def measure(func, repeat=1, memory=True):
+    """
+    Mide el mejor tiempo de `repeat` ejecuciones y el pico de memoria de una ejecución aparte.
+
+    Returns:
+        dict: {'seconds', 'peak_mb'}
+    """
+    best = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    result = {'seconds': round(best, 4)}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(data_dir, indicator, work_dir, repeat=1, memory=True, read_sample=200):
+    """
+    Ejecuta los benchmarks sobre los datos generados.
+
+    Returns:
+        dict: Resultado de cada benchmark
+    """
+    output_dir = os.path.join(work_dir, 'output')
+    index = build_directory_index(data_dir)
+    patterns = sorted(index)
+    files = [path for files in index.values() for _, path in files]
+    sample = files[::max(1, len(files) // read_sample)][:read_sample]
+
+    def find_all():
+        index = build_directory_index(data_dir)
+        for pattern in patterns:
+            find_csv_files(data_dir, pattern, index)
+
+    def read_sample_files():
+        for path in sample:
+            try:
+                read_and_standardize_csv(path)
+            except Exception:
+                pass
+
+    def merge_all():
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir)
+        for pattern in patterns:
+            merge_csv_files(data_dir, output_dir, pattern, index=index)
+
+    def clean_indicator():
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            process_colombia_cpi(indicator, os.path.join(work_dir, 'indicator_clean.csv'))
+
+    def clean_frame():
+        clean_dataframe(indicator_df)
+
+    indicator_df = pd.read_csv(indicator, dtype=str, keep_default_na=False)
+    benchmarks = [
+        ('find_csv_files', find_all),
+        ('read_and_standardize_csv', read_sample_files),
+        ('merge_csv_files', merge_all),
+        ('process_colombia_cpi', clean_indicator),
+        ('clean_dataframe', clean_frame)
+    ]
+
+    # Los archivos que no se pueden leer se informan aparte: su tiempo no es comparable
+    failed = 0
+    for path in sample:
+        try:
+            read_and_standardize_csv(path)
+        except Exception:
+            failed += 1
+    if failed:
+        print(f"Advertencia: {failed}/{len(sample)} archivos de la muestra no se pudieron leer")
+
+    results = {}
+    for name, func in benchmarks:
+        print(f"- {name}...", end=' ', flush=True)
+        results[name] = measure(func, repeat, memory)
+        results[name]['items'] = {
+            'find_csv_files': len(patterns),
+            'read_and_standardize_csv': len(sample),
+            'merge_csv_files': len(patterns),
+            'process_colombia_cpi': len(indicator_df),
+            'clean_dataframe': len(indicator_df)
+        }[name]
+        print(f"{results[name]['seconds']:.3f} s" + (f", pico {results[name]['peak_mb']:.1f} MB" if memory else ''))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compara los resultados con la referencia y devuelve los benchmarks que empeoraron.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<26}{'base s':>10}{'actual s':>10}{'ratio':>8}{'base MB':>10}{'actual MB':>11}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            print(f"{name:<26}{'-':>10}{result['seconds']:>10.3f}")
+            continue
+        ratio = result['seconds'] / reference['seconds'] if reference['seconds'] else float('inf')
+        peak = result.get('peak_mb')
+        base_peak = reference.get('peak_mb')
+        print(f"{name:<26}{reference['seconds']:>10.3f}{result['seconds']:>10.3f}{ratio:>8.2f}"
+              f"{base_peak if base_peak is not None else '-':>10}{peak if peak is not None else '-':>11}")
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+        elif peak is not None and base_peak and peak / base_peak > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de csv_merger y clean_data con exportaciones sintéticas")
+    parser.add_argument('--escala', choices=sorted(SCALES), default='actual', help="Escala predefinida")
+    parser.add_argument('--archivos', type=int, help="Cantidad de exportaciones (reemplaza la escala)")
+    parser.add_argument('--filas', type=int, help="Filas por exportación")
+    parser.add_argument('--copias', type=int, help="Copias (N) por patrón")
+    parser.add_argument('--filas-indicador', type=int, help="Filas de la tabla de indicador")
+    parser.add_argument('--dir', default=os.path.join(ROOT_DIR, 'benchmarks', '.data'),
+                        help="Directorio de trabajo; los datos se reutilizan entre ejecuciones")
+    parser.add_argument('--repeticiones', type=int, default=1, help="Ejecuciones por benchmark (se toma la mejor)")
+    parser.add_argument('--muestra', type=int, default=200, help="Archivos leídos en read_and_standardize_csv")
+    parser.add_argument('--sin-memoria', action='store_true', help="No medir el pico de memoria")
+    parser.add_argument('--verbose', action='store_true', help="Mostrar los mensajes de log de los módulos medidos")
+    parser.add_argument('--guardar-base', action='store_true', help="Guardar los resultados como referencia")
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help="Empeoramiento máximo aceptado respecto a la referencia (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Los errores y conflictos se registran con logging; en cada repetición solo agregan ruido
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    scale = dict(SCALES[args.escala])
+    for key, value in (('files', args.archivos), ('rows', args.filas), ('copies', args.copias),
+                       ('indicator_rows', args.filas_indicador)):
+        if value is not None:
+            scale[key] = value
+    scale_key = f"{scale['files']}x{scale['rows']}x{scale['copies']}+{scale['indicator_rows']}"
+
+    work_dir = os.path.join(args.dir, scale_key)
+    data_dir, indicator = prepare_data(work_dir, scale)
+
+    print(f"\nEscala {scale_key}")
+    results = run_benchmarks(data_dir, indicator, work_dir, args.repeticiones, not args.sin_memoria, args.muestra)
+
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    if args.guardar_base:
+        baselines[scale_key] = results
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nReferencia guardada en {BASELINE_FILE}")
+        return 0
+
+    if scale_key not in baselines:
+        print("\nNo hay referencia para esta escala; use --guardar-base para crearla")
+        return 0
+
+    regressions = compare(results, baselines[scale_key], args.tolerancia)
+    if regressions:
+        print(f"\nEmpeoraron más de {args.tolerancia:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\nSin regresiones respecto a la referencia")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
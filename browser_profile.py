@@ -0,0 +1,58 @@
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Imágenes y fuentes: no hacen falta para leer tablas ni para hacer clic en los botones
+BLOCKED_RESOURCES = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"
+]
+
+# Hosts de publicidad y analítica de terceros que cargan las páginas de investing.com
+BLOCKED_HOSTS = [
+    "*doubleclick.net*", "*googlesyndication.com*", "*googletagservices.com*", "*googletagmanager.com*",
+    "*google-analytics.com*", "*adservice.google.*", "*amazon-adsystem.com*", "*adnxs.com*",
+    "*criteo.com*", "*criteo.net*", "*taboola.com*", "*outbrain.com*", "*pubmatic.com*", "*rubiconproject.com*",
+    "*casalemedia.com*", "*openx.net*", "*scorecardresearch.com*", "*quantserve.com*", "*hotjar.com*",
+    "*facebook.net*", "*connect.facebook.*", "*twitter.com/i/*", "*bing.com/bat*", "*clarity.ms*"
+]
+
+# Tamaño de ventana en headless: los selectores dependen del diseño de escritorio
+WINDOW_SIZE = "1920,1080"
+
+def configurar_opciones_livianas(chrome_options):
+    """
+    Ajusta las opciones de Chrome para navegar sin ventana y sin esperar recursos secundarios.
+
+    Con la estrategia 'eager' driver.get vuelve al terminar de cargar el DOM,
+    sin esperar imágenes, iframes de publicidad ni scripts asíncronos; las
+    funciones que usan el driver esperan después los elementos que necesitan.
+    """
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument(f"--window-size={WINDOW_SIZE}")
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.page_load_strategy = 'eager'
+    return chrome_options
+
+def bloquear_recursos(driver, patrones=None):
+    """
+    Bloquea por CDP las solicitudes a imágenes, fuentes y hosts de publicidad y analítica.
+
+    Args:
+        driver: Driver de Chrome ya iniciado
+        patrones (list): Patrones de URL a bloquear; por defecto BLOCKED_RESOURCES + BLOCKED_HOSTS
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patrones or BLOCKED_RESOURCES + BLOCKED_HOSTS})
+
+def permitir_descargas(driver, download_dir):
+    """
+    Habilita las descargas en download_dir; Chrome sin ventana las bloquea si no se configura por CDP.
+    """
+    driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+
+def esperar_documento(driver, timeout=15):
+    """
+    Espera a que el DOM de la página actual esté cargado (readyState 'interactive' o 'complete').
+    """
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") in ("interactive", "complete")
+    )
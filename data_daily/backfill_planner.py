@@ -0,0 +1,223 @@
+import os
+import json
+import threading
+from datetime import date, datetime, timedelta
+import pandas as pd
+
+# Las exportaciones de investing.com traen como máximo ~5000 filas (las más antiguas del rango)
+FILAS_MAXIMAS_EXPORTACION = 4999
+
+
+def leer_cobertura(ruta_archivo):
+    """
+    Lee un CSV descargado y devuelve (filas, fecha mínima, fecha máxima).
+
+    Acepta exportaciones en inglés (Date, MM/DD/YYYY) y en español (Fecha, DD.MM.YYYY).
+    Las fechas se devuelven como texto YYYY-MM-DD o None si el archivo no tiene filas.
+    """
+    df = pd.read_csv(ruta_archivo, encoding='utf-8-sig')
+    if df.empty:
+        return 0, None, None
+
+    columna = 'Fecha' if 'Fecha' in df.columns else df.columns[0]
+    fechas = pd.to_datetime(df[columna], format='%d.%m.%Y' if columna == 'Fecha' else '%m/%d/%Y', errors='coerce')
+    if fechas.isna().all():
+        fechas = pd.to_datetime(df[columna], errors='coerce')
+    fechas = fechas.dropna()
+
+    if fechas.empty:
+        return len(df), None, None
+    return len(df), fechas.min().strftime('%Y-%m-%d'), fechas.max().strftime('%Y-%m-%d')
+
+
+class BackfillPlanner:
+    """
+    Decide qué ventanas de fechas descargar para cada endpoint.
+
+    Guarda en un JSON, por endpoint y ventana, el archivo descargado, su estado
+    ('ok', 'empty' o 'error') y la cobertura de fechas. Con eso:
+
+    - Las ventanas cerradas (que terminan antes del año actual) ya descargadas no
+      se vuelven a pedir: su contenido no cambia.
+    - Si una descarga llega al límite de filas de la exportación sin cubrir el
+      final de la ventana, la ventana queda 'truncated' y se pide el resto desde
+      el día siguiente a su última fecha, como un archivo aparte, hasta cubrirla.
+    - Se detecta el año en que empieza la historia de cada instrumento y se
+      omiten las ventanas anteriores.
+    - Mientras el inicio es desconocido, las ventanas se piden de la más reciente
+      a la más antigua, una por ronda, hasta encontrar una vacía.
+    - En modo 'diario' solo se pide la ventana abierta que contiene hoy.
+
+    Es seguro entre hilos: varios endpoints pueden planificarse y registrarse
+    en paralelo sobre el mismo estado.
+    """
+
+    def __init__(self, ruta_estado, tiempo=10, anio_inicial=1800, hoy=None):
+        self.ruta_estado = ruta_estado
+        self.tiempo = tiempo
+        self.anio_inicial = anio_inicial
+        self.hoy = hoy or date.today()
+        self._ejecutadas = set()
+        self._lock = threading.RLock()
+        self.estado = {}
+
+        if os.path.exists(ruta_estado):
+            with open(ruta_estado, 'r', encoding='utf-8') as f:
+                self.estado = json.load(f)
+
+    def ventanas(self):
+        """
+        Devuelve las ventanas (inicio, fin) de la más reciente a la más antigua.
+        """
+        inicios = range(self.anio_inicial, self.hoy.year + 1, self.tiempo)
+        return [(inicio, min(inicio + self.tiempo - 1, self.hoy.year)) for inicio in reversed(inicios)]
+
+    def _endpoint(self, clave):
+        return self.estado.setdefault(clave, {'history_start': None, 'windows': {}})
+
+    def _descargada(self, ventana):
+        return ventana.get('status') in ('ok', 'truncated') and ventana.get('file') and os.path.exists(ventana['file'])
+
+    def _fin_ventana(self, fin):
+        """
+        Última fecha que debería cubrir una ventana: el 31 de diciembre o hoy si está abierta.
+        """
+        return min(date(fin, 12, 31), self.hoy).isoformat()
+
+    def planificar(self, claves, modo='backfill'):
+        """
+        Devuelve las ventanas a descargar en esta ronda como tuplas (clave, inicio, fin, desde).
+
+        `desde` es None para descargar la ventana desde el 1 de enero de `inicio`,
+        o una fecha YYYY-MM-DD para pedir el resto de una ventana truncada. Cada
+        ventana (y cada resto) se planifica como máximo una vez por ejecución;
+        cuando la lista vuelve vacía no queda nada por descargar.
+        """
+        with self._lock:
+            return self._planificar(claves, modo)
+
+    def _planificar(self, claves, modo):
+        plan = []
+        for clave in claves:
+            endpoint = self._endpoint(clave)
+            inicio_historia = endpoint['history_start']
+
+            for inicio, fin in self.ventanas():
+                abierta = fin >= self.hoy.year
+                if modo == 'diario' and not abierta:
+                    continue
+
+                ventana = endpoint['windows'].get(str(inicio), {})
+                if inicio_historia is not None and fin < inicio_historia:
+                    continue
+                if (clave, inicio) in self._ejecutadas or (
+                        not abierta and (self._descargada(ventana) or ventana.get('status') == 'empty')):
+                    # Ventana ya descargada: solo falta el resto si quedó truncada
+                    desde = ventana.get('next_start') if ventana.get('status') == 'truncated' else None
+                    if desde and (clave, inicio, desde) not in self._ejecutadas:
+                        plan.append((clave, inicio, fin, desde))
+                        self._ejecutadas.add((clave, inicio, desde))
+                    continue
+
+                plan.append((clave, inicio, fin, None))
+                self._ejecutadas.add((clave, inicio))
+
+                # Sin inicio conocido se sondea hacia atrás de una ventana a la vez
+                if inicio_historia is None and modo != 'diario':
+                    break
+
+        return plan
+
+    def registrar(self, clave, inicio, ruta_archivo, desde=None):
+        """
+        Registra el resultado de una descarga y actualiza el inicio de la historia.
+
+        Args:
+            clave (str): Identificador del endpoint
+            inicio (int): Año inicial de la ventana
+            ruta_archivo (str): Archivo descargado o None si la descarga falló
+            desde (str): Fecha YYYY-MM-DD si la descarga era el resto de una ventana truncada
+        """
+        with self._lock:
+            if desde is None:
+                self._registrar(clave, inicio, ruta_archivo)
+            else:
+                self._registrar_resto(clave, inicio, ruta_archivo, desde)
+
+    def _cobertura(self, ruta_archivo):
+        try:
+            return leer_cobertura(ruta_archivo)
+        except Exception:
+            return 0, None, None
+
+    def _truncada(self, filas, fecha_max, fin):
+        """
+        True si la descarga llegó al límite de filas sin cubrir el final de la ventana.
+        """
+        return filas >= FILAS_MAXIMAS_EXPORTACION and fecha_max is not None and fecha_max < self._fin_ventana(fin)
+
+    def _marcar_truncada(self, ventana, fecha_max):
+        ventana['status'] = 'truncated'
+        siguiente = datetime.strptime(fecha_max, '%Y-%m-%d').date() + timedelta(days=1)
+        ventana['next_start'] = siguiente.isoformat()
+
+    def _registrar(self, clave, inicio, ruta_archivo):
+        endpoint = self._endpoint(clave)
+        fin = min(inicio + self.tiempo - 1, self.hoy.year)
+        ventana = {'file': ruta_archivo, 'updated': datetime.now().isoformat(timespec='seconds')}
+
+        if not ruta_archivo:
+            ventana['status'] = 'error'
+        else:
+            filas, fecha_min, fecha_max = self._cobertura(ruta_archivo)
+            ventana.update({'rows': filas, 'date_min': fecha_min, 'date_max': fecha_max})
+
+            anio_min = int(fecha_min[:4]) if fecha_min else None
+            if filas == 0 or anio_min is None or anio_min > fin:
+                # Nada dentro de la ventana: la historia empieza después
+                ventana['status'] = 'empty'
+                inicio_historia = anio_min if anio_min is not None else fin + 1
+            elif self._truncada(filas, fecha_max, fin):
+                # La exportación conserva las filas más antiguas: date_min sigue siendo el inicio real
+                self._marcar_truncada(ventana, fecha_max)
+                inicio_historia = anio_min if anio_min > inicio else None
+            else:
+                ventana['status'] = 'ok'
+                # Con el límite de filas alcanzado el recorte pudo ser al inicio: no se deduce la historia
+                recortada = filas >= FILAS_MAXIMAS_EXPORTACION
+                inicio_historia = anio_min if anio_min > inicio and not recortada else None
+
+            if inicio_historia is not None:
+                actual = endpoint['history_start']
+                endpoint['history_start'] = inicio_historia if actual is None else max(actual, inicio_historia)
+
+        endpoint['windows'][str(inicio)] = ventana
+
+    def _registrar_resto(self, clave, inicio, ruta_archivo, desde):
+        ventana = self._endpoint(clave)['windows'].setdefault(str(inicio), {})
+        fin = min(inicio + self.tiempo - 1, self.hoy.year)
+        parte = {'file': ruta_archivo, 'updated': datetime.now().isoformat(timespec='seconds')}
+        ventana.setdefault('parts', {})[desde] = parte
+
+        if not ruta_archivo:
+            # Se vuelve a intentar el mismo resto en la próxima ejecución
+            parte['status'] = 'error'
+            return
+
+        filas, fecha_min, fecha_max = self._cobertura(ruta_archivo)
+        parte.update({'rows': filas, 'date_min': fecha_min, 'date_max': fecha_max})
+        if filas and fecha_min and fecha_min <= self._fin_ventana(fin) and self._truncada(filas, fecha_max, fin):
+            parte['status'] = 'truncated'
+            self._marcar_truncada(ventana, fecha_max)
+        else:
+            parte['status'] = 'ok' if filas else 'empty'
+            ventana['status'] = 'ok'
+            ventana.pop('next_start', None)
+
+    def guardar(self):
+        os.makedirs(os.path.dirname(self.ruta_estado) or '.', exist_ok=True)
+        with self._lock:
+            tmp = f"{self.ruta_estado}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.estado, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp, self.ruta_estado)
@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -10,9 +11,37 @@ from selenium.common.exceptions import TimeoutException, ElementClickIntercepted
 from shutil import move
 import pandas as pd
 from datetime import datetime, timedelta
+from functools import partial
+from download_scheduler import DownloadScheduler
+from backfill_planner import BackfillPlanner
+from download_watcher import DownloadWatcher
 
+# metrics.py es compartido por todas las etapas y está en la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+from browser_profile import configurar_opciones_livianas, bloquear_recursos, permitir_descargas, esperar_documento
 
-def configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_dir):
+# Selector del botón que abre el selector de fechas del histórico
+DATE_PICKER_SELECTOR = "div.flex.flex-1.items-center.gap-3\\.5.rounded.border.border-solid.border-\\[\\#CFD4DA\\].bg-white.px-3\\.5.py-2.shadow-select"
+
+# Campos de fecha del selector: el primero es la fecha inicial
+DATE_INPUT_SELECTOR = "input[type='date'][max]"
+
+# Botón que aplica las fechas, en inglés o en español
+APPLY_BUTTON_XPATH = "//span[text()='Apply' or text()='Aceptar']/ancestor::div[contains(@class, 'cursor-pointer')]"
+
+# Botón de descarga, en español o en inglés
+DOWNLOAD_BUTTON_XPATH = "//span[text()='Descargar' or text()='Download']"
+
+
+def configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_dir, liviano=True):
+    """
+    Inicia Chrome con el perfil indicado y las descargas dirigidas a download_dir.
+
+    Con liviano=True el navegador corre sin ventana, con la estrategia de carga
+    'eager' y sin descargar imágenes, fuentes ni publicidad y analítica de
+    terceros (ver browser_profile.py).
+    """
     chrome_options = webdriver.ChromeOptions()
     prefs = {
         "download.default_directory": download_dir,
@@ -25,8 +54,15 @@ def configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_d
     chrome_options.add_argument(f"--profile-directory={profile_dir}")
     chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
 
+    if liviano:
+        configurar_opciones_livianas(chrome_options)
+
     service = Service(executable_path=chrome_driver_path)
-    return webdriver.Chrome(service=service, options=chrome_options)
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    if liviano:
+        bloquear_recursos(driver)
+        permitir_descargas(driver, download_dir)
+    return driver
 
 
 def manejar_selector_fechas(driver, fecha_inicial, fecha_final, max_intentos=3):
@@ -34,41 +70,30 @@ def manejar_selector_fechas(driver, fecha_inicial, fecha_final, max_intentos=3):
         try:
             # Paso 1: Hacer clic en el selector de fechas
             selector_fechas = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "div.flex.flex-1.items-center.gap-3\\.5.rounded.border.border-solid.border-\\[\\#CFD4DA\\].bg-white.px-3\\.5.py-2.shadow-select"))
+                EC.element_to_be_clickable((By.CSS_SELECTOR, DATE_PICKER_SELECTOR))
             )
             selector_fechas.click()
-            time.sleep(1)
 
-            # Paso 2: Editar las fechas
-            fecha_inicio_input = driver.find_element(By.CSS_SELECTOR, "input[type='date'][max]")
-            fecha_fin_input = driver.find_elements(By.CSS_SELECTOR, "input[type='date'][max]")[1]
+            # Paso 2: Editar las fechas, en cuanto el selector muestra los dos campos
+            WebDriverWait(driver, 10).until(lambda d: len(d.find_elements(By.CSS_SELECTOR, DATE_INPUT_SELECTOR)) >= 2)
+            fecha_inicio_input, fecha_fin_input = driver.find_elements(By.CSS_SELECTOR, DATE_INPUT_SELECTOR)[:2]
+            WebDriverWait(driver, 5).until(EC.element_to_be_clickable(fecha_inicio_input))
 
             fecha_inicio_input.clear()
             fecha_inicio_input.send_keys(fecha_inicial)
             # fecha_fin_input.clear()
             # fecha_fin_input.send_keys(fecha_final)
 
-            # Paso 3: Intentar hacer clic en el botón "Apply" o "Aceptar"
-            botones = [
-                ("Apply", "//span[text()='Apply']/ancestor::div[contains(@class, 'cursor-pointer')]"),
-                ("Aceptar", "//span[text()='Aceptar']/ancestor::div[contains(@class, 'cursor-pointer')]")
-            ]
-
-            for texto_boton, xpath_boton in botones:
-                try:
-                    boton = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((By.XPATH, xpath_boton))
-                    )
-                    boton.click()
-                    print(f"Se hizo clic en el botón '{texto_boton}'")
-                    break
-                except TimeoutException:
-                    print(f"No se encontró el botón '{texto_boton}', intentando el siguiente...")
-            else:
+            # Paso 3: Hacer clic en "Apply" o "Aceptar", esperando a cualquiera de los dos a la vez
+            try:
+                boton = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, APPLY_BUTTON_XPATH)))
+            except TimeoutException:
                 raise Exception("No se encontró ningún botón válido (Apply o Aceptar)")
+            boton.click()
+            print(f"Se hizo clic en el botón '{boton.text.strip()}'")
 
-            # Paso 4: Esperar a que se actualice la página
-            time.sleep(2)
+            # Paso 4: Esperar a que se cierre el selector con las fechas aplicadas
+            WebDriverWait(driver, 10).until(EC.invisibility_of_element(fecha_inicio_input))
 
             return
         except Exception as e:
@@ -78,43 +103,52 @@ def manejar_selector_fechas(driver, fecha_inicial, fecha_final, max_intentos=3):
 
 
 def cerrar_popups(driver):
+    """
+    Cierra los popups visibles en este momento, sin esperar a que aparezcan.
+
+    Se hace una sola búsqueda con la unión de los XPath: si no hay popups no se
+    pierde tiempo. Un popup que aparezca después lo resuelven los reintentos y
+    el clic por JavaScript de manejar_selector_fechas y descargar_archivo.
+    """
     popups = [
         "//button[contains(@id, 'cookiebanner') and contains(@title, 'Accept')]",
         "//button[contains(@class, 'close') or contains(@class, 'closeBtn')]",
         "//div[contains(@class, 'popupCloseIcon')]"
     ]
 
-    for popup in popups:
+    for elemento in driver.find_elements(By.XPATH, " | ".join(popups)):
         try:
-            WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, popup))).click()
-            print(f"Cerrado popup: {popup}")
-        except:
+            if elemento.is_displayed():
+                elemento.click()
+                print(f"Cerrado popup: {elemento.tag_name}.{elemento.get_attribute('class')}")
+        except Exception:
             pass
 
 
 def descargar_archivo(driver, max_intentos=3):
-    botones = [
-        ("Descargar", "//span[text()='Descargar']"),
-        ("Download", "//span[text()='Download']")
-    ]
+    """
+    Hace clic en el botón de descarga ("Descargar" o "Download").
 
+    Se espera a los dos textos con un solo XPath, así la página en inglés no
+    espera primero a que venza el tiempo del botón en español.
+    """
     for intento in range(max_intentos):
-        for texto_boton, xpath_boton in botones:
+        try:
+            descargar_boton = WebDriverWait(driver, 15).until(
+                EC.element_to_be_clickable((By.XPATH, DOWNLOAD_BUTTON_XPATH))
+            )
+            texto_boton = descargar_boton.text.strip()
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", descargar_boton)
             try:
-                descargar_boton = WebDriverWait(driver, 15).until(
-                    EC.element_to_be_clickable((By.XPATH, xpath_boton))
-                )
-                driver.execute_script("arguments[0].scrollIntoView();", descargar_boton)
-                time.sleep(1)
-                descargar_boton.click()
-                print(f"Se hizo clic en el botón '{texto_boton}'")
-                return  # Si el clic fue exitoso, salimos de la función
+                WebDriverWait(driver, 5).until(EC.element_to_be_clickable(descargar_boton)).click()
             except ElementClickInterceptedException:
                 print(f"El botón '{texto_boton}' está interceptado. Intentando hacer clic con JavaScript...")
                 driver.execute_script("arguments[0].click();", descargar_boton)
                 return  # Si el clic fue exitoso, salimos de la función
-            except TimeoutException:
-                print(f"No se encontró el botón '{texto_boton}', intentando el siguiente...")
+            print(f"Se hizo clic en el botón '{texto_boton}'")
+            return  # Si el clic fue exitoso, salimos de la función
+        except TimeoutException:
+            print("No se encontró el botón 'Descargar' ni 'Download'")
 
         print(f"Intento {intento + 1} fallido. Reintentando...")
         time.sleep(2)
@@ -122,42 +156,69 @@ def descargar_archivo(driver, max_intentos=3):
     raise Exception("No se pudo hacer clic en el botón de descarga después de varios intentos")
 
 
-def esperar_descarga(download_dir, tiempo_espera=40):
-    tiempo_inicio = time.time()
-    while time.time() - tiempo_inicio < tiempo_espera:
-        archivos = os.listdir(download_dir)
-        if archivos and not any(f.endswith('.crdownload') for f in archivos):
-            return max(archivos, key=lambda x: os.path.getctime(os.path.join(download_dir, x)))
-        time.sleep(1)
-    raise TimeoutException("La descarga no se completó en el tiempo esperado.")
-
+def esperar_descarga(download_dir, tiempo_espera=40, watcher=None):
+    """
+    Espera a que termine una descarga y devuelve el nombre del archivo.
 
-def descargar_archivo_con_fechas_con_perfil(url, fecha_inicial, fecha_final, download_id, download_dir, chrome_driver_path, user_data_dir, profile_dir):
-    driver = configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_dir)
+    `watcher` debe crearse antes de hacer clic en descargar para ignorar los
+    archivos que ya estaban en el directorio; sin él, cualquier CSV completo del
+    directorio cuenta como la descarga.
+    """
+    if watcher is None:
+        watcher = DownloadWatcher(download_dir, existentes=set())
     try:
-        print(f"Intentando acceder a la URL: {url}")
+        with watcher:
+            return watcher.esperar(tiempo_espera)
+    except TimeoutError as e:
+        raise TimeoutException(str(e))
+
+
+def descargar_con_driver(driver, url, fecha_inicial, fecha_final, download_dir):
+    """
+    Descarga el histórico de una URL usando un navegador ya iniciado.
+
+    Returns:
+        str: Ruta del archivo descargado dentro de download_dir
+    """
+    print(f"Intentando acceder a la URL: {url}")
+    with metrics.timer('page_load', url):
         driver.get(url)
-        time.sleep(7)  # Reducido el tiempo de espera para que cargue completamente
-        print(f"URL actual: {driver.current_url}")
+    with metrics.timer('page_ready', url):
+        # Con la carga 'eager' driver.get puede volver antes; los pasos siguientes esperan sus elementos
+        esperar_documento(driver)
+    print(f"URL actual: {driver.current_url}")
 
-        if driver.current_url != url:
-            print(f"Advertencia: no se ha cargado la URL correcta. Se ha cargado: {driver.current_url}")
-        else:
-            print("La URL se ha cargado correctamente.")
+    if driver.current_url != url:
+        print(f"Advertencia: no se ha cargado la URL correcta. Se ha cargado: {driver.current_url}")
+    else:
+        print("La URL se ha cargado correctamente.")
 
+    with metrics.timer('popups', url):
         cerrar_popups(driver)
 
-        print("Manejando el selector de fechas...")
+    print("Manejando el selector de fechas...")
+    with metrics.timer('date_picker', url):
         manejar_selector_fechas(driver, fecha_inicial, fecha_final)
-        print("Fechas modificadas exitosamente.")
+    print("Fechas modificadas exitosamente.")
 
-        print("Buscando y haciendo clic en el botón de descarga...")
-        descargar_archivo(driver)
+    print("Buscando y haciendo clic en el botón de descarga...")
+    with DownloadWatcher(download_dir) as watcher:
+        with metrics.timer('download_click', url):
+            descargar_archivo(driver)
         print("Esperando a que el archivo se descargue...")
-        archivo_descargado = esperar_descarga(download_dir)
+        with metrics.timer('download_wait', url) as medicion:
+            archivo_descargado = esperar_descarga(download_dir, watcher=watcher)
+            medicion['bytes'] = metrics.file_size(os.path.join(download_dir, archivo_descargado))
+    return os.path.join(download_dir, archivo_descargado)
+
+
+def descargar_archivo_con_fechas_con_perfil(url, fecha_inicial, fecha_final, download_id, download_dir, chrome_driver_path, user_data_dir, profile_dir, liviano=True):
+    driver = configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_dir, liviano)
+    try:
+        archivo_descargado = descargar_con_driver(driver, url, fecha_inicial, fecha_final, download_dir)
         nuevo_nombre = f"{download_id}.csv"  # Asumimos que el archivo descargado es un CSV
         print(f"Nuevo nombre con id: {nuevo_nombre}")
-        move(os.path.join(download_dir, archivo_descargado), os.path.join(download_dir, nuevo_nombre))
+        move(archivo_descargado, os.path.join(download_dir, nuevo_nombre))
         print(f"Archivo descargado y renombrado a: {nuevo_nombre}")
     except Exception as e:
         print(f"Error durante el proceso: {e}")
@@ -165,6 +226,13 @@ def descargar_archivo_con_fechas_con_perfil(url, fecha_inicial, fecha_final, dow
         driver.quit()
 
 
+def descargar_tarea(driver, tarea, download_dir):
+    """
+    Adaptador entre DownloadScheduler y descargar_con_driver.
+    """
+    return descargar_con_driver(driver, tarea['url'], tarea['fecha_inicial'], tarea['fecha_final'], download_dir)
+
+
 def read_csv_to_dataframe(file_path):
     """
     Reads a CSV file and converts it to a pandas DataFrame.
@@ -200,62 +268,124 @@ def read_csv_to_dataframe(file_path):
     return None
 
 
-def process_dataframe_and_download(df, tiempo=10):
+def process_dataframe_and_download(df, tiempo=10, perfiles=None, intervalo_host=5.0, modo='backfill', liviano=True):
     """
-    Processes a DataFrame and calls a download function for each row,
-    iterating through dates from 1800 to the current year in 10-year intervals.
+    Processes a DataFrame and downloads the date windows each row still needs,
+    in `tiempo`-year intervals from 1800 to the current year.
+
+    A BackfillPlanner keeps track of which (endpoint, window) files already exist
+    and their date coverage. Closed windows are downloaded once, windows before
+    an instrument's first date are skipped, and in 'diario' mode only the open
+    window containing today is fetched. Windows are downloaded in rounds until
+    the planner has nothing left.
+
+    Downloads run concurrently on a pool of long-lived browser sessions, one per
+    entry in `perfiles`. Each session needs its own Chrome user-data-dir because
+    Chrome locks it while open. Requests to the same host are spaced at least
+    `intervalo_host` seconds apart.
 
     Args:
     df (pandas.DataFrame): The DataFrame to process.
+    tiempo (int): Years per download window.
+    perfiles (list): (user_data_dir, profile_dir) tuples, one per browser session.
+    intervalo_host (float): Minimum seconds between downloads from the same host.
+    modo (str): 'backfill' for the full history or 'diario' for the open window only.
+    liviano (bool): Headless browsers that skip images, fonts, ads and trackers.
+
+    Returns:
+    list: Final file path of every download made (None when it failed).
     """
-    current_year = datetime.now().year
+    base_download_dir = "C:/Users/acer a10/Downloads/"
+    chrome_driver_path = "C:/chromedriver-win64/chromedriver.exe"
+
+    if perfiles is None:
+        perfiles = [("C:/Users/acer a10/AppData/Local/Google/Chrome/User Data", "Profile 6")]
 
+    endpoints = construir_endpoints(df, base_download_dir)
+
+    crear_drivers = [
+        partial(configurar_driver, chrome_driver_path=chrome_driver_path, user_data_dir=user_data_dir, profile_dir=profile_dir, liviano=liviano)
+        for user_data_dir, profile_dir in perfiles
+    ]
+    planner = BackfillPlanner(os.path.join(base_download_dir, "backfill_state.json"), tiempo)
+    scheduler = DownloadScheduler(crear_drivers, descargar_tarea, base_download_dir, intervalo_host)
+
+    try:
+        return descargar_endpoints(endpoints, planner, scheduler, modo)
+    finally:
+        scheduler.cerrar()
+
+
+def construir_endpoints(df, base_download_dir):
+    """
+    Arma el endpoint de cada fila de EndPoint.csv, indexado por "<TIPO>/<download_id>".
+
+    Los IDs repetidos se completan con la URL para que cada endpoint tenga sus
+    propios archivos. Las descargas de cada TIPO se guardan en base_download_dir/TIPO.
+
+    Returns:
+        dict: clave -> {'url', 'download_id', 'destino'}
+    """
+    ids_repetidos = set(df['ID'].astype(str)[df['ID'].astype(str).duplicated(keep=False)])
+
+    endpoints = {}
     for _, row in df.iterrows():
         url = row['ENDPOINT']
         download_id = str(row['ID']).replace(':', '_')
+        if str(row['ID']) in ids_repetidos:
+            download_id = f"{download_id}_{url.rstrip('/').split('/')[-1].replace('-historical-data', '')}"
         tipo = str(row['TIPO'])
 
-        # Crear el directorio si no existe
-        download_dir = os.path.join("C:/Users/acer a10/Downloads/", tipo)
-        os.makedirs(download_dir, exist_ok=True)
+        # Directorio final de las descargas de este tipo
+        download_dir = os.path.join(base_download_dir, tipo)
         print(f"ruta: {download_dir}")
+        endpoints[f"{tipo}/{download_id}"] = {'url': url, 'download_id': download_id, 'destino': download_dir}
+    return endpoints
 
-        chrome_driver_path = "C:/chromedriver-win64/chromedriver.exe"
-        user_data_dir = "C:/Users/acer a10/AppData/Local/Google/Chrome/User Data"
-        profile_dir = "Profile 6"
-
-        # Iterar desde 1800 hasta el año actual en intervalos de 10 años
-        for year in range(1800, current_year + 1, tiempo):
-            fecha_inicial = f"01.01.{year}"
-            fecha_final = f"31.12.{min(year + 9, current_year)}"
-
-            print(f"Descargando datos para el período: {fecha_inicial} - {fecha_final}")
-
-            # Llamada a la función
-            file_path = descargar_archivo_con_fechas_con_perfil(
-                url, 
-                fecha_inicial, 
-                fecha_final, 
-                f"{download_id}_{year}", 
-                download_dir, 
-                chrome_driver_path, 
-                user_data_dir, 
-                profile_dir
-            )
 
-            # Renombrar el archivo descargado
-            if file_path and os.path.exists(file_path):
-                file_extension = os.path.splitext(file_path)[1]
-                new_file_name = f"{download_id}_{year}{file_extension}"
-                new_file_path = os.path.join(download_dir, new_file_name)
-                os.rename(file_path, new_file_path)
-                print(f"Archivo renombrado y movido a: {new_file_path}")
-            else:
-                print(f"No se pudo renombrar el archivo para el ID: {download_id}_{year}")
+def descargar_endpoints(endpoints, planner, scheduler, modo='backfill'):
+    """
+    Descarga por rondas las ventanas que el planner indique para los endpoints dados.
 
-            # Esperar un poco entre descargas para no sobrecargar el servidor
-            time.sleep(5)
+    Se puede llamar desde varios hilos con el mismo planner y scheduler: las
+    sesiones de navegador se comparten entre todas las llamadas.
 
+    Args:
+        endpoints (dict): Endpoints creados con construir_endpoints
+        planner (BackfillPlanner): Estado de las ventanas descargadas
+        scheduler (DownloadScheduler): Pool de sesiones de navegador
+        modo (str): 'backfill' o 'diario'
+
+    Returns:
+        list: Ruta final de cada descarga realizada (None si falló)
+    """
+    resultados = []
+    while True:
+        plan = planner.planificar(list(endpoints), modo)
+        if not plan:
+            break
+
+        tareas = []
+        for clave, inicio, fin, desde in plan:
+            endpoint = endpoints[clave]
+            # El resto de una ventana truncada se guarda como <id>_<YYYYMMDD>.csv
+            sufijo = inicio if desde is None else desde.replace('-', '')
+            tareas.append({
+                'url': endpoint['url'],
+                'fecha_inicial': f"01.01.{inicio}" if desde is None else datetime.strptime(desde, '%Y-%m-%d').strftime('%d.%m.%Y'),
+                'fecha_final': f"31.12.{fin}",
+                'download_id': f"{endpoint['download_id']}_{sufijo}",
+                'destino': endpoint['destino']
+            })
+        print(f"Programando {len(tareas)} descargas en {len(scheduler.sesiones)} sesiones de navegador")
+
+        rutas = scheduler.ejecutar(tareas, cerrar=False)
+        for (clave, inicio, _, desde), ruta in zip(plan, rutas):
+            planner.registrar(clave, inicio, ruta, desde)
+        planner.guardar()
+        resultados.extend(rutas)
+
+    return resultados
 
 # Ejemplo de uso
 if __name__ == "__main__":
@@ -266,4 +396,7 @@ if __name__ == "__main__":
     # Si no, puedes crearlo así:
     # df = pd.read_csv('Endpoints.csv')
 
+    # modo='diario' descarga solo la ventana abierta que contiene hoy
+    # Con ETL_METRICS_FILE (y opcionalmente ETL_METRICS_PROMETHEUS) se registran los tiempos de cada etapa
     process_dataframe_and_download(endpoints_df, 20)
+    metrics.write_prometheus()
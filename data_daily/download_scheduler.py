@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import queue
+import shutil
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+# metrics.py es compartido por todas las etapas y está en la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+
+class RateLimiter:
+    """
+    Limita la frecuencia de solicitudes por host: entre dos inicios de descarga
+    al mismo host pasan al menos `intervalo` segundos. Es seguro entre hilos.
+    """
+
+    def __init__(self, intervalo=5.0):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._siguiente = {}
+
+    def esperar(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente.get(host, 0.0))
+            self._siguiente[host] = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+class BrowserSession:
+    """
+    Sesión de navegador de larga duración con su propio directorio de descargas.
+
+    El driver se crea en el primer uso y se reutiliza para todas las descargas
+    de la sesión; tras un error se reinicia para no arrastrar un navegador roto.
+    Chrome bloquea el user-data-dir mientras está abierto, así que cada sesión
+    necesita un user-data-dir distinto.
+    """
+
+    def __init__(self, id_sesion, download_dir, crear_driver):
+        self.id_sesion = id_sesion
+        self.download_dir = download_dir
+        self._crear_driver = crear_driver
+        self.driver = None
+
+        # El directorio de la sesión es privado: cualquier archivo que aparezca es de esta sesión
+        shutil.rmtree(download_dir, ignore_errors=True)
+        os.makedirs(download_dir, exist_ok=True)
+
+    def obtener_driver(self):
+        if self.driver is None:
+            print(f"[sesión {self.id_sesion}] Iniciando navegador")
+            with metrics.timer('browser_start', f"sesion_{self.id_sesion}"):
+                self.driver = self._crear_driver(self.download_dir)
+        return self.driver
+
+    def reiniciar(self):
+        self.cerrar()
+        for archivo in os.listdir(self.download_dir):
+            os.remove(os.path.join(self.download_dir, archivo))
+
+    def cerrar(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"[sesión {self.id_sesion}] Error cerrando el navegador: {e}")
+            self.driver = None
+
+
+class DownloadScheduler:
+    """
+    Reparte tareas de descarga entre un pool acotado de sesiones de navegador.
+
+    Cada tarea es un dict con 'url', 'fecha_inicial', 'fecha_final', 'download_id'
+    y 'destino'. `descargar(driver, tarea, download_dir)` debe devolver la ruta
+    del archivo descargado en el directorio de la sesión; el scheduler lo mueve a
+    `destino/<download_id>.csv`.
+    """
+
+    def __init__(self, crear_drivers, descargar, base_download_dir, intervalo_host=5.0):
+        self.descargar = descargar
+        self.rate_limiter = RateLimiter(intervalo_host)
+        self.sesiones = [
+            BrowserSession(i, os.path.join(base_download_dir, f"_sesion_{i}"), crear_driver)
+            for i, crear_driver in enumerate(crear_drivers)
+        ]
+        self._libres = queue.Queue()
+        for sesion in self.sesiones:
+            self._libres.put(sesion)
+
+    def _ejecutar(self, tarea):
+        with metrics.timer('session_wait', tarea['download_id']):
+            sesion = self._libres.get()
+        try:
+            with metrics.timer('rate_limit_wait', tarea['download_id']):
+                self.rate_limiter.esperar(tarea['url'])
+            print(f"[sesión {sesion.id_sesion}] Descargando {tarea['download_id']} ({tarea['fecha_inicial']} - {tarea['fecha_final']})")
+            with metrics.timer('download', tarea['download_id'], url=tarea['url']) as medicion:
+                archivo = self.descargar(sesion.obtener_driver(), tarea, sesion.download_dir)
+
+                os.makedirs(tarea['destino'], exist_ok=True)
+                destino = os.path.join(tarea['destino'], f"{tarea['download_id']}.csv")
+                shutil.move(archivo, destino)
+                medicion['bytes'] = metrics.file_size(destino)
+            print(f"[sesión {sesion.id_sesion}] Archivo guardado en: {destino}")
+            return destino
+        except Exception as e:
+            print(f"[sesión {sesion.id_sesion}] Error descargando {tarea['download_id']}: {e}")
+            sesion.reiniciar()
+            return None
+        finally:
+            self._libres.put(sesion)
+
+    def ejecutar(self, tareas, cerrar=True):
+        """
+        Ejecuta todas las tareas y devuelve la ruta final de cada una (None si falló),
+        en el mismo orden que `tareas`. Con cerrar=False los navegadores quedan
+        abiertos para otra ronda de tareas.
+        """
+        try:
+            with ThreadPoolExecutor(max_workers=len(self.sesiones)) as executor:
+                resultados = list(executor.map(self._ejecutar, tareas))
+        finally:
+            if cerrar:
+                self.cerrar()
+
+        exitosas = sum(1 for destino in resultados if destino)
+        print(f"\nDescargas completadas: {exitosas}/{len(tareas)}")
+        return resultados
+
+    def cerrar(self):
+        for sesion in self.sesiones:
+            sesion.cerrar()
@@ -0,0 +1,139 @@
+import os
+import csv
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# Extensiones de descargas en curso (Chrome, Firefox y temporales genéricos)
+EXTENSIONES_PARCIALES = ('.crdownload', '.part', '.tmp')
+
+# Constantes de inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENTO = struct.Struct('iIII')
+
+
+def es_csv_completo(ruta):
+    """
+    Verifica que el archivo sea un CSV completo: no vacío, con encabezado de al
+    menos dos columnas y todas las filas con la misma cantidad de campos.
+    """
+    try:
+        if os.path.getsize(ruta) == 0:
+            return False
+        with open(ruta, 'r', newline='', encoding='utf-8-sig') as f:
+            filas = csv.reader(f)
+            encabezado = next(filas, None)
+            if not encabezado or len(encabezado) < 2:
+                return False
+            return all(len(fila) == len(encabezado) for fila in filas if fila)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return False
+
+
+def _cargar_inotify():
+    """
+    Devuelve la libc con inotify disponible o None (Windows, macOS, libc sin inotify).
+    """
+    if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class DownloadWatcher:
+    """
+    Detecta la finalización de una descarga en el directorio de una sesión.
+
+    Debe crearse antes de hacer clic en "Descargar": los archivos que ya existían
+    en ese momento se ignoran, de modo que la descarga queda ligada a la sesión
+    que la inició. En Linux usa inotify y reacciona en cuanto Chrome renombra el
+    .crdownload al nombre final; en otros sistemas revisa el directorio cada
+    `intervalo` segundos.
+    """
+
+    def __init__(self, download_dir, existentes=None, intervalo=0.2):
+        self.download_dir = download_dir
+        self.intervalo = intervalo
+        self.existentes = set(os.listdir(download_dir)) if existentes is None else set(existentes)
+        self._fd = None
+        self._libc = _cargar_inotify()
+
+    def __enter__(self):
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                if self._libc.inotify_add_watch(fd, os.fsencode(self.download_dir), IN_CLOSE_WRITE | IN_MOVED_TO) >= 0:
+                    self._fd = fd
+                else:
+                    os.close(fd)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _candidato(self, nombre):
+        return nombre not in self.existentes and not nombre.endswith(EXTENSIONES_PARCIALES)
+
+    def _revisar_directorio(self):
+        for nombre in sorted(os.listdir(self.download_dir)):
+            if self._candidato(nombre) and es_csv_completo(os.path.join(self.download_dir, nombre)):
+                return nombre
+        return None
+
+    def _leer_eventos(self, espera):
+        """
+        Espera eventos de inotify hasta `espera` segundos y devuelve los nombres afectados.
+        """
+        listos, _, _ = select.select([self._fd], [], [], espera)
+        if not listos:
+            return []
+        datos = os.read(self._fd, 64 * 1024)
+        nombres = []
+        posicion = 0
+        while posicion + _EVENTO.size <= len(datos):
+            _, _, _, largo = _EVENTO.unpack_from(datos, posicion)
+            inicio = posicion + _EVENTO.size
+            nombres.append(os.fsdecode(datos[inicio:inicio + largo].rstrip(b'\0')))
+            posicion = inicio + largo
+        return nombres
+
+    def esperar(self, tiempo_espera=40):
+        """
+        Espera a que aparezca un CSV completo nuevo y devuelve su nombre.
+
+        Raises:
+            TimeoutError: Si no se completa ninguna descarga en el tiempo indicado
+        """
+        limite = time.monotonic() + tiempo_espera
+
+        # La descarga pudo terminar antes de empezar a esperar
+        nombre = self._revisar_directorio()
+        if nombre:
+            return nombre
+
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise TimeoutError("La descarga no se completó en el tiempo esperado.")
+
+            if self._fd is not None:
+                for nombre in self._leer_eventos(restante):
+                    if self._candidato(nombre) and es_csv_completo(os.path.join(self.download_dir, nombre)):
+                        return nombre
+            else:
+                time.sleep(min(self.intervalo, restante))
+                nombre = self._revisar_directorio()
+                if nombre:
+                    return nombre
@@ -1,6 +1,84 @@
 import pandas as pd
+import numpy as np
 from datetime import datetime
+import os
 import re
+import sys
+import csv
+import json
+import glob
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# metrics.py es compartido por todas las etapas y está en la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+# Archivo procesado de cada indicador (slug de la URL -> nombre en clean_data/).
+# Los indicadores que no estén aquí usan processed_<slug>.csv
+PROCESSED_FILES = {
+    'colombian-cpi-1197': 'processed_colombia_cpi_1197.csv',
+    'colombian-gdp-1151': 'processed_colombian_gdp_1151.csv',
+    'colombian-interest-rate-decision-497': 'processed_colombian_interest_rate-decision_497.csv',
+    'interest-rate-decision-168': 'processed_interest-rate-decision-168.csv'
+}
+
+# Formatos de Release Date, en el orden en que se prueban
+DATE_FORMATS = [
+    '%b %d, %Y',     # Dec 06, 2024
+    '%Y-%m-%d',      # 2024-12-06
+    '%d/%m/%Y',      # 06/12/2024
+    '%B %d, %Y'      # December 06, 2024
+]
+
+# Reglas de limpieza por indicador: unidad de los valores y columnas a convertir
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Indicators.csv')
+
+# Regla para los indicadores que no aparecen en Indicators.csv
+DEFAULT_RULE = {'unit': '%', 'columns': ['Actual', 'Forecast', 'Previous']}
+
+# Multiplicador de cada sufijo de unidad
+UNIT_MULTIPLIERS = {'': 1.0, 'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
+
+# Registro de los archivos ya limpiados (hash del original y regla usada)
+CACHE_FILENAME = '.clean_cache.json'
+
+def load_rules(rules_file=RULES_FILE):
+    """
+    Lee las reglas de limpieza por indicador.
+
+    El archivo tiene columnas SLUG, UNIDAD ('%', 'K', 'M', 'B', 'T' o vacío) y
+    COLUMNAS (columnas de valores separadas por ';').
+
+    Returns:
+        dict: slug -> {'unit': unidad, 'columns': [columnas]}
+    """
+    rules = {}
+    if not os.path.exists(rules_file):
+        return rules
+
+    with open(rules_file, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            unit = (row.get('UNIDAD') or '').strip()
+            if unit not in UNIT_MULTIPLIERS and unit != '%':
+                raise ValueError(f"Unidad no soportada para {row['SLUG']}: {unit}")
+            columns = [c.strip() for c in (row.get('COLUMNAS') or '').split(';') if c.strip()]
+            rules[row['SLUG'].strip()] = {'unit': unit, 'columns': columns or DEFAULT_RULE['columns']}
+    return rules
+
+def processed_path(slug, clean_dir='clean_data'):
+    """
+    Devuelve la ruta del archivo procesado que corresponde al slug de un indicador
+    """
+    return os.path.join(clean_dir, PROCESSED_FILES.get(slug, f"processed_{slug}.csv"))
+
+def parse_release_date(values):
+    """
+    Convierte textos de Release Date ("Dec 06, 2024 (Nov)") a fechas, NaT si no se reconocen
+    """
+    main_dates = pd.Series(values, dtype=str).str.replace(r'\s*\(.*?\)', '', regex=True).str.strip('" ')
+    return pd.to_datetime(main_dates, format='%b %d, %Y', errors='coerce')
 
 def split_date(date_str):
     """
@@ -21,14 +99,7 @@ def split_date(date_str):
             main_date = date_str.strip()
         
         # Intentar diferentes formatos de fecha
-        date_formats = [
-            '%b %d, %Y',     # Dec 06, 2024
-            '%Y-%m-%d',      # 2024-12-06
-            '%d/%m/%Y',      # 06/12/2024
-            '%B %d, %Y'      # December 06, 2024
-        ]
-        
-        for date_format in date_formats:
+        for date_format in DATE_FORMATS:
             try:
                 date_obj = datetime.strptime(main_date, date_format)
                 formatted_date = date_obj.strftime('%d/%m/%Y')
@@ -59,6 +130,172 @@ def clean_percentage(value):
         print(f"Error limpiando porcentaje '{value}': {str(e)}")
         return None
 
+def clean_dataframe_legacy(df):
+    """
+    Versión fila por fila de clean_dataframe con split_date y clean_percentage.
+
+    Se conserva como referencia para verificar_paridad.
+
+    Args:
+        df (pandas.DataFrame): Tabla tal como la guarda scrape_investing
+
+    Returns:
+        pandas.DataFrame: Columnas Release Date (dd/mm/yyyy), Report Month, Time y <columna>%
+    """
+    df = df.copy()
+
+    # Procesar la columna Release Date
+    date_info = df['Release Date'].apply(split_date)
+    df['Release Date'] = date_info.apply(lambda x: x[0])
+    df['Report Month'] = date_info.apply(lambda x: x[1])
+
+    # Procesar columnas de porcentajes
+    percentage_cols = ['Actual', 'Forecast', 'Previous']
+    for col in percentage_cols:
+        if col in df.columns:
+            new_col = f'{col}%'
+            df[new_col] = df[col].apply(clean_percentage)
+            df.drop(columns=[col], inplace=True)
+
+    # Reordenar las columnas
+    columns = ['Release Date', 'Report Month', 'Time']
+    columns.extend([col for col in df.columns if col.endswith('%')])
+    return df[columns]
+
+def split_dates(values):
+    """
+    Versión vectorizada de split_date para una columna completa.
+
+    Cada formato de DATE_FORMATS se prueba una sola vez sobre las fechas que aún
+    no se reconocieron, analizando cada texto distinto una sola vez.
+
+    Returns:
+        tuple: (Series de fechas dd/mm/yyyy, Series de meses de reporte)
+    """
+    values = pd.Series(values)
+    texts = values.str.strip('"')
+    is_text = texts.notna()
+
+    report_month = texts.str.extract(r'\((.*?)\)', expand=False).fillna('')
+    main_date = texts.str.replace(r'\s*\(.*?\)', '', regex=True).str.strip()
+
+    # Cada fecha distinta se analiza y formatea una sola vez
+    codes, uniques = pd.factorize(main_date)
+    uniques = pd.Series(uniques, dtype=object)
+    dates = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+    for date_format in DATE_FORMATS:
+        pending = dates.isna()
+        if not pending.any():
+            break
+        dates[pending] = pd.to_datetime(uniques[pending], format=date_format, errors='coerce')
+
+    iso = pd.Series(np.datetime_as_string(dates.to_numpy(), unit='D'), dtype=object)
+    unique_formatted = (iso.str[8:10] + '/' + iso.str[5:7] + '/' + iso.str[0:4]).where(dates.notna())
+
+    found = codes >= 0
+    parsed = np.zeros(len(values), dtype=bool)
+    parsed[found] = dates.notna().to_numpy()[codes[found]]
+    parsed = pd.Series(parsed, index=values.index)
+
+    formatted = values.astype(object).where(~is_text, texts)
+    formatted[parsed] = unique_formatted.to_numpy()[codes[parsed.to_numpy()]]
+    report_month = report_month.where(parsed, '')
+
+    for date_str in texts[is_text & ~parsed].unique():
+        print(f"Warning: No se pudo procesar la fecha: {date_str}")
+
+    return formatted, report_month
+
+def clean_percentages(values):
+    """
+    Versión vectorizada de clean_percentage para una columna completa
+    """
+    values = pd.Series(values)
+    texts = values.astype(str).str.replace('%', '', regex=False).str.strip()
+    # clean_percentage siempre devuelve float: '5%' se escribe 5.0 aunque toda la columna sea entera
+    numbers = pd.to_numeric(texts, errors='coerce').astype('float64')
+
+    invalid = numbers.isna() & values.notna() & (texts != '') & (texts.str.lower() != 'nan')
+    for value in values[invalid].unique():
+        print(f"Error limpiando porcentaje '{value}'")
+
+    return numbers
+
+def clean_units(values, unit):
+    """
+    Convierte valores con sufijo de magnitud ("215K", "-1.2M", "3.5B") a números
+    expresados en `unit` ('K', 'M', 'B', 'T' o '' para unidades simples).
+    Los valores sin sufijo se consideran ya expresados en `unit`.
+    """
+    values = pd.Series(values)
+    texts = values.astype(str).str.replace(',', '', regex=False).str.strip()
+    parts = texts.str.extract(r'^([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([KMBT]?)$')
+    suffix_factors = {suffix: multiplier / UNIT_MULTIPLIERS[unit] for suffix, multiplier in UNIT_MULTIPLIERS.items()}
+    suffix_factors[''] = 1.0
+    factors = parts[1].map(suffix_factors).astype(float)
+    numbers = pd.to_numeric(parts[0], errors='coerce') * factors
+
+    invalid = numbers.isna() & values.notna() & (texts != '') & (texts.str.lower() != 'nan')
+    for value in values[invalid].unique():
+        print(f"Error limpiando valor '{value}'")
+
+    return numbers
+
+def clean_dataframe(df, rule=None):
+    """
+    Limpia una tabla de indicador con columnas Release Date, Time y columnas de valores.
+
+    Separa el mes de reporte de la fecha y convierte los valores a números
+    operando sobre columnas completas. Con la regla por defecto (porcentajes en
+    Actual, Forecast y Previous) el resultado es el mismo que el de
+    clean_dataframe_legacy.
+
+    Args:
+        df (pandas.DataFrame): Tabla tal como la guarda scrape_investing
+        rule (dict): Regla del indicador ({'unit', 'columns'}), ver load_rules
+
+    Returns:
+        pandas.DataFrame: Columnas Release Date (dd/mm/yyyy), Report Month, Time y <columna><unidad>
+    """
+    rule = rule or DEFAULT_RULE
+    df = df.copy()
+
+    # Procesar la columna Release Date
+    df['Release Date'], df['Report Month'] = split_dates(df['Release Date'])
+
+    # Procesar columnas de valores
+    columns = ['Release Date', 'Report Month', 'Time']
+    for col in rule['columns']:
+        if col in df.columns:
+            new_col = f"{col}{rule['unit']}"
+            if rule['unit'] == '%':
+                values = clean_percentages(df[col])
+            else:
+                values = clean_units(df[col], rule['unit'])
+            df.drop(columns=[col], inplace=True)
+            df[new_col] = values
+            columns.append(new_col)
+
+    return df[columns]
+
+def verificar_paridad(df, nombre=''):
+    """
+    Compara el CSV que generan clean_dataframe y clean_dataframe_legacy para una tabla.
+
+    Returns:
+        bool: True si ambas versiones producen exactamente el mismo archivo
+    """
+    vectorizado = clean_dataframe(df).to_csv(index=False)
+    legado = clean_dataframe_legacy(df).to_csv(index=False)
+    if vectorizado == legado:
+        return True
+
+    for linea, (a, b) in enumerate(zip(vectorizado.splitlines(), legado.splitlines()), start=1):
+        if a != b:
+            print(f"Diferencia en {nombre} línea {linea}:\n  vectorizado: {a}\n  original:    {b}")
+            break
+    return False
+
 def process_colombia_cpi(input_file='output/interest-rate-decision-168.csv', output_file='clean_data/processed_interest-rate-decision-168.csv'):
     """
     Procesa el archivo de CPI de Colombia
@@ -74,25 +311,8 @@ def process_colombia_cpi(input_file='output/interest-rate-decision-168.csv', out
         print("\nPrimeras filas del archivo original:")
         print(df.head())
         
-        # Procesar la columna Release Date
-        print("\nProcesando fechas...")
-        date_info = df['Release Date'].apply(split_date)
-        df['Release Date'] = date_info.apply(lambda x: x[0])
-        df['Report Month'] = date_info.apply(lambda x: x[1])
-
-        # Procesar columnas de porcentajes
-        print("\nProcesando porcentajes...")
-        percentage_cols = ['Actual', 'Forecast', 'Previous']
-        for col in percentage_cols:
-            if col in df.columns:
-                new_col = f'{col}%'
-                df[new_col] = df[col].apply(clean_percentage)
-                df.drop(columns=[col], inplace=True)
-
-        # Reordenar las columnas
-        columns = ['Release Date', 'Report Month', 'Time']
-        columns.extend([col for col in df.columns if col.endswith('%')])
-        df = df[columns]
+        print("\nProcesando fechas y porcentajes...")
+        df = clean_dataframe(df)
 
         # Guardar el archivo procesado
         df.to_csv(output_file, index=False)
@@ -111,5 +331,121 @@ def process_colombia_cpi(input_file='output/interest-rate-decision-168.csv', out
         import traceback
         print(traceback.format_exc())
 
+def file_hash(file_path):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def clean_file(input_file, output_file, rule):
+    """
+    Limpia un archivo de output/ con la regla del indicador y guarda el resultado.
+
+    Returns:
+        int: Filas del archivo procesado
+    """
+    slug = os.path.basename(input_file)[:-4]
+    with metrics.timer('parse', slug) as medicion:
+        df = pd.read_csv(input_file, dtype=str, keep_default_na=False)
+        medicion['rows'] = len(df)
+        medicion['bytes'] = metrics.file_size(input_file)
+    with metrics.timer('clean', slug) as medicion:
+        df = clean_dataframe(df, rule)
+        medicion['rows'] = len(df)
+    with metrics.timer('write', slug) as medicion:
+        df.to_csv(output_file, index=False)
+        medicion['rows'] = len(df)
+        medicion['bytes'] = metrics.file_size(output_file)
+    return len(df)
+
+def process_all(input_dir='output', clean_dir='clean_data', rules_file=RULES_FILE, workers=4, force=False):
+    """
+    Limpia todos los indicadores de input_dir en una sola pasada.
+
+    Aplica a cada archivo la regla de Indicators.csv (o la regla por defecto) y
+    omite los archivos cuyo contenido y regla no cambiaron desde la última
+    limpieza, salvo que force sea True.
+
+    Args:
+        input_dir (str): Directorio con los CSV descargados
+        clean_dir (str): Directorio de los archivos procesados
+        rules_file (str): Archivo de reglas por indicador
+        workers (int): Procesos en paralelo
+        force (bool): Limpiar aunque el archivo no haya cambiado
+
+    Returns:
+        dict: Cantidad de archivos 'cleaned', 'skipped' y 'failed'
+    """
+    os.makedirs(clean_dir, exist_ok=True)
+    rules = load_rules(rules_file)
+    cache_path = os.path.join(clean_dir, CACHE_FILENAME)
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+
+    pending = {}
+    skipped = 0
+    for entry in sorted(os.scandir(input_dir), key=lambda e: e.name):
+        if not entry.is_file() or not entry.name.endswith('.csv'):
+            continue
+        slug = entry.name[:-4]
+        rule = rules.get(slug, DEFAULT_RULE)
+        output_file = processed_path(slug, clean_dir)
+        record = {'hash': file_hash(entry.path), 'rule': rule}
+
+        if not force and cache.get(slug) == record and os.path.exists(output_file):
+            skipped += 1
+            continue
+        pending[slug] = (entry.path, output_file, rule, record)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {slug: executor.submit(clean_file, *args[:3]) for slug, args in pending.items()}
+        for slug, future in futures.items():
+            try:
+                rows = future.result()
+                cache[slug] = pending[slug][3]
+                print(f"{slug}: {rows} filas -> {pending[slug][1]}")
+            except Exception as e:
+                failed += 1
+                cache.pop(slug, None)
+                print(f"Error procesando {slug}: {str(e)}")
+
+    tmp = f"{cache_path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp, cache_path)
+
+    result = {'cleaned': len(pending) - failed, 'skipped': skipped, 'failed': failed}
+    print(f"\nLimpieza completada: {result['cleaned']} limpiados, {skipped} sin cambios, {failed} con error")
+    return result
+
 if __name__ == "__main__":
-    process_colombia_cpi()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Limpia las tablas de indicadores descargadas")
+    parser.add_argument('--paridad', action='store_true',
+                        help="Verifica que la limpieza vectorizada coincida con la original en todos los archivos de output/")
+    parser.add_argument('--workers', type=int, default=4, help="Procesos en paralelo")
+    parser.add_argument('--forzar', action='store_true', help="Limpia todos los archivos aunque no hayan cambiado")
+    parser.add_argument('--reglas', default=RULES_FILE, help="Archivo de reglas por indicador")
+    parser.add_argument('--metrics', help="Archivo JSON lines donde registrar los tiempos de cada etapa")
+    parser.add_argument('--prometheus', help="Archivo de texto Prometheus con el resumen de las métricas")
+    args = parser.parse_args()
+    metrics.configure(args.metrics, args.prometheus)
+
+    if args.paridad:
+        archivos = sorted(glob.glob(os.path.join('output', '*.csv')))
+        # Se comparan la lectura por defecto y la de clean_file (todo como texto)
+        fallidos = [f for f in archivos
+                    if not (verificar_paridad(pd.read_csv(f), f)
+                            and verificar_paridad(pd.read_csv(f, dtype=str, keep_default_na=False), f))]
+        print(f"Paridad: {len(archivos) - len(fallidos)}/{len(archivos)} archivos idénticos")
+        sys.exit(1 if fallidos else 0)
+
+    result = process_all(rules_file=args.reglas, workers=args.workers, force=args.forzar)
+    metrics.write_prometheus()
+    sys.exit(1 if result['failed'] else 0)
\ No newline at end of file
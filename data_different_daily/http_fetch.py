@@ -0,0 +1,172 @@
+import re
+
+# URL que usa el botón "Show more" de la tabla de históricos del calendario económico
+MORE_HISTORY_URL = "https://www.investing.com/economic-calendar/more-history"
+
+# onclick del enlace "Show more": ecEvent.moreHistory(<event_attr_ID>, this, <is_speech>)
+MORE_HISTORY_ONCLICK = re.compile(r"moreHistory\(\s*(\d+)\s*,\s*this\s*,\s*(\d+)\s*\)")
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+class FetchError(Exception):
+    """
+    La tabla no se pudo obtener por HTTP y hay que usar Selenium.
+    """
+
+def _texto_celda(celda):
+    """
+    Devuelve el texto visible de una celda como lo entrega Selenium: espacios
+    colapsados y un espacio simple para las celdas que solo tienen &nbsp;.
+    """
+    crudo = celda.text_content()
+    texto = re.sub(r'\s+', ' ', crudo.replace('\xa0', ' ')).strip()
+    if not texto and '\xa0' in crudo:
+        return ' '
+    return texto
+
+def parsear_filas(filas):
+    """
+    Convierte elementos <tr> en listas de textos, omitiendo la última columna
+    igual que scrape_table.
+
+    Returns:
+        list: Filas como listas de textos
+    """
+    datos = []
+    for fila in filas:
+        celdas = fila.xpath('./td')
+        if celdas:
+            datos.append([_texto_celda(celda) for celda in celdas][:-1])
+    return datos
+
+def _formulario_base(documento):
+    """
+    Lee event_attr_ID e is_speech del enlace "Show more" de la página.
+
+    Returns:
+        dict: Campos fijos del formulario de "Show more" o None si la página no tiene el enlace
+    """
+    for onclick in documento.xpath("//a[contains(@onclick, 'moreHistory')]/@onclick"):
+        coincidencia = MORE_HISTORY_ONCLICK.search(onclick)
+        if coincidencia:
+            return {'event_attr_ID': coincidencia.group(1), 'is_speech': coincidencia.group(2)}
+    return None
+
+def parsear_tabla(html):
+    """
+    Extrae la tabla de históricos de una página del calendario económico.
+
+    Args:
+        html (str): HTML completo de la página
+
+    Returns:
+        tuple: (filas, formulario base de "Show more" o None, elementos <tr>)
+            o ([], None, []) si no hay tabla
+    """
+    from lxml import html as lxml_html
+
+    documento = lxml_html.fromstring(html)
+    tablas = documento.xpath("//table[contains(@id, 'eventHistoryTable')]")
+    if not tablas:
+        return [], None, []
+
+    filas = tablas[0].xpath('./tbody/tr')
+    return parsear_filas(filas), _formulario_base(documento), filas
+
+def parsear_mas_historia(respuesta):
+    """
+    Extrae las filas del JSON que devuelve "Show more".
+
+    Returns:
+        tuple: (filas, elementos <tr>, hay_mas)
+    """
+    from lxml import html as lxml_html
+
+    contenido = respuesta.get('historyRows') or ''
+    if not contenido.strip():
+        return [], [], False
+
+    filas = lxml_html.fromstring(f"<table><tbody>{contenido}</tbody></table>").xpath('//tr')
+    hay_mas = str(respuesta.get('hasMoreHistory', '')).lower() in ('1', 'true')
+    return parsear_filas(filas), filas, hay_mas
+
+def _parametros_mas_historia(formulario, ultima_fila):
+    """
+    Arma el formulario de "Show more" a partir de los campos del enlace y de la
+    última fila cargada.
+    """
+    event_id = (ultima_fila.get('id') or '').replace('historicEvent_', '')
+    event_timestamp = ultima_fila.get('event_timestamp')
+    if formulario is None or not event_id or not event_timestamp:
+        return None
+    return {
+        'eventID': event_id,
+        'event_attr_ID': formulario['event_attr_ID'],
+        'event_timestamp': event_timestamp,
+        'is_speech': formulario['is_speech']
+    }
+
+def scrape_table_http(url, session=None, timeout=15, max_paginas=500, detener=None):
+    """
+    Obtiene la tabla de históricos de una URL por HTTP, sin navegador.
+
+    Descarga la página, extrae la tabla con lxml y pide las páginas de
+    "Show more" mientras el servidor indique que hay más historia.
+
+    Args:
+        url (str): URL del indicador en el calendario económico
+        session (requests.Session): Sesión HTTP a reutilizar entre indicadores
+        timeout (int): Segundos máximos por solicitud
+        max_paginas (int): Límite de páginas de "Show more"
+        detener (callable): Recibe el Release Date de la fila más antigua
+            cargada y devuelve True para dejar de pedir más páginas
+
+    Returns:
+        list: Filas de la tabla como listas de textos
+
+    Raises:
+        FetchError: Si faltan requests/lxml, la página no responde o no trae la tabla
+    """
+    try:
+        import requests
+        import lxml  # noqa: F401
+    except ImportError as e:
+        raise FetchError(f"Dependencia no disponible para HTTP: {e}")
+
+    session = session or requests.Session()
+    try:
+        respuesta = session.get(url, headers=HEADERS, timeout=timeout)
+        respuesta.raise_for_status()
+    except requests.RequestException as e:
+        raise FetchError(f"No se pudo obtener {url}: {e}")
+
+    datos, formulario, filas = parsear_tabla(respuesta.text)
+    if not datos:
+        raise FetchError(f"La página no contiene la tabla de históricos: {url}")
+
+    for _ in range(max_paginas):
+        if detener is not None and detener(datos[-1][0]):
+            break
+        parametros = _parametros_mas_historia(formulario, filas[-1])
+        if parametros is None:
+            break
+        try:
+            respuesta = session.post(
+                MORE_HISTORY_URL,
+                data=parametros,
+                headers={**HEADERS, 'X-Requested-With': 'XMLHttpRequest', 'Referer': url},
+                timeout=timeout
+            )
+            respuesta.raise_for_status()
+            nuevas, filas, hay_mas = parsear_mas_historia(respuesta.json())
+        except (requests.RequestException, ValueError) as e:
+            raise FetchError(f"Error obteniendo más historia de {url}: {e}")
+
+        datos.extend(nuevas)
+        if not hay_mas or not nuevas:
+            break
+
+    return datos
@@ -3,14 +3,37 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import time
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 import pandas as pd
+import numpy as np
 import os
+import sys
+import argparse
+from http_fetch import scrape_table_http, FetchError
+from clean_data import clean_dataframe, parse_release_date, processed_path, load_rules, DEFAULT_RULE
 
-def configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_dir):
+# metrics.py es compartido por todas las etapas y está en la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+from browser_profile import configurar_opciones_livianas, bloquear_recursos
+
+# Columnas de la tabla de históricos tal como se guardan en output/
+COLUMNS = ["Release Date", "Time", "Actual", "Forecast", "Previous"]
+
+# URLs a procesar
+URLS = [
+    "https://www.investing.com/economic-calendar/colombian-gdp-1151",
+    "https://www.investing.com/economic-calendar/colombian-interest-rate-decision-497",
+    "https://www.investing.com/economic-calendar/colombian-cpi-1197",
+    "https://www.investing.com/economic-calendar/interest-rate-decision-168"
+]
+
+def configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_dir, liviano=True):
     """
-    Configura el driver de Chrome con los perfiles y opciones especificadas
+    Configura el driver de Chrome con los perfiles y opciones especificadas.
+
+    Con liviano=True corre sin ventana, con carga 'eager' y sin imágenes,
+    fuentes ni publicidad; scrape_table ya espera la tabla explícitamente.
     """
     chrome_options = webdriver.ChromeOptions()
     
@@ -29,48 +52,118 @@ def configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_d
     chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
     chrome_options.add_argument(f"--profile-directory={profile_dir}")
     chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+    if liviano:
+        configurar_opciones_livianas(chrome_options)
     
     # Configurar el servicio
     service = Service(executable_path=chrome_driver_path)
-    return webdriver.Chrome(service=service, options=chrome_options)
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    if liviano:
+        bloquear_recursos(driver)
+    return driver
+
+# Filas de la tabla de históricos (equivale al XPath //table[contains(@id, 'eventHistoryTable')]/tbody/tr)
+ROWS_SELECTOR = "table[id*='eventHistoryTable'] > tbody > tr"
+
+# Extrae toda la tabla en una sola llamada al navegador. El texto de cada celda
+# se normaliza como lo entrega WebElement.text: espacios colapsados y un espacio
+# simple para las celdas que solo tienen &nbsp;.
+EXTRACT_ROWS_SCRIPT = """
+return Array.from(document.querySelectorAll(arguments[0]), function (row) {
+    return Array.from(row.querySelectorAll(':scope > td'), function (cell) {
+        var texto = cell.innerText.replace(/\\u00a0/g, ' ').replace(/\\s+/g, ' ').trim();
+        if (!texto && cell.textContent.indexOf('\\u00a0') !== -1) {
+            texto = ' ';
+        }
+        return texto;
+    });
+});
+"""
+
+# Release Date de la fila más antigua cargada
+LAST_RELEASE_SCRIPT = """
+var filas = document.querySelectorAll(arguments[0]);
+return filas.length ? filas[filas.length - 1].querySelector('td').innerText.trim() : null;
+"""
+
+# Segundos que se espera a que "Show more" agregue filas antes de dar la tabla por completa
+GROWTH_TIMEOUT = 3
+
+def contar_filas(driver):
+    """
+    Devuelve la cantidad de filas cargadas en la tabla de históricos
+    """
+    return driver.execute_script("return document.querySelectorAll(arguments[0]).length;", ROWS_SELECTOR)
+
+def extraer_filas(driver):
+    """
+    Extrae todas las filas de la tabla con un único execute_script, omitiendo la última columna
+    """
+    return [cols[:-1] for cols in driver.execute_script(EXTRACT_ROWS_SCRIPT, ROWS_SELECTOR) if cols]
+
+def expandir_tabla(driver, wait_time=GROWTH_TIMEOUT, detener=None):
+    """
+    Hace clic en "Show more" mientras la tabla siga creciendo.
 
-def scrape_table(driver, url, wait_time=10):
+    Después de cada clic espera a que aumente la cantidad de filas o a que el
+    botón se oculte; se detiene cuando el botón ya no está visible, cuando las
+    filas no crecen en `wait_time` segundos o cuando `detener` devuelve True
+    para el Release Date de la fila más antigua.
+
+    Returns:
+        int: Cantidad de filas cargadas
+    """
+    filas = contar_filas(driver)
+    while True:
+        if detener is not None and detener(driver.execute_script(LAST_RELEASE_SCRIPT, ROWS_SELECTOR)):
+            print("Se alcanzaron filas ya guardadas.")
+            break
+
+        botones = [b for b in driver.find_elements(By.XPATH, "//a[text()='Show more']") if b.is_displayed()]
+        if not botones:
+            print("No hay más 'Show more' que hacer clic.")
+            break
+
+        boton = botones[0]
+        driver.execute_script("arguments[0].click();", boton)
+        try:
+            WebDriverWait(driver, wait_time, ignored_exceptions=(StaleElementReferenceException,)).until(
+                lambda d: contar_filas(d) > filas or not boton.is_displayed()
+            )
+        except TimeoutException:
+            print("La tabla dejó de crecer.")
+            break
+        filas = contar_filas(driver)
+
+    return filas
+
+def scrape_table(driver, url, wait_time=10, detener=None):
     """
     Extrae datos de la tabla de una URL específica, detectando automáticamente el ID de la tabla
     """
-    driver.get(url)
+    slug = url.split('/')[-1]
+    with metrics.timer('page_load', slug):
+        driver.get(url)
     wait = WebDriverWait(driver, wait_time)
 
-    # Extraer el ID numérico de la URL
-    table_id = url.split('-')[-1]  # Obtiene el número del final de la URL
-
     try:
         # Esperar a que la tabla esté presente usando un XPath más general
         table_xpath = f"//table[contains(@id, 'eventHistoryTable')]"
         wait.until(EC.presence_of_element_located((By.XPATH, table_xpath)))
 
-        # Hacer clic en "Show More" hasta que desaparezca
-        while True:
-            try:
-                show_more_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[text()='Show more']")))
-                driver.execute_script("arguments[0].click();", show_more_button)
-                time.sleep(2)  # Esperar que cargue el contenido
-            except TimeoutException:
-                print("No hay más 'Show more' que hacer clic.")
-                break
-
-        # Extraer datos de la tabla usando un XPath más general
-        table_rows = driver.find_elements(By.XPATH, f"//table[contains(@id, 'eventHistoryTable')]/tbody/tr")
-        
-        if not table_rows:
+        # Hacer clic en "Show More" hasta que la tabla deje de crecer
+        with metrics.timer('expand', slug) as medicion:
+            medicion['rows'] = expandir_tabla(driver, detener=detener)
+
+        # Extraer todas las filas de una sola vez
+        with metrics.timer('extract', slug) as medicion:
+            data = extraer_filas(driver)
+            medicion['rows'] = len(data)
+
+        if not data:
             print(f"No se encontraron datos en la tabla para la URL: {url}")
             return []
 
-        data = []
-        for row in table_rows:
-            cols = row.find_elements(By.TAG_NAME, "td")
-            data.append([col.text for col in cols][:-1])  # Omitimos la última columna
-
         return data
 
     except TimeoutException:
@@ -84,8 +177,7 @@ def save_to_csv(data, url, output_dir):
     """
     Guarda los datos en un archivo CSV
     """
-    columns = ["Release Date", "Time", "Actual", "Forecast", "Previous"]
-    df = pd.DataFrame(data, columns=columns)
+    df = pd.DataFrame(data, columns=COLUMNS)
     
     # Crear nombre de archivo y ruta completa
     csv_filename = f"{url.split('/')[-1]}.csv"
@@ -95,38 +187,169 @@ def save_to_csv(data, url, output_dir):
     df.to_csv(csv_path, index=False)
     print(f"Datos guardados en {csv_path}")
 
-def main():
+def leer_guardado(csv_path):
+    """
+    Lee un CSV de output/ como texto, sin convertir celdas vacías ni "null"
+    """
+    return pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+
+def fecha_corte(stored):
+    """
+    Devuelve la fecha de la publicación más reciente ya guardada con valor Actual.
+
+    Las filas desde esa fecha se vuelven a pedir: la última publicación puede
+    corregirse y las programadas aún no tienen Actual. Devuelve None si no hay
+    ninguna fila publicada.
+    """
+    fechas = parse_release_date(stored['Release Date'])
+    publicadas = fechas[stored['Actual'].str.strip() != '']
+    return None if publicadas.dropna().empty else publicadas.max()
+
+def upsert_csv(data, url, output_dir, clean_dir, corte, rule=DEFAULT_RULE):
+    """
+    Integra las filas nuevas en output/<slug>.csv y en su archivo de clean_data/.
+
+    Si lo descargado llega hasta la fecha de corte, las filas guardadas desde
+    esa fecha se reemplazan por las descargadas; si no, solo se reemplazan las
+    filas con el mismo Release Date. El archivo procesado se actualiza con las
+    mismas filas, limpiando solo las nuevas; si no está sincronizado con el
+    original se regenera completo.
+
+    Args:
+        rule (dict): Regla de limpieza del indicador, ver clean_data.load_rules
+
+    Returns:
+        int: Cantidad de filas nuevas o actualizadas
+    """
+    slug = url.split('/')[-1]
+    csv_path = os.path.join(output_dir, f"{slug}.csv")
+    clean_path = processed_path(slug, clean_dir)
+
+    stored = leer_guardado(csv_path)
+    scraped = pd.DataFrame(data, columns=COLUMNS)
+    fechas_stored = parse_release_date(stored['Release Date'])
+    fechas_scraped = parse_release_date(scraped['Release Date'])
+
+    if corte is not None and fechas_scraped.min() <= corte:
+        recientes = (fechas_scraped >= corte).to_numpy()
+        conservar = (~(fechas_stored >= corte)).to_numpy()
+    else:
+        recientes = np.ones(len(scraped), dtype=bool)
+        conservar = (~stored['Release Date'].isin(scraped['Release Date'])).to_numpy()
+    nuevas = scraped[recientes]
+
+    fechas = pd.concat([fechas_scraped[recientes], fechas_stored[conservar]], ignore_index=True)
+    orden = fechas.sort_values(ascending=False, kind='mergesort').index
+
+    raw = pd.concat([nuevas, stored[conservar]], ignore_index=True).iloc[orden]
+    raw.to_csv(csv_path, index=False)
+    print(f"Datos actualizados en {csv_path}: {len(nuevas)} filas nuevas o actualizadas")
+
+    os.makedirs(clean_dir, exist_ok=True)
+    processed = leer_guardado(clean_path) if os.path.exists(clean_path) else None
+    if processed is not None and len(processed) == len(stored):
+        processed = pd.concat([clean_dataframe(nuevas, rule), processed[conservar]], ignore_index=True).iloc[orden]
+    else:
+        processed = clean_dataframe(raw, rule)
+    processed.to_csv(clean_path, index=False)
+    print(f"Archivo procesado actualizado: {clean_path}")
+
+    return len(nuevas)
+
+def scrape_url(url, download_dir, clean_dir, incremental=False, session=None, scrape_selenium=None, rule=DEFAULT_RULE):
+    """
+    Descarga la tabla de un indicador y la guarda en download_dir.
+
+    Primero intenta por HTTP con `session`; si falla usa `scrape_selenium(url, detener)`.
+    Con incremental=True solo se piden las publicaciones desde la última guardada
+    y se actualizan el archivo original y el procesado en clean_dir con `rule`.
+
+    Returns:
+        bool: True si se obtuvieron datos
+    """
+    csv_path = os.path.join(download_dir, f"{url.split('/')[-1]}.csv")
+    corte = None
+    if incremental and os.path.exists(csv_path):
+        corte = fecha_corte(leer_guardado(csv_path))
+    detener = None
+    if corte is not None:
+        print(f"Última publicación guardada: {corte:%Y-%m-%d}")
+        def detener(fecha):
+            return parse_release_date([fecha])[0] <= corte
+
+    data = []
+    if session is not None:
+        try:
+            with metrics.timer('http_fetch', url.split('/')[-1]) as medicion:
+                data = scrape_table_http(url, session=session, detener=detener)
+                medicion['rows'] = len(data)
+        except FetchError as e:
+            print(f"No se pudo obtener por HTTP, usando Selenium: {e}")
+
+    if not data and scrape_selenium is not None:
+        data = scrape_selenium(url, detener)
+
+    if data:
+        with metrics.timer('write', url.split('/')[-1]) as medicion:
+            if corte is not None:
+                upsert_csv(data, url, download_dir, clean_dir, corte, rule)
+            else:
+                save_to_csv(data, url, download_dir)
+            medicion['rows'] = len(data)
+            medicion['bytes'] = metrics.file_size(csv_path)
+    else:
+        print(f"No se pudieron obtener datos para: {url}")
+    return bool(data)
+
+def crear_sesion_http():
+    """
+    Devuelve una requests.Session o None si requests no está instalado
+    """
+    try:
+        import requests
+    except ImportError:
+        print("requests no está instalado; se usará Selenium para todas las URLs")
+        return None
+    return requests.Session()
+
+def main(incremental=False, liviano=True):
+    """
+    Descarga las tablas de los indicadores.
+
+    Con incremental=True solo se piden las publicaciones desde la última ya
+    guardada en output/ y se actualizan en su lugar el archivo original y el
+    procesado en clean_data/; los indicadores sin archivo se descargan completos.
+    Con liviano=False el navegador de respaldo se abre con ventana y carga completa.
+    """
     # Configuración de rutas
     base_dir = os.path.dirname(os.path.abspath(__file__))
     chrome_driver_path = "C:/chromedriver-win64/chromedriver-win64/chromedriver.exe"
     download_dir = os.path.join(base_dir, "output")
+    clean_dir = os.path.join(base_dir, "clean_data")
     user_data_dir = os.path.join(base_dir, "C:/Users/Nabucodonosor/AppData/Local/Google/Chrome/User Data")
     profile_dir = "Profile 2"
     
     # Crear directorio de descargas si no existe
     os.makedirs(download_dir, exist_ok=True)
 
-    # URLs a procesar
-    urls = [
-        "https://www.investing.com/economic-calendar/colombian-gdp-1151",
-        "https://www.investing.com/economic-calendar/colombian-interest-rate-decision-497",
-        "https://www.investing.com/economic-calendar/colombian-cpi-1197",
-        "https://www.investing.com/economic-calendar/interest-rate-decision-168"
-    ]
+    # El navegador solo se inicia si alguna URL no se puede obtener por HTTP
+    driver = None
+    session = crear_sesion_http()
+    rules = load_rules()
 
-    try:
-        # Configurar y iniciar el driver
-        driver = configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_dir)
+    def scrape_selenium(url, detener):
+        nonlocal driver
+        if driver is None:
+            driver = configurar_driver(download_dir, chrome_driver_path, user_data_dir, profile_dir, liviano)
+        return scrape_table(driver, url, detener=detener)
 
+    try:
         # Procesar cada URL
-        for url in urls:
+        for url in URLS:
             try:
                 print(f"\nProcesando URL: {url}")
-                data = scrape_table(driver, url)
-                if data:
-                    save_to_csv(data, url, download_dir)
-                else:
-                    print(f"No se pudieron obtener datos para: {url}")
+                rule = rules.get(url.split('/')[-1], DEFAULT_RULE)
+                scrape_url(url, download_dir, clean_dir, incremental, session, scrape_selenium, rule)
             except Exception as e:
                 print(f"Error procesando {url}: {str(e)}")
 
@@ -135,8 +358,19 @@ def main():
     
     finally:
         # Cerrar el driver
-        if 'driver' in locals():
+        if driver is not None:
             driver.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Descarga las tablas de indicadores económicos de investing.com")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Solo pide las publicaciones nuevas y actualiza output/ y clean_data/ en su lugar")
+    parser.add_argument('--navegador-completo', action='store_true',
+                        help="Abrir Chrome con ventana y cargando imágenes, fuentes y publicidad")
+    parser.add_argument('--metrics', help="Archivo JSON lines donde registrar los tiempos de cada etapa")
+    parser.add_argument('--prometheus', help="Archivo de texto Prometheus con el resumen de las métricas")
+    args = parser.parse_args()
+
+    metrics.configure(args.metrics, args.prometheus)
+    main(incremental=args.incremental, liviano=not args.navegador_completo)
+    metrics.write_prometheus()
\ No newline at end of file
@@ -0,0 +1,87 @@
+import io
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# clean_data.py se importa como módulo hermano, igual que lo hace scrape_investing.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from clean_data import DATE_FORMATS, clean_dataframe, clean_dataframe_legacy, verificar_paridad
+
+# Una fila por caso: formatos de DATE_FORMATS, con y sin mes de reporte, fecha
+# no reconocida, porcentajes enteros, vacíos y textos no numéricos
+CSV = '''Release Date,Time,Actual,Forecast,Previous
+"Dec 06, 2024 (Nov)",11:00,5%,6%,4.5%
+"Dec 06, 2024",11:00,-0.2%,,0.3%
+2024-12-06,11:00,5%, ,6%
+06/12/2024 (Q3),11:00,abc,1.2%,-1%
+"December 06, 2024 (Nov)",11:00,,5%,N/A
+No es fecha,11:00,7%,0.5%,
+"Jan 15, 2025 (Dec)",,10%,-3%,2%
+'''
+
+def leer(**kwargs):
+    return pd.read_csv(io.StringIO(CSV), **kwargs)
+
+def assert_mismo_csv(df):
+    assert clean_dataframe(df).to_csv(index=False) == clean_dataframe_legacy(df).to_csv(index=False)
+
+@pytest.mark.parametrize('opciones', [{}, {'dtype': str, 'keep_default_na': False}], ids=['por_defecto', 'texto'])
+def test_paridad_lectura(opciones):
+    assert_mismo_csv(leer(**opciones))
+
+def test_paridad_porcentajes_enteros():
+    df = pd.DataFrame({
+        'Release Date': ['Dec 06, 2024 (Nov)', 'Nov 06, 2024 (Oct)'],
+        'Time': ['11:00', '11:00'],
+        'Actual': ['5%', '6%'],
+        'Forecast': [5, 6],
+        'Previous': [np.nan, 4],
+    })
+
+    resultado = clean_dataframe(df)
+
+    assert resultado['Actual%'].tolist() == [5.0, 6.0]
+    assert resultado['Forecast%'].dtype == np.float64
+    assert resultado.to_csv(index=False) == clean_dataframe_legacy(df).to_csv(index=False)
+    assert '5.0,5.0,' in resultado.to_csv(index=False)
+
+def test_paridad_vacios_y_no_numericos():
+    df = pd.DataFrame({
+        'Release Date': ['Dec 06, 2024', 'Dec 05, 2024', 'Dec 04, 2024', 'Dec 03, 2024'],
+        'Time': ['11:00', '11:00', '11:00', '11:00'],
+        'Actual': ['', np.nan, 'abc', ' '],
+        'Forecast': [np.nan, '', '1.5%', 'nan'],
+        'Previous': ['-', '2%', None, '%'],
+    })
+    assert_mismo_csv(df)
+
+@pytest.mark.parametrize('formato', DATE_FORMATS)
+@pytest.mark.parametrize('mes', ['', ' (Nov)'])
+def test_paridad_formatos_de_fecha(formato, mes):
+    fecha = datetime(2024, 12, 6).strftime(formato)
+    df = pd.DataFrame({'Release Date': [fecha + mes], 'Time': ['11:00'],
+                       'Actual': ['1%'], 'Forecast': ['2%'], 'Previous': ['3%']})
+
+    resultado = clean_dataframe(df)
+
+    assert resultado['Release Date'].tolist() == ['06/12/2024']
+    assert resultado['Report Month'].tolist() == [mes.strip(' ()')]
+    assert_mismo_csv(df)
+
+def test_paridad_fecha_no_reconocida():
+    df = pd.DataFrame({'Release Date': ['No es fecha (Nov)', np.nan], 'Time': ['11:00', '11:00'],
+                       'Actual': ['1%', '2%'], 'Forecast': ['', ''], 'Previous': ['3%', '4%']})
+
+    resultado = clean_dataframe(df)
+
+    assert resultado['Release Date'].tolist()[0] == 'No es fecha (Nov)'
+    assert resultado['Report Month'].tolist() == ['', '']
+    assert_mismo_csv(df)
+
+def test_verificar_paridad():
+    assert verificar_paridad(leer(), 'CSV')
+    assert verificar_paridad(leer(dtype=str, keep_default_na=False), 'CSV')
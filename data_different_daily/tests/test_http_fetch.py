@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("lxml")
+
+# http_fetch.py se importa como módulo hermano, igual que lo hace scrape_investing.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_fetch import (MORE_HISTORY_URL, FetchError, _parametros_mas_historia, parsear_mas_historia,
+                        parsear_tabla, scrape_table_http)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+URL = "https://www.investing.com/economic-calendar/colombian-gdp-1151"
+
+FILAS_PAGINA = [
+    ["Nov 18, 2024 (Q3)", "11:00", "0.2%", "0.3%", "0.5%"],
+    ["Aug 15, 2024 (Q2)", "11:00", "0.1%", " ", "1.2%"],
+    ["May 15, 2024 (Q1)", "11:00", "1.1%", "1.2%", "1.0%"],
+    ["Feb 15, 2024 (Q4)", "11:00", "-0.2%", "0.5%", "0.3%"],
+]
+
+FILAS_MAS_HISTORIA = [
+    ["Nov 15, 2023 (Q3)", "11:00", "0.2%", "0.6%", "-1.0%"],
+    ["Aug 15, 2023 (Q2)", "11:00", "-1.0%", " ", "1.4%"],
+    ["May 15, 2023 (Q1)", "11:00", "1.4%", "0.8%", "0.4%"],
+]
+
+def leer_pagina():
+    with open(os.path.join(FIXTURES, "colombian-gdp-1151.html"), encoding="utf-8") as f:
+        return f.read()
+
+def leer_mas_historia():
+    with open(os.path.join(FIXTURES, "colombian-gdp-1151_more-history.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+class RespuestaFalsa:
+    def __init__(self, texto=None, datos=None):
+        self.text = texto
+        self._datos = datos
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._datos
+
+class SesionFalsa:
+    """
+    Sesión sin red: devuelve la página guardada y las respuestas de "Show more" en orden.
+    """
+    def __init__(self, pagina, paginas_mas_historia):
+        self.pagina = pagina
+        self.paginas_mas_historia = list(paginas_mas_historia)
+        self.posts = []
+
+    def get(self, url, headers=None, timeout=None):
+        return RespuestaFalsa(texto=self.pagina)
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.posts.append((url, data, headers))
+        return RespuestaFalsa(datos=self.paginas_mas_historia.pop(0))
+
+def test_parsear_tabla_filas():
+    datos, formulario, filas = parsear_tabla(leer_pagina())
+
+    assert datos == FILAS_PAGINA
+    assert len(filas) == len(FILAS_PAGINA)
+    assert formulario == {"event_attr_ID": "1151", "is_speech": "0"}
+
+def test_parsear_tabla_sin_tabla():
+    assert parsear_tabla("<html><body><p>Access denied</p></body></html>") == ([], None, [])
+
+def test_parsear_tabla_sin_enlace_show_more():
+    pagina = leer_pagina().replace("ecEvent.moreHistory(1151, this, 0)", "")
+    datos, formulario, filas = parsear_tabla(pagina)
+
+    assert datos == FILAS_PAGINA
+    assert formulario is None
+    assert _parametros_mas_historia(formulario, filas[-1]) is None
+
+def test_parametros_mas_historia_desde_la_pagina():
+    _, formulario, filas = parsear_tabla(leer_pagina())
+
+    assert _parametros_mas_historia(formulario, filas[-1]) == {
+        "eventID": "491707",
+        "event_attr_ID": "1151",
+        "event_timestamp": "2024-02-15 16:00:00",
+        "is_speech": "0",
+    }
+
+def test_parsear_mas_historia():
+    datos, filas, hay_mas = parsear_mas_historia(leer_mas_historia())
+
+    assert datos == FILAS_MAS_HISTORIA
+    assert hay_mas is True
+    assert [fila.get("id") for fila in filas] == [
+        "historicEvent_486630", "historicEvent_482811", "historicEvent_478345"
+    ]
+
+def test_parsear_mas_historia_vacia():
+    assert parsear_mas_historia({"historyRows": "", "hasMoreHistory": "0"}) == ([], [], False)
+
+def test_scrape_table_http_pide_mas_historia_con_la_ultima_fila():
+    pytest.importorskip("requests")
+    ultima = dict(leer_mas_historia(), hasMoreHistory="0")
+    sesion = SesionFalsa(leer_pagina(), [leer_mas_historia(), ultima])
+
+    datos = scrape_table_http(URL, session=sesion)
+
+    assert datos == FILAS_PAGINA + FILAS_MAS_HISTORIA + FILAS_MAS_HISTORIA
+    assert [url for url, _, _ in sesion.posts] == [MORE_HISTORY_URL, MORE_HISTORY_URL]
+    assert [data for _, data, _ in sesion.posts] == [
+        {"eventID": "491707", "event_attr_ID": "1151", "event_timestamp": "2024-02-15 16:00:00", "is_speech": "0"},
+        {"eventID": "478345", "event_attr_ID": "1151", "event_timestamp": "2023-05-15 16:00:00", "is_speech": "0"},
+    ]
+    assert sesion.posts[0][2]["Referer"] == URL
+
+def test_scrape_table_http_detener():
+    pytest.importorskip("requests")
+    sesion = SesionFalsa(leer_pagina(), [leer_mas_historia()])
+
+    datos = scrape_table_http(URL, session=sesion, detener=lambda fecha: "2023" in fecha)
+
+    assert datos == FILAS_PAGINA + FILAS_MAS_HISTORIA
+    assert len(sesion.posts) == 1
+
+def test_scrape_table_http_sin_tabla():
+    pytest.importorskip("requests")
+    sesion = SesionFalsa("<html><body></body></html>", [])
+
+    with pytest.raises(FetchError):
+        scrape_table_http(URL, session=sesion)
@@ -0,0 +1,268 @@
+import os
+import shutil
+import logging
+import pandas as pd
+
+# Formatos de salida soportados y su extensión
+OUTPUT_FORMATS = {
+    'csv': 'csv',
+    'parquet': 'parquet',
+    'feather': 'feather'
+}
+
+# Orden de preferencia al leer una salida existente (los columnares son más rápidos)
+READ_PREFERENCE = ['parquet', 'feather', 'csv']
+
+# Nombre del almacén consolidado dentro del directorio de salida
+STORE_DIRNAME = 'store'
+
+def require_pyarrow():
+    """
+    Verifica que pyarrow esté instalado; es necesario para Parquet, Feather y el almacén.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Las salidas columnares requieren pyarrow: pip install pyarrow")
+
+def parse_formats(value):
+    """
+    Convierte una lista separada por comas ("csv,parquet") en una tupla de formatos válidos.
+
+    Args:
+        value (str): Formatos separados por comas
+
+    Returns:
+        tuple: Formatos validados
+    """
+    formats = tuple(f.strip().lower() for f in value.split(',') if f.strip())
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"Formatos de salida no soportados: {unknown or value}")
+    return formats
+
+def output_path(directory_output, pattern, fmt='csv'):
+    """
+    Devuelve la ruta del archivo _TOTAL de un patrón en el formato indicado.
+    """
+    return os.path.join(directory_output, f"{pattern}_TOTAL.{OUTPUT_FORMATS[fmt]}")
+
+def find_existing_output(directory_output, pattern, formats=('csv',)):
+    """
+    Busca una salida existente del patrón entre los formatos configurados.
+
+    Returns:
+        tuple: (formato, ruta) de la salida preferida o (None, None) si no existe
+    """
+    for fmt in READ_PREFERENCE:
+        if fmt not in formats:
+            continue
+        path = output_path(directory_output, pattern, fmt)
+        if os.path.exists(path):
+            return fmt, path
+    return None, None
+
+def find_newest_output(directory_output, pattern, formats=READ_PREFERENCE):
+    """
+    Busca la salida del patrón escrita más recientemente entre los formatos indicados.
+
+    Si una ejecución posterior solo reescribió uno de los formatos, los demás
+    quedan desactualizados; a igual mtime se usa el orden de READ_PREFERENCE.
+
+    Returns:
+        tuple: (formato, ruta) de la salida más reciente o (None, None) si no existe
+    """
+    newest = (None, None)
+    newest_mtime = None
+    for fmt in READ_PREFERENCE:
+        if fmt not in formats:
+            continue
+        path = output_path(directory_output, pattern, fmt)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        if newest_mtime is None or mtime > newest_mtime:
+            newest, newest_mtime = (fmt, path), mtime
+    return newest
+
+def read_columnar(path, fmt, columns=None):
+    """
+    Lee una salida Parquet o Feather.
+
+    Args:
+        path (str): Ruta del archivo
+        fmt (str): 'parquet' o 'feather'
+        columns (list): Columnas a cargar; None carga todas
+
+    Returns:
+        pandas.DataFrame: Datos del archivo
+    """
+    require_pyarrow()
+    if fmt == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
+
+def write_outputs(df, directory_output, pattern, formats=('csv',)):
+    """
+    Escribe el DataFrame combinado en todos los formatos configurados.
+
+    Cada archivo se escribe en un temporal que luego reemplaza al anterior, para
+    que un lector concurrente (query.py) nunca vea una salida a medio escribir.
+
+    Args:
+        df (pandas.DataFrame): Datos combinados del patrón
+        directory_output (str): Directorio de salida
+        pattern (str): Patrón base de los archivos
+        formats (tuple): Formatos a escribir
+
+    Returns:
+        list: Rutas de los archivos escritos
+    """
+    paths = []
+    for fmt in formats:
+        path = output_path(directory_output, pattern, fmt)
+        tmp_path = f"{path}.tmp"
+        if fmt == 'csv':
+            df.to_csv(tmp_path, index=False)
+        elif fmt == 'parquet':
+            require_pyarrow()
+            df.to_parquet(tmp_path, index=False)
+        else:
+            require_pyarrow()
+            df.reset_index(drop=True).to_feather(tmp_path)
+        os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+def convert_csv_output(csv_path, directory_output, pattern, fmt, block_size=16 * 1024 * 1024):
+    """
+    Convierte un _TOTAL.csv a Parquet o Feather por lotes, sin cargarlo completo en memoria.
+
+    Args:
+        csv_path (str): Ruta del CSV combinado
+        directory_output (str): Directorio de salida
+        pattern (str): Patrón base de los archivos
+        fmt (str): 'parquet' o 'feather'
+        block_size (int): Bytes leídos del CSV por lote
+
+    Returns:
+        str: Ruta del archivo generado
+    """
+    require_pyarrow()
+    import csv
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+
+    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    column_types = {col: pa.float64() for col in header}
+    column_types['Date'] = pa.timestamp('us')
+
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types)
+    )
+    path = output_path(directory_output, pattern, fmt)
+    tmp_path = f"{path}.tmp"
+
+    if fmt == 'parquet':
+        with pq.ParquetWriter(tmp_path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        with pa_ipc.new_file(tmp_path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+    os.replace(tmp_path, path)
+
+    return path
+
+def write_consolidated_store(frames, store_dir):
+    """
+    Escribe un almacén Parquet único con todos los instrumentos particionado por año.
+
+    Las filas quedan ordenadas por (Instrument, Date) dentro de cada partición para
+    que las estadísticas de los row groups permitan filtrar por instrumento. El
+    almacén se genera en un directorio temporal y luego reemplaza al anterior.
+
+    Args:
+        frames (dict): {instrumento: DataFrame combinado}
+        store_dir (str): Directorio del almacén
+
+    Returns:
+        int: Total de filas escritas
+    """
+    require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parts = []
+    for instrument, df in frames.items():
+        part = df.copy()
+        part.insert(0, 'Instrument', instrument)
+        parts.append(part)
+
+    if not parts:
+        logging.warning("No hay instrumentos para escribir en el almacén consolidado")
+        return 0
+
+    store_df = pd.concat(parts, ignore_index=True)
+    store_df['Date'] = pd.to_datetime(store_df['Date'])
+    store_df['Year'] = store_df['Date'].dt.year.astype('int32')
+    store_df = store_df.sort_values(['Year', 'Instrument', 'Date'], kind='mergesort')
+
+    tmp_dir = f"{store_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    table = pa.Table.from_pandas(store_df, preserve_index=False)
+    pq.write_to_dataset(table, tmp_dir, partition_cols=['Year'])
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+
+    logging.info(f"Almacén consolidado escrito en {store_dir}: {len(store_df)} filas, {len(frames)} instrumentos")
+    return len(store_df)
+
+def read_store(store_dir, instruments=None, start=None, end=None, columns=None):
+    """
+    Lee del almacén consolidado solo los instrumentos, fechas y columnas pedidas.
+
+    Args:
+        store_dir (str): Directorio del almacén
+        instruments (list): Instrumentos a cargar; None carga todos
+        start (str): Fecha inicial inclusive (YYYY-MM-DD)
+        end (str): Fecha final inclusive (YYYY-MM-DD)
+        columns (list): Columnas además de Instrument y Date; None carga todas
+
+    Returns:
+        pandas.DataFrame: Filas que cumplen los filtros ordenadas por (Instrument, Date)
+    """
+    require_pyarrow()
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(store_dir, format='parquet', partitioning='hive')
+    conditions = []
+    if instruments:
+        conditions.append(ds.field('Instrument').isin(list(instruments)))
+    if start:
+        start_ts = pd.Timestamp(start)
+        conditions.append(ds.field('Year') >= start_ts.year)
+        conditions.append(ds.field('Date') >= start_ts)
+    if end:
+        end_ts = pd.Timestamp(end)
+        conditions.append(ds.field('Year') <= end_ts.year)
+        conditions.append(ds.field('Date') <= end_ts)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    selected = None
+    if columns:
+        selected = ['Instrument', 'Date'] + [c for c in columns if c not in ('Instrument', 'Date')]
+
+    df = dataset.to_table(columns=selected, filter=expression).to_pandas()
+    return df.sort_values(['Instrument', 'Date'], kind='mergesort').reset_index(drop=True)
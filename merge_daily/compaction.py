@@ -0,0 +1,174 @@
+import os
+import sys
+import shutil
+import logging
+import argparse
+import pandas as pd
+from datetime import datetime
+from csv_merger import (setup_logging, build_directory_index, discover_patterns, find_csv_files, copy_number,
+                        read_and_standardize_csv)
+from conflicts import order_sources, resolve_duplicates, PRECEDENCE_POLICIES
+from segments import segment_dir, is_segment, split_segments, render_segment, write_segment
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+# Subdirectorio por defecto (dentro del directorio de datos) donde se retiran los originales
+COLD_DIRNAME = 'cold'
+
+def retire_files(file_paths, cold_dir, pattern, run_id):
+    """
+    Mueve archivos ya compactados al almacenamiento frío.
+
+    Cada ejecución usa su propio subdirectorio para que una exportación que se
+    vuelva a descargar con el mismo nombre no pise a la retirada antes.
+
+    Args:
+        file_paths (list): Archivos a retirar
+        cold_dir (str): Directorio de almacenamiento frío
+        pattern (str): Patrón de los archivos
+        run_id (str): Identificador de la ejecución (YYYYMMDD_HHMMSS)
+
+    Returns:
+        list: Rutas de destino
+    """
+    target_dir = os.path.join(cold_dir, pattern, run_id)
+    os.makedirs(target_dir, exist_ok=True)
+    targets = []
+    for file_path in file_paths:
+        target = os.path.join(target_dir, os.path.basename(file_path))
+        shutil.move(file_path, target)
+        targets.append(target)
+    return targets
+
+def compact_pattern(directory_data, pattern, cold_dir=None, index=None, precedence='copy', dry_run=False):
+    """
+    Compacta las copias "(N)" de un patrón en segmentos anuales sin solapamiento.
+
+    Combina exportaciones y segmentos existentes con la misma precedencia que
+    merge_csv_files, escribe un segmento sellado por año más un segmento
+    "tail" con el año en curso, y mueve al almacenamiento frío las
+    exportaciones incorporadas y los segmentos reemplazados. Los segmentos
+    cuyo contenido no cambió se conservan sin reescribirse. Las exportaciones
+    que no se pudieron leer quedan en su lugar.
+
+    Args:
+        directory_data (str): Directorio de las exportaciones
+        pattern (str): Patrón base de los archivos
+        cold_dir (str): Directorio de almacenamiento frío; por defecto <data>/cold
+        index (dict): Índice del directorio creado con build_directory_index
+        precedence (str): Política de precedencia entre copias de una misma fecha
+        dry_run (bool): Solo calcular el resultado, sin escribir ni mover archivos
+
+    Returns:
+        dict: Estadísticas de la compactación o None si no hay nada que compactar
+    """
+    cold_dir = cold_dir or os.path.join(directory_data, COLD_DIRNAME)
+    csv_files = find_csv_files(directory_data, pattern, index)
+    exports = [file_path for file_path in csv_files if not is_segment(file_path)]
+    segments = [file_path for file_path in csv_files if is_segment(file_path)]
+    if not exports:
+        logging.info(f"Sin exportaciones nuevas para compactar en '{pattern}'")
+        return None
+
+    ordered = order_sources([(file_path, copy_number(file_path)) for file_path in csv_files], precedence)
+
+    with metrics.timer('compact', pattern) as measurement:
+        dfs = []
+        compacted = []
+        for rank, file_path in enumerate(ordered):
+            try:
+                df = read_and_standardize_csv(file_path)
+            except Exception as e:
+                if is_segment(file_path):
+                    raise
+                logging.error(f"Error en archivo {os.path.basename(file_path)}, no se compacta: {str(e)}")
+                continue
+            dfs.append(df.assign(_rank=rank, _source=os.path.basename(file_path)))
+            if not is_segment(file_path):
+                compacted.append(file_path)
+
+        if not compacted:
+            logging.error(f"No se pudo leer ninguna exportación del patrón '{pattern}'")
+            return None
+
+        combined, conflicts = resolve_duplicates(pd.concat(dfs, ignore_index=True), precedence)
+        planned = [render_segment(kind, part) for kind, part in split_segments(combined)]
+        measurement['rows'] = len(combined)
+
+        existing = {os.path.basename(file_path): file_path for file_path in segments}
+        new_segments = [(name, content) for name, content in planned if name not in existing]
+        obsolete = [file_path for name, file_path in existing.items() if name not in dict(planned)]
+
+        stats = {
+            'pattern': pattern,
+            'exports': len(compacted),
+            'unreadable': len(exports) - len(compacted),
+            'rows': len(combined),
+            'conflicts': len(conflicts),
+            'segments': len(planned),
+            'written': len(new_segments),
+            'retired_segments': len(obsolete),
+            'bytes_before': sum(os.path.getsize(p) for p in compacted + segments),
+            'bytes_after': sum(len(content) for _, content in planned)
+        }
+        measurement['bytes'] = stats['bytes_after']
+
+        if dry_run:
+            return stats
+
+        # Primero se escriben los segmentos nuevos; solo después se retiran los originales
+        directory = segment_dir(directory_data, pattern)
+        for name, content in new_segments:
+            write_segment(directory, name, content)
+
+        run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        retire_files(compacted + obsolete, cold_dir, pattern, run_id)
+
+    logging.info(f"Patrón '{pattern}' compactado: {stats['exports']} exportaciones -> {stats['segments']} segmentos, "
+                 f"{stats['rows']} filas, {stats['bytes_before']} -> {stats['bytes_after']} bytes")
+    return stats
+
+def compact_all(directory_data, patterns=None, cold_dir=None, precedence='copy', dry_run=False):
+    """
+    Compacta todos los patrones del directorio de datos.
+
+    Returns:
+        dict: {patrón: estadísticas o None}
+    """
+    index = build_directory_index(directory_data)
+    results = {}
+    for pattern in patterns or discover_patterns(index):
+        try:
+            results[pattern] = compact_pattern(directory_data, pattern, cold_dir, index, precedence, dry_run)
+        except Exception as e:
+            logging.error(f"Error compactando '{pattern}': {str(e)}")
+            results[pattern] = None
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compacta las copias (N) de cada patrón en segmentos anuales y retira los originales")
+    parser.add_argument('--data', required=True, help="Directorio de las exportaciones")
+    parser.add_argument('--cold', help="Directorio de almacenamiento frío (por defecto <data>/cold)")
+    parser.add_argument('--patterns', nargs='+', help="Patrones a compactar; por defecto todos")
+    parser.add_argument('--precedence', choices=PRECEDENCE_POLICIES, default='copy',
+                        help="Copia que gana ante fechas repetidas: copy (mayor (N)), mtime o complete")
+    parser.add_argument('--simular', action='store_true', help="Mostrar el resultado sin escribir ni mover archivos")
+    parser.add_argument('--metrics', help="Archivo JSON lines donde registrar los tiempos de cada etapa")
+    parser.add_argument('--prometheus', help="Archivo de texto Prometheus con el resumen de las métricas")
+    args = parser.parse_args()
+    metrics.configure(args.metrics, args.prometheus)
+    setup_logging()
+
+    results = compact_all(args.data, args.patterns, args.cold, args.precedence, args.simular)
+    before = after = 0
+    for pattern, stats in results.items():
+        if stats is None:
+            continue
+        before += stats['bytes_before']
+        after += stats['bytes_after']
+        print(f"{pattern}: {stats['exports']} exportaciones -> {stats['segments']} segmentos "
+              f"({stats['written']} nuevos), {stats['rows']} filas")
+    print(f"\nTamaño: {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB")
+    metrics.write_prometheus()
@@ -0,0 +1,180 @@
+import os
+import logging
+import pandas as pd
+
+# Políticas de precedencia entre copias de una misma fecha
+PRECEDENCE_POLICIES = ('copy', 'mtime', 'complete')
+
+# Columnas comparadas para detectar copias que no coinciden
+COMPARED_COLUMNS = ['Close', 'Open', 'High', 'Low']
+
+# Columnas del reporte de conflictos
+REPORT_COLUMNS = ['Date', 'Column', 'Kept', 'Min', 'Max', 'Copies', 'Source']
+
+# Subdirectorio de la salida donde se guardan los reportes
+CONFLICTS_DIRNAME = 'conflicts'
+
+def order_sources(sources, precedence='copy'):
+    """
+    Ordena los archivos de un patrón de mayor a menor prioridad.
+
+    - 'copy' y 'complete': la copia más reciente (mayor número "(N)") primero.
+    - 'mtime': el archivo modificado más recientemente primero.
+
+    Los empates se resuelven por número de copia y nombre, de modo que el orden
+    no depende del orden en que el sistema de archivos lista el directorio.
+
+    Args:
+        sources (list): Tuplas (ruta, número de copia)
+        precedence (str): Política de precedencia
+
+    Returns:
+        list: Rutas ordenadas por prioridad
+    """
+    if precedence not in PRECEDENCE_POLICIES:
+        raise ValueError(f"Política de precedencia no soportada: {precedence}")
+
+    def copy_key(item):
+        path, copy_number = item
+        return (-copy_number, os.path.basename(path))
+
+    if precedence == 'mtime':
+        key = lambda item: (-os.stat(item[0]).st_mtime,) + copy_key(item)
+    else:
+        key = copy_key
+
+    return [path for path, _ in sorted(sources, key=key)]
+
+def resolve_duplicates(df, precedence='copy'):
+    """
+    Elimina fechas repetidas de forma determinista y genera el reporte de conflictos.
+
+    El DataFrame debe traer las columnas auxiliares '_rank' (0 = archivo de mayor
+    prioridad) y '_source' (nombre del archivo). Con 'complete' gana la fila con
+    menos valores vacíos y, ante empate, la de mayor prioridad.
+
+    Args:
+        df (pandas.DataFrame): Filas concatenadas de todos los archivos
+        precedence (str): Política de precedencia
+
+    Returns:
+        tuple: (DataFrame sin duplicados ordenado por fecha descendente, reporte)
+    """
+    sort_columns = ['Date']
+    if precedence == 'complete':
+        value_columns = [c for c in df.columns if c not in ('Date', '_rank', '_source')]
+        df = df.assign(_missing=df[value_columns].isna().sum(axis=1))
+        sort_columns.append('_missing')
+    sort_columns.append('_rank')
+
+    df = df.sort_values(sort_columns, kind='mergesort')
+    report = conflict_report(df)
+
+    df = df.drop_duplicates(subset=['Date'], keep='first')
+    df = df.drop(columns=[c for c in ('_rank', '_source', '_missing') if c in df.columns])
+    df = df.sort_values('Date', ascending=False, kind='mergesort').reset_index(drop=True)
+
+    return df, report
+
+def conflict_report(df):
+    """
+    Lista las fechas en que las copias no coinciden en Close/Open/High/Low.
+
+    Se espera el DataFrame ya ordenado de forma que la primera fila de cada fecha
+    sea la que se conserva.
+
+    Returns:
+        pandas.DataFrame: Una fila por (fecha, columna) en conflicto
+    """
+    dups = df[df.duplicated(subset=['Date'], keep=False)]
+    columns = [c for c in COMPARED_COLUMNS if c in dups.columns]
+    if dups.empty or not columns:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    grouped = dups.groupby('Date', sort=True)
+    mins = grouped[columns].min()
+    maxs = grouped[columns].max()
+    copies = grouped.size()
+    kept = dups.drop_duplicates(subset=['Date'], keep='first').set_index('Date')
+
+    parts = []
+    for col in columns:
+        conflicted = maxs.index[(maxs[col] > mins[col]).to_numpy()]
+        if conflicted.empty:
+            continue
+        parts.append(pd.DataFrame({
+            'Date': conflicted,
+            'Column': col,
+            'Kept': kept.loc[conflicted, col].to_numpy(),
+            'Min': mins.loc[conflicted, col].to_numpy(),
+            'Max': maxs.loc[conflicted, col].to_numpy(),
+            'Copies': copies.loc[conflicted].to_numpy(),
+            'Source': kept.loc[conflicted, '_source'].to_numpy() if '_source' in kept.columns else None
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    report = pd.concat(parts, ignore_index=True)
+    report['Column'] = pd.Categorical(report['Column'], categories=columns)
+    report = report.sort_values(['Date', 'Column'], ascending=[False, True], kind='mergesort')
+    report['Column'] = report['Column'].astype(str)
+    return report[REPORT_COLUMNS].reset_index(drop=True)
+
+def group_conflicts(date, rows, columns, sources):
+    """
+    Evalúa un grupo de filas con la misma fecha durante el merge en streaming.
+
+    Args:
+        date (str): Fecha del grupo (YYYY-MM-DD)
+        rows (list): Filas (prioridad, valores) con la fila conservada primero
+        columns (list): Nombres de las columnas de valores (sin 'Date')
+        sources (list): Nombre del archivo de cada prioridad
+
+    Returns:
+        list: Registros del reporte con el mismo formato que conflict_report
+    """
+    records = []
+    for col in COMPARED_COLUMNS:
+        if col not in columns:
+            continue
+        position = columns.index(col)
+        values = [float(values[position]) for _, values in rows if values[position] != '']
+        if len(values) < 2 or min(values) == max(values):
+            continue
+        kept_priority, kept_values = rows[0]
+        kept = float(kept_values[position]) if kept_values[position] != '' else None
+        records.append({
+            'Date': date,
+            'Column': col,
+            'Kept': kept,
+            'Min': min(values),
+            'Max': max(values),
+            'Copies': len(rows),
+            'Source': sources[kept_priority]
+        })
+    return records
+
+def write_conflict_report(report, directory_output, pattern):
+    """
+    Guarda el reporte de conflictos del patrón o elimina el anterior si ya no hay conflictos.
+
+    Args:
+        report (pandas.DataFrame): Reporte generado por resolve_duplicates
+        directory_output (str): Directorio de salida
+        pattern (str): Patrón base de los archivos
+
+    Returns:
+        str: Ruta del reporte o None si no hubo conflictos
+    """
+    path = os.path.join(directory_output, CONFLICTS_DIRNAME, f"{pattern}_conflicts.csv")
+
+    if report is None or len(report) == 0:
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame(report, columns=REPORT_COLUMNS).to_csv(path, index=False)
+    logging.warning(f"{len(report)} conflictos entre copias para '{pattern}', ver {path}")
+    return path
@@ -1,56 +1,133 @@
 import os
+import sys
 import pandas as pd
 import logging
 from datetime import datetime
 import re
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener
+from parsing import COLUMN_MAPPING, detect_locale, parse_numeric_columns, read_export, sniff_header
+from columnar_store import (find_existing_output, read_columnar, write_outputs, write_consolidated_store, parse_formats,
+                            require_pyarrow, convert_csv_output, output_path, STORE_DIRNAME)
+from streaming_merge import stream_merge, CANONICAL_COLUMNS
+from timeseries import write_series_store, SERIES_DIRNAME
+from segments import list_segments, is_segment, SEGMENT_COPY
+from derived import update_derived, derived_path
+from validation import QualityValidator, write_validation_report, MAX_GAP_DAYS
+from conflicts import order_sources, resolve_duplicates, write_conflict_report, PRECEDENCE_POLICIES
+from manifest import load_manifest, save_manifest, classify_files, record_file, record_file_stats, file_hash
+
+# metrics.py es compartido por todas las etapas y está en la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
 
 # Configuración del logging
 def setup_logging():
     """Configura el sistema de logging con formato timestamp y nivel de detalle."""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+    os.makedirs(log_dir, exist_ok=True)
     logging.basicConfig(
-        filename=f'logs\csv_merger_{timestamp}.log',
+        filename=os.path.join(log_dir, f'csv_merger_{timestamp}.log'),
+        encoding='utf-8',
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
 
-# Mapeo de columnas según especificaciones
-COLUMN_MAPPING = {
-    'Fecha': 'Date',
-    'Date': 'Date',
-    'Último': 'Close',
-    'Ultimo': 'Close',
-    'Price': 'Close',
-    'Cierre': 'Close',
-    'Apertura': 'Open',
-    'Open': 'Open',
-    'Máximo': 'High',
-    'High': 'High',
-    'Mínimo': 'Low',
-    'Low': 'Low',
-    'Vol.': 'Volume',
-    '% var.': 'Change%',
-    'Change %': 'Change%'
-}
-
-def find_csv_files(directory, pattern):
+# Patrones con al menos esta cantidad de archivos reparten la lectura de sus
+# archivos entre los procesos del pool en lugar de procesarse en un solo worker
+LARGE_PATTERN_FILES = 20
+
+# Filas por chunk al combinar en modo streaming
+STREAM_CHUNKSIZE = 100000
+
+# Nombre de archivo exportado: "<patrón>.csv" o "<patrón> (N).csv"
+CSV_FILENAME_REGEX = re.compile(r"^(?P<base>.+?)(?:\s*\((?P<copy>\d+)\))?\.csv$")
+
+def build_directory_index(directory):
+    """
+    Indexa el directorio en una sola pasada agrupando los archivos por patrón base.
+    
+    Args:
+        directory (str): Ruta del directorio a indexar
+    
+    Returns:
+        dict: {patrón: [(número de copia, ruta), ...]} ordenado por número de copia.
+              El archivo sin "(N)" tiene número de copia 0 y los segmentos
+              compactados de segments/<patrón>/ tienen SEGMENT_COPY.
+    """
+    index = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            match = CSV_FILENAME_REGEX.match(entry.name)
+            if not match:
+                continue
+            copy_number = int(match.group('copy')) if match.group('copy') else 0
+            index.setdefault(match.group('base'), []).append((copy_number, entry.path))
+    
+    # Los segmentos compactados entran en su patrón con la menor prioridad
+    for pattern, paths in list_segments(directory).items():
+        index.setdefault(pattern, []).extend((SEGMENT_COPY, path) for path in paths)
+    
+    for files in index.values():
+        files.sort()
+    
+    logging.info(f"Directorio indexado: {sum(len(f) for f in index.values())} archivos en {len(index)} patrones")
+    return index
+
+def copy_number(file_path):
+    """
+    Devuelve el número de copia "(N)" de un archivo exportado (0 si no tiene).
+    """
+    if is_segment(file_path):
+        return SEGMENT_COPY
+    match = CSV_FILENAME_REGEX.match(os.path.basename(file_path))
+    return int(match.group('copy')) if match and match.group('copy') else 0
+
+def discover_patterns(index):
+    """
+    Devuelve la lista ordenada de patrones encontrados en el índice.
+    """
+    return sorted(index)
+
+def find_unmatched_files(index, patterns):
+    """
+    Devuelve los archivos del índice que no corresponden a ningún patrón configurado.
+    
+    Args:
+        index (dict): Índice creado con build_directory_index
+        patterns (list): Lista de patrones configurados
+    
+    Returns:
+        list: Rutas de los archivos sin patrón
+    """
+    configured = set(patterns)
+    return sorted(path for base, files in index.items() if base not in configured for _, path in files)
+
+def find_csv_files(directory, pattern, index=None):
     """
     Encuentra archivos CSV que coincidan con el patrón especificado.
     
     Args:
         directory (str): Ruta del directorio a buscar
         pattern (str): Patrón base para buscar archivos
+        index (dict): Índice del directorio ya construido; si no se recibe se
+            indexa el directorio
     
     Returns:
-        list: Lista de rutas de archivos CSV encontrados
+        list: Lista de rutas de archivos CSV encontrados, ordenada por número de copia
     """
-    csv_files = []
-    pattern_regex = re.compile(f"{re.escape(pattern)}(?:\s*\(\d+\))?.csv$")
+    if index is None:
+        index = build_directory_index(directory)
     
-    for file in os.listdir(directory):
-        if pattern_regex.match(file):
-            csv_files.append(os.path.join(directory, file))
-            logging.info(f"Archivo encontrado: {file}")
+    csv_files = []
+    for _, file_path in index.get(pattern, []):
+        csv_files.append(file_path)
+        logging.info(f"Archivo encontrado: {os.path.basename(file_path)}")
     
     return csv_files
 
@@ -62,92 +139,251 @@ def read_and_standardize_csv(file_path):
         file_path (str): Ruta del archivo CSV a procesar
     
     Returns:
-        pandas.DataFrame: DataFrame con columnas estandarizadas
+        pandas.DataFrame: DataFrame con columnas estandarizadas y columnas
+            numéricas en float64
     """
     try:
-        # Leer CSV con manejo de fechas
-        df = pd.read_csv(file_path, parse_dates=['Date'])
+        # Leer CSV con el esquema y el formato de fecha del idioma detectado en el encabezado
+        df, locale = read_export(file_path)
         
         # Registrar columnas originales para debugging
-        original_columns = df.columns.tolist()
-        logging.info(f"Columnas originales en {os.path.basename(file_path)}: {original_columns}")
-        
-        # Renombrar columnas según el mapeo
-        renamed_columns = {}
-        for col in df.columns:
-            if col in COLUMN_MAPPING:
-                renamed_columns[col] = COLUMN_MAPPING[col]
-        
-        df = df.rename(columns=renamed_columns)
-        
-        # Verificar columnas requeridas
-        required_columns = {'Date', 'Close'}
-        missing_columns = required_columns - set(df.columns)
+        logging.info(f"Columnas originales en {os.path.basename(file_path)}: {df.columns.tolist()}")
         
-        if missing_columns:
-            logging.warning(f"Columnas faltantes en {os.path.basename(file_path)}: {missing_columns}")
-            raise ValueError(f"Faltan columnas requeridas: {missing_columns}")
-        
-        return df
+        return standardize_dataframe(df, file_path, locale)
+    
+    except Exception as e:
+        logging.error(f"Error procesando {os.path.basename(file_path)}: {str(e)}")
+        raise
+
+def read_and_standardize_csv_chunks(file_path, chunksize=STREAM_CHUNKSIZE):
+    """
+    Lee y estandariza un archivo CSV por bloques de filas para el modo streaming.
+    
+    Args:
+        file_path (str): Ruta del archivo CSV a procesar
+        chunksize (int): Filas por bloque
+    
+    Yields:
+        pandas.DataFrame: Bloques con columnas estandarizadas y 'Date' como datetime
+    """
+    try:
+        reader, locale = read_export(file_path, chunksize=chunksize)
+        for i, chunk in enumerate(reader):
+            if i == 0:
+                logging.info(f"Columnas originales en {os.path.basename(file_path)}: {chunk.columns.tolist()}")
+            yield standardize_dataframe(chunk, file_path, locale)
     
     except Exception as e:
         logging.error(f"Error procesando {os.path.basename(file_path)}: {str(e)}")
         raise
 
-def merge_csv_files(directory_data, directory_output, pattern):
+def standardize_dataframe(df, file_path, locale=None):
+    """
+    Renombra las columnas según el mapeo, valida las requeridas y convierte las numéricas.
+    
+    Args:
+        df (pandas.DataFrame): Datos leídos con los encabezados originales
+        file_path (str): Ruta del archivo de origen (para los mensajes)
+        locale (str): Idioma de la exportación; si no se indica se detecta por los encabezados
+    
+    Returns:
+        pandas.DataFrame: DataFrame con columnas estandarizadas
+    """
+    # Detectar el idioma de la exportación antes de renombrar
+    locale = locale or detect_locale(df.columns)
+    
+    # Renombrar columnas según el mapeo
+    renamed_columns = {}
+    for col in df.columns:
+        if col in COLUMN_MAPPING:
+            renamed_columns[col] = COLUMN_MAPPING[col]
+    
+    df = df.rename(columns=renamed_columns)
+    
+    # Verificar columnas requeridas
+    required_columns = {'Date', 'Close'}
+    missing_columns = required_columns - set(df.columns)
+    
+    if missing_columns:
+        logging.warning(f"Columnas faltantes en {os.path.basename(file_path)}: {missing_columns}")
+        raise ValueError(f"Faltan columnas requeridas: {missing_columns}")
+    
+    # Convertir precios, porcentajes y volumen a float64
+    return parse_numeric_columns(df, locale)
+
+def _read_file_task(file_path):
+    """
+    Lee un archivo dentro de un proceso del pool y devuelve (DataFrame, error).
+    """
+    match = CSV_FILENAME_REGEX.match(os.path.basename(file_path))
+    pattern = match.group('base') if match else os.path.basename(file_path)
+    try:
+        with metrics.timer('parse', pattern, file=os.path.basename(file_path)) as measurement:
+            df = read_and_standardize_csv(file_path)
+            measurement['rows'] = len(df)
+            measurement['bytes'] = metrics.file_size(file_path)
+        return df, None
+    except Exception as e:
+        return None, str(e)
+
+def read_output(directory_output, pattern, formats=('csv',)):
+    """
+    Lee la salida combinada existente de un patrón en el formato más rápido disponible.
+    
+    Args:
+        directory_output (str): Directorio donde se guardan los archivos _TOTAL
+        pattern (str): Patrón base de los archivos
+        formats (tuple): Formatos configurados para la salida
+    
+    Returns:
+        pandas.DataFrame: Datos combinados o None si no existe salida
+    """
+    fmt, path = find_existing_output(directory_output, pattern, formats)
+    if fmt is None:
+        return None
+    if fmt == 'csv':
+        return read_and_standardize_csv(path)
+    return read_columnar(path, fmt)
+
+def merge_csv_files(directory_data, directory_output, pattern, incremental=False, executor=None, index=None,
+                    formats=('csv',), streaming=False, chunksize=STREAM_CHUNKSIZE, precedence='copy', derived=False,
+                    validate=True, max_gap=MAX_GAP_DAYS):
     """
     Función principal para combinar archivos CSV.
     
     Args:
         directory (str): Directorio donde se encuentran los archivos
         pattern (str): Patrón base para identificar los archivos
+        incremental (bool): Si es True solo se procesan los archivos nuevos o
+            modificados según el manifiesto y se combinan con el _TOTAL existente
+        executor (concurrent.futures.Executor): Pool opcional para leer los
+            archivos del patrón en paralelo
+        index (dict): Índice del directorio creado con build_directory_index
+        formats (tuple): Formatos de salida ('csv', 'parquet', 'feather')
+        streaming (bool): Combinar por chunks con merge externo y memoria acotada
+        chunksize (int): Filas por chunk en modo streaming
+        precedence (str): Qué copia gana ante fechas repetidas: 'copy' (mayor
+            número "(N)"), 'mtime' (más reciente) o 'complete' (fila más completa)
+        derived (bool): Actualizar las series derivadas (_DERIVED.csv) del patrón
+        validate (bool): Validar la salida combinada y escribir output/validation/<patrón>_validation.json
+        max_gap (int): Días hábiles faltantes seguidos a partir de los cuales se reporta un hueco
     """
     logging.info(f"Iniciando proceso de combinación de archivos CSV para patrón '{pattern}' en {directory_data}")
     
     try:
         # Encontrar archivos CSV
-        csv_files = find_csv_files(directory_data, pattern)
+        csv_files = find_csv_files(directory_data, pattern, index)
         if not csv_files:
             logging.warning(f"No se encontraron archivos CSV con el patrón '{pattern}'")
             return
         
+        # Determinar qué archivos hay que procesar según el manifiesto
+        manifest = load_manifest(directory_output, pattern)
+        pending, unchanged, removed = classify_files(csv_files, manifest)
+        
+        # En streaming la salida previa se vuelve a leer como CSV
+        existing_formats = ('csv',) if streaming else formats
+        if incremental and find_existing_output(directory_output, pattern, existing_formats)[0] is None:
+            logging.info(f"No existe salida {pattern}_TOTAL, se realizará una combinación completa")
+            incremental = False
+        elif incremental and removed:
+            logging.info(f"Archivos eliminados desde la última ejecución {removed}, se realizará una combinación completa")
+            incremental = False
+        elif incremental and any(os.path.basename(file_path) in manifest['files'] for file_path, _ in pending):
+            # Las filas que se quitaron de un archivo modificado seguirían en el _TOTAL existente
+            modified = [os.path.basename(file_path) for file_path, _ in pending
+                        if os.path.basename(file_path) in manifest['files']]
+            logging.info(f"Archivos modificados desde la última ejecución {modified}, se realizará una combinación completa")
+            incremental = False
+        
+        if incremental:
+            if not pending:
+                logging.info(f"Sin cambios para '{pattern}': {len(unchanged)} archivos ya procesados")
+                save_manifest(directory_output, pattern, manifest)
+                if derived and not os.path.exists(derived_path(directory_output, pattern)):
+                    _update_derived(read_output(directory_output, pattern, existing_formats), directory_output, pattern)
+                return True
+            logging.info(f"Modo incremental: {len(pending)} archivos nuevos o modificados, {len(unchanged)} sin cambios")
+        else:
+            # En modo completo se reprocesan todos los archivos y se reinicia el manifiesto
+            hashes = dict(pending)
+            pending = [(file_path, hashes.get(file_path) or file_hash(file_path)) for file_path in csv_files]
+            manifest = {'pattern': pattern, 'files': {}}
+        
+        # Ordenar los archivos de mayor a menor prioridad
+        hashes = dict(pending)
+        # El índice puede traer números de copia propios (por ejemplo, el año de cada ventana descargada)
+        copies = {file_path: copy for copy, file_path in index.get(pattern, [])} if index is not None else {}
+        ordered = order_sources([(file_path, copies.get(file_path, copy_number(file_path))) for file_path in hashes],
+                                precedence)
+        pending = [(file_path, hashes[file_path]) for file_path in ordered]
+        
+        if streaming:
+            validator = QualityValidator(pattern, max_gap) if validate else None
+            return _merge_streaming(directory_output, pattern, pending, incremental, manifest, formats, chunksize,
+                                    precedence, derived, validator)
+        
         # Lista para almacenar los DataFrames procesados
         dfs = []
         
-        # Procesar cada archivo
-        for file_path in csv_files:
-            try:
-                df = read_and_standardize_csv(file_path)
-                dfs.append(df)
-                logging.info(f"Archivo procesado exitosamente: {os.path.basename(file_path)}")
-            except Exception as e:
-                logging.error(f"Error en archivo {os.path.basename(file_path)}: {str(e)}")
+        # Procesar cada archivo (en el pool si se recibió uno)
+        file_paths = [file_path for file_path, _ in pending]
+        if executor is not None and len(file_paths) > 1:
+            results = executor.map(_read_file_task, file_paths)
+        else:
+            results = map(_read_file_task, file_paths)
+        
+        for rank, ((file_path, digest), (df, error)) in enumerate(zip(pending, results)):
+            if error is not None:
+                logging.error(f"Error en archivo {os.path.basename(file_path)}: {error}")
                 continue
+            dfs.append(df.assign(_rank=rank, _source=os.path.basename(file_path)))
+            record_file(manifest, file_path, digest, df)
+            logging.info(f"Archivo procesado exitosamente: {os.path.basename(file_path)}")
         
         if not dfs:
             logging.error(f"No se pudo procesar ningún archivo correctamente para el patrón '{pattern}'")
             return
         
+        # En modo incremental los datos nuevos tienen prioridad sobre el _TOTAL existente
+        if incremental:
+            existing_df = read_output(directory_output, pattern, formats)
+            dfs.append(existing_df.assign(_rank=len(pending), _source=f"{pattern}_TOTAL"))
+        
         # Combinar todos los DataFrames
         combined_df = pd.concat(dfs, ignore_index=True)
         
-        # Eliminar duplicados basados en la fecha
-        combined_df = combined_df.drop_duplicates(subset=['Date'], keep='first')
+        # Eliminar duplicados según la precedencia y ordenar por fecha descendente
+        with metrics.timer('dedup', pattern) as measurement:
+            measurement['rows'] = len(combined_df)
+            combined_df, conflicts = resolve_duplicates(combined_df, precedence)
         
-        # Ordenar por fecha
-        combined_df = combined_df.sort_values('Date', ascending=False)
+        # Validar sobre los datos ya cargados, sin volver a leer la salida
+        if validate:
+            with metrics.timer('validate', pattern) as measurement:
+                validator = QualityValidator(pattern, max_gap)
+                validator.update(combined_df)
+                validator.add_conflicts(conflicts)
+                quality = validator.report()
+                measurement['rows'] = quality['rows']
         
-        # Generar nombre del archivo de salida
-        output_filename = f"{pattern}_TOTAL.csv"
-        output_path = os.path.join(directory_output, output_filename)
-        
-        # Guardar resultado
-        combined_df.to_csv(output_path, index=False)
-        logging.info(f"Archivo combinado guardado exitosamente: {output_filename}")
+        # Guardar resultado en los formatos configurados
+        with metrics.timer('write', pattern) as measurement:
+            written = write_outputs(combined_df, directory_output, pattern, formats)
+            measurement['rows'] = len(combined_df)
+            measurement['bytes'] = sum(metrics.file_size(path) or 0 for path in written)
+        write_conflict_report(conflicts, directory_output, pattern)
+        if validate:
+            write_validation_report(quality, directory_output, pattern)
+        save_manifest(directory_output, pattern, manifest)
+        if derived:
+            _update_derived(combined_df, directory_output, pattern)
+        for path in written:
+            logging.info(f"Archivo combinado guardado exitosamente: {os.path.basename(path)}")
         
         # Registrar estadísticas finales
         logging.info(f"Estadísticas finales para {pattern}:")
-        logging.info(f"- Archivos procesados: {len(csv_files)}")
+        logging.info(f"- Archivos procesados: {len(dfs) - 1 if incremental else len(csv_files)}")
         logging.info(f"- Total de registros: {len(combined_df)}")
         logging.info(f"- Columnas en archivo final: {combined_df.columns.tolist()}")
         
@@ -157,29 +393,222 @@ def merge_csv_files(directory_data, directory_output, pattern):
         logging.error(f"Error en el proceso de combinación para '{pattern}': {str(e)}")
         return False
 
-def process_all_patterns(directory_data, directory_output, patterns):
+def _update_derived(df, directory_output, pattern):
+    """
+    Actualiza las series derivadas del patrón registrando la métrica 'derived'.
+    """
+    with metrics.timer('derived', pattern) as measurement:
+        measurement['rows'] = update_derived(df, directory_output, pattern)
+
+def _streaming_columns(sources):
+    """
+    Columnas canónicas presentes en alguno de los archivos, leyendo solo sus encabezados.
+
+    Así la salida en streaming tiene las mismas columnas que la combinación en
+    memoria (por ejemplo, sin Volume en los rendimientos de bonos).
+    """
+    present = set()
+    for file_path in sources:
+        try:
+            present.update(COLUMN_MAPPING.get(col, col) for col in sniff_header(file_path))
+        except (OSError, UnicodeDecodeError):
+            continue
+    return [col for col in CANONICAL_COLUMNS if col in present]
+
+def _merge_streaming(directory_output, pattern, pending, incremental, manifest, formats, chunksize, precedence,
+                     derived=False, validator=None):
+    """
+    Combina los archivos pendientes de un patrón en modo streaming.
+    
+    La salida CSV se escribe por bloques; los formatos columnares se generan
+    después convirtiendo ese CSV por lotes. En modo incremental el _TOTAL.csv
+    existente entra al merge con la menor prioridad.
+    """
+    sources = [file_path for file_path, _ in pending]
+    csv_path = output_path(directory_output, pattern, 'csv')
+    if incremental:
+        sources.append(csv_path)
+    
+    def read_chunks(file_path):
+        try:
+            yield from read_and_standardize_csv_chunks(file_path, chunksize)
+        except Exception as e:
+            if file_path == csv_path:
+                raise
+            logging.error(f"Error en archivo {os.path.basename(file_path)}: {str(e)}")
+    
+    with metrics.timer('stream_merge', pattern) as measurement:
+        total_rows, stats, conflicts = stream_merge(sources, read_chunks, csv_path, _streaming_columns(sources),
+                                                    tmp_dir=directory_output, precedence=precedence,
+                                                    validator=validator)
+        measurement['rows'] = total_rows
+        measurement['bytes'] = metrics.file_size(csv_path)
+    if not total_rows:
+        logging.error(f"No se pudo procesar ningún archivo correctamente para el patrón '{pattern}'")
+        return
+    
+    for file_path, digest in pending:
+        file_stats = stats.get(file_path)
+        if file_stats and file_stats['rows']:
+            record_file_stats(manifest, file_path, digest, **file_stats)
+            logging.info(f"Archivo procesado exitosamente: {os.path.basename(file_path)}")
+    
+    # Las series derivadas solo necesitan Date y Close de la salida recién escrita
+    if derived:
+        _update_derived(pd.read_csv(csv_path, usecols=['Date', 'Close']), directory_output, pattern)
+    
+    for fmt in formats:
+        if fmt != 'csv':
+            convert_csv_output(csv_path, directory_output, pattern, fmt)
+    if 'csv' not in formats:
+        os.remove(csv_path)
+    
+    write_conflict_report(conflicts, directory_output, pattern)
+    if validator is not None:
+        write_validation_report(validator.report(), directory_output, pattern)
+    save_manifest(directory_output, pattern, manifest)
+    
+    logging.info(f"Estadísticas finales para {pattern} (streaming):")
+    logging.info(f"- Archivos procesados: {len(pending)}")
+    logging.info(f"- Total de registros: {total_rows}")
+    return True
+
+def _init_worker(log_queue):
+    """
+    Inicializa un proceso del pool para que envíe sus logs al proceso principal.
+    """
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+
+def _merge_pattern_task(directory_data, directory_output, pattern, index, options):
+    """
+    Combina un patrón dentro de un proceso del pool.
+    """
+    return merge_csv_files(directory_data, directory_output, pattern, index=index, **options)
+
+def _run_parallel(directory_data, directory_output, patterns, workers, index, options):
+    """
+    Reparte los patrones entre un pool de procesos y devuelve {patrón: resultado}.
+
+    Los patrones grandes (LARGE_PATTERN_FILES o más archivos) se combinan en el
+    proceso principal repartiendo la lectura de cada archivo en el mismo pool.
+    """
+    log_queue = multiprocessing.Queue()
+    listener = QueueListener(log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+    listener.start()
+    
+    results = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_queue,)) as executor:
+            large_patterns = [p for p in patterns if len(index.get(p, [])) >= LARGE_PATTERN_FILES]
+            futures = {}
+            for pattern in patterns:
+                if pattern in large_patterns:
+                    continue
+                logging.info(f"Procesando patrón: {pattern}")
+                print(f"Procesando patrón: {pattern}")
+                future = executor.submit(_merge_pattern_task, directory_data, directory_output, pattern,
+                                         {pattern: index.get(pattern, [])}, options)
+                futures[future] = pattern
+            
+            for pattern in large_patterns:
+                logging.info(f"Procesando patrón: {pattern}")
+                print(f"Procesando patrón: {pattern}")
+                results[pattern] = merge_csv_files(directory_data, directory_output, pattern,
+                                                   executor=executor, index=index, **options)
+                print(f"Patrón {'completado' if results[pattern] else 'con errores'}: {pattern}")
+            
+            for future in as_completed(futures):
+                pattern = futures[future]
+                try:
+                    results[pattern] = future.result()
+                except Exception as e:
+                    logging.error(f"Error en el proceso de combinación para '{pattern}': {str(e)}")
+                    results[pattern] = False
+                print(f"Patrón {'completado' if results[pattern] else 'con errores'}: {pattern}")
+    finally:
+        listener.stop()
+    
+    return results
+
+def process_all_patterns(directory_data, directory_output, patterns=None, incremental=False, workers=1,
+                         formats=('csv',), build_store=False, streaming=False, chunksize=STREAM_CHUNKSIZE,
+                         precedence='copy', build_series=False, series_dtype='float32', derived=False,
+                         validate=True, max_gap=MAX_GAP_DAYS):
     """
     Procesa múltiples patrones de archivos CSV.
     
     Args:
         directory_data (str): Directorio donde se encuentran los archivos
         directory_output (str): Directorio donde se guardaran los archivos
-        patterns (list): Lista de patrones a procesar
+        patterns (list): Lista de patrones a procesar; si es None se descubren
+            a partir de los archivos del directorio
+        incremental (bool): Procesar solo archivos nuevos o modificados
+        workers (int): Número de procesos a usar; 1 procesa en serie
+        formats (tuple): Formatos de salida por instrumento
+        build_store (bool): Generar el almacén Parquet consolidado en output/store
+        streaming (bool): Combinar cada patrón por chunks con memoria acotada
+        chunksize (int): Filas por chunk en modo streaming
+        precedence (str): Política de precedencia entre copias de una misma fecha
+        build_series (bool): Generar el almacén NumPy de series en output/series
+        series_dtype (str): Tipo de las columnas numéricas del almacén de series
+        derived (bool): Actualizar las series derivadas de cada patrón
+        validate (bool): Validar cada salida combinada y escribir su reporte de calidad
+        max_gap (int): Días hábiles faltantes seguidos a partir de los cuales se reporta un hueco
     """
     setup_logging()
     logging.info(f"Iniciando procesamiento de múltiples patrones")
     
-    successful_patterns = 0
-    failed_patterns = 0
+    # Fallar antes de procesar si falta pyarrow para las salidas columnares
+    if build_store or any(fmt != 'csv' for fmt in formats):
+        require_pyarrow()
     
-    for pattern in patterns:
-        logging.info(f"Procesando patrón: {pattern}")
-        print(f"Procesando patrón: {pattern}")
-        
-        if merge_csv_files(directory_data, directory_output, pattern):
-            successful_patterns += 1
-        else:
-            failed_patterns += 1
+    # Indexar el directorio una sola vez para todos los patrones
+    index = build_directory_index(directory_data)
+    if patterns is None:
+        patterns = discover_patterns(index)
+        logging.info(f"Patrones descubiertos: {len(patterns)}")
+    else:
+        for file_path in find_unmatched_files(index, patterns):
+            logging.warning(f"Archivo sin patrón configurado: {os.path.basename(file_path)}")
+    
+    # Opciones comunes a la combinación de cada patrón
+    options = {
+        'incremental': incremental,
+        'formats': formats,
+        'streaming': streaming,
+        'chunksize': chunksize,
+        'precedence': precedence,
+        'derived': derived,
+        'validate': validate,
+        'max_gap': max_gap
+    }
+    
+    if workers > 1:
+        logging.info(f"Procesando {len(patterns)} patrones con {workers} procesos")
+        results = _run_parallel(directory_data, directory_output, patterns, workers, index, options)
+    else:
+        results = {}
+        for pattern in patterns:
+            logging.info(f"Procesando patrón: {pattern}")
+            print(f"Procesando patrón: {pattern}")
+            results[pattern] = merge_csv_files(directory_data, directory_output, pattern, index=index, **options)
+    
+    successful_patterns = sum(1 for pattern in patterns if results.get(pattern))
+    failed_patterns = len(patterns) - successful_patterns
+    
+    # Almacenes con todos los instrumentos combinados correctamente
+    if build_store or build_series:
+        frames = {}
+        for pattern in patterns:
+            if results.get(pattern):
+                frames[pattern] = read_output(directory_output, pattern, formats)
+        if build_store:
+            write_consolidated_store(frames, os.path.join(directory_output, STORE_DIRNAME))
+        if build_series:
+            rows = write_series_store(frames, os.path.join(directory_output, SERIES_DIRNAME), series_dtype)
+            logging.info(f"Almacén de series escrito: {rows} filas, {len(frames)} instrumentos")
     
     # Resumen final
     logging.info(f"\nResumen de procesamiento:")
@@ -192,9 +621,45 @@ def process_all_patterns(directory_data, directory_output, patterns):
     print(f"- Patrones fallidos: {failed_patterns}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Combina los archivos CSV históricos por patrón")
+    parser.add_argument('--data', default=r"c:\Users\acer a10\Documents\BITLINK\Repositorios\merge-csv-data\data",
+                        help="Directorio donde se encuentran los archivos")
+    parser.add_argument('--output', default=r"c:\Users\acer a10\Documents\BITLINK\Repositorios\merge-csv-data\output",
+                        help="Directorio donde se guardaran los archivos _TOTAL")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Procesar solo los archivos nuevos o modificados desde la última ejecución")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Número de procesos para combinar patrones en paralelo")
+    parser.add_argument('--format', default='csv', type=parse_formats,
+                        help="Formatos de salida separados por comas: csv, parquet, feather")
+    parser.add_argument('--store', action='store_true',
+                        help="Generar el almacén Parquet consolidado particionado por año en output/store")
+    parser.add_argument('--series', action='store_true',
+                        help="Generar el almacén NumPy compacto de series (fechas int32, columnas float) en output/series")
+    parser.add_argument('--series-dtype', choices=['float32', 'float64'], default='float32',
+                        help="Tipo de las columnas numéricas del almacén de series")
+    parser.add_argument('--derived', action='store_true',
+                        help="Actualizar rendimientos, volatilidad y medias móviles en <patrón>_DERIVED.csv")
+    parser.add_argument('--no-validate', action='store_true',
+                        help="No generar los reportes de calidad en output/validation")
+    parser.add_argument('--max-gap', type=int, default=MAX_GAP_DAYS,
+                        help="Días hábiles faltantes seguidos a partir de los cuales se reporta un hueco")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Combinar por chunks con merge externo para historiales que no caben en memoria")
+    parser.add_argument('--chunksize', type=int, default=STREAM_CHUNKSIZE,
+                        help="Filas por chunk en modo streaming")
+    parser.add_argument('--precedence', choices=PRECEDENCE_POLICIES, default='copy',
+                        help="Copia que gana ante fechas repetidas: copy (mayor (N)), mtime o complete")
+    parser.add_argument('--discover', action='store_true',
+                        help="Descubrir los patrones a partir de los archivos en lugar de usar la lista configurada")
+    parser.add_argument('--metrics', help="Archivo JSON lines donde registrar los tiempos de cada etapa")
+    parser.add_argument('--prometheus', help="Archivo de texto Prometheus con el resumen de las métricas")
+    args = parser.parse_args()
+    metrics.configure(args.metrics, args.prometheus)
+
     # Ejemplo de uso con múltiples patrones
-    directory_data = r"c:\Users\acer a10\Documents\BITLINK\Repositorios\merge-csv-data\data"
-    directory_output = r"c:\Users\acer a10\Documents\BITLINK\Repositorios\merge-csv-data\output"
+    directory_data = args.data
+    directory_output = args.output
     patterns = [       
         "Bovespa Historical Data",
         "XPT_USD Historical Data",
@@ -238,7 +703,14 @@ if __name__ == "__main__":
     ]
     
     try:
-        process_all_patterns(directory_data, directory_output, patterns)
+        process_all_patterns(directory_data, directory_output, None if args.discover else patterns,
+                             incremental=args.incremental, workers=args.workers,
+                             formats=args.format, build_store=args.store,
+                             streaming=args.streaming, chunksize=args.chunksize,
+                             precedence=args.precedence, build_series=args.series,
+                             series_dtype=args.series_dtype, derived=args.derived,
+                             validate=not args.no_validate, max_gap=args.max_gap)
+        metrics.write_prometheus()
         print("\nProceso completado. Revisa el archivo de log para más detalles.")
     except Exception as e:
         print(f"\nError en el proceso principal: {str(e)}")
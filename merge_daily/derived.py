@@ -0,0 +1,166 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Ventanas por defecto de las medias móviles y de la volatilidad (en filas/días hábiles)
+SMA_WINDOWS = (20, 50, 200)
+VOLATILITY_WINDOWS = (20,)
+
+def derived_path(directory_output, pattern):
+    """
+    Devuelve la ruta del archivo de series derivadas de un patrón.
+    """
+    return os.path.join(directory_output, f"{pattern}_DERIVED.csv")
+
+def state_path(directory_output, pattern):
+    """
+    Devuelve la ruta del estado con el que se calculó el archivo de series derivadas.
+    """
+    return os.path.join(directory_output, f"{pattern}_DERIVED.json")
+
+def _rolling(values, window, func):
+    """
+    Aplica func sobre cada ventana completa de `window` valores; las primeras filas quedan en NaN.
+
+    Cada ventana se calcula de forma independiente, por lo que el resultado de
+    una fila no depende de dónde empiece el arreglo recibido.
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = func(sliding_window_view(values, window), axis=1)
+    return out
+
+def compute_features(close, sma_windows=SMA_WINDOWS, volatility_windows=VOLATILITY_WINDOWS):
+    """
+    Calcula las series derivadas de los cierres con operaciones vectorizadas de NumPy.
+
+    Los rendimientos se calculan desde Close y no desde la columna Change%,
+    que viene redondeada a dos decimales en las exportaciones.
+
+    Args:
+        close (numpy.ndarray): Cierres ordenados por fecha ascendente
+        sma_windows (tuple): Ventanas de las medias móviles simples
+        volatility_windows (tuple): Ventanas de la volatilidad (desviación
+            estándar muestral de los rendimientos logarítmicos)
+
+    Returns:
+        dict: {columna: arreglo float64} con Return, LogReturn, VolatilityN y SMAN
+    """
+    close = np.asarray(close, dtype=np.float64)
+    log_return = np.full(len(close), np.nan)
+    simple_return = np.full(len(close), np.nan)
+    if len(close) > 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = close[1:] / close[:-1]
+            log_return[1:] = np.log(ratio)
+        simple_return[1:] = ratio - 1
+
+    features = {'Return': simple_return, 'LogReturn': log_return}
+    for window in volatility_windows:
+        features[f"Volatility{window}"] = _rolling(log_return, window, lambda w, axis: np.std(w, axis=axis, ddof=1))
+    for window in sma_windows:
+        features[f"SMA{window}"] = _rolling(close, window, np.mean)
+
+    # Divisiones por cero o precios no positivos no generan infinitos en la salida
+    for values in features.values():
+        values[~np.isfinite(values)] = np.nan
+    return features
+
+def lookback(sma_windows=SMA_WINDOWS, volatility_windows=VOLATILITY_WINDOWS):
+    """
+    Filas anteriores que hacen falta para recalcular una fila nueva.
+    """
+    return max([w - 1 for w in sma_windows] + [w for w in volatility_windows] + [1])
+
+def _digest(days, close):
+    """
+    Hash de las fechas y cierres con que se calcularon las filas guardadas.
+    """
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(days, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(close, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def _load_state(directory_output, pattern):
+    path = state_path(directory_output, pattern)
+    if not os.path.exists(derived_path(directory_output, pattern)) or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _save_state(directory_output, pattern, state):
+    path = state_path(directory_output, pattern)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+def update_derived(df, directory_output, pattern, sma_windows=SMA_WINDOWS, volatility_windows=VOLATILITY_WINDOWS):
+    """
+    Actualiza el archivo de series derivadas de un patrón a partir de su salida combinada.
+
+    Si las filas ya guardadas coinciden (fechas y cierres) con el inicio de la
+    serie combinada, solo se calculan las fechas nuevas usando las últimas
+    `lookback` filas como ventana y se agregan al final del archivo. Si la
+    historia cambió (correcciones, copias que reemplazan fechas antiguas) o
+    cambiaron las ventanas, el archivo se recalcula completo.
+
+    Args:
+        df (pandas.DataFrame): Salida combinada con 'Date' y 'Close'
+        directory_output (str): Directorio de salida
+        pattern (str): Patrón base de los archivos
+        sma_windows (tuple): Ventanas de las medias móviles
+        volatility_windows (tuple): Ventanas de la volatilidad
+
+    Returns:
+        int: Filas calculadas y escritas (0 si no había fechas nuevas)
+    """
+    series = df[['Date', 'Close']].dropna(subset=['Date'])
+    series = series.assign(Date=pd.to_datetime(series['Date'])).sort_values('Date', kind='mergesort')
+    days = series['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    close = pd.to_numeric(series['Close'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    config = {'sma_windows': list(sma_windows), 'volatility_windows': list(volatility_windows)}
+
+    state = _load_state(directory_output, pattern)
+    start = 0
+    if state is not None and state.get('config') == config and state['rows'] <= len(days):
+        if _digest(days[:state['rows']], close[:state['rows']]) == state['digest']:
+            start = state['rows']
+        else:
+            logging.info(f"La historia de '{pattern}' cambió, se recalculan todas las series derivadas")
+
+    if state is not None and start == len(days) and start > 0:
+        return 0
+
+    # Solo se recalculan las filas nuevas más la ventana previa que necesitan
+    first = max(0, start - lookback(sma_windows, volatility_windows))
+    features = compute_features(close[first:], sma_windows, volatility_windows)
+
+    out = pd.DataFrame({'Date': series['Date'].iloc[start:].dt.strftime('%Y-%m-%d').to_numpy(),
+                        'Close': close[start:]})
+    for name, values in features.items():
+        out[name] = values[start - first:]
+
+    path = derived_path(directory_output, pattern)
+    if start:
+        out.to_csv(path, mode='a', header=False, index=False)
+    else:
+        tmp = f"{path}.tmp"
+        out.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+    _save_state(directory_output, pattern, {
+        'rows': len(days),
+        'last_date': out['Date'].iloc[-1] if len(out) else None,
+        'digest': _digest(days, close),
+        'config': config
+    })
+    logging.info(f"Series derivadas de '{pattern}': {len(out)} filas {'agregadas' if start else 'calculadas'}")
+    return len(out)
@@ -0,0 +1,166 @@
+import os
+import json
+import hashlib
+import logging
+import pandas as pd
+
+# Directorio (dentro de la carpeta de salida) donde se guardan los manifiestos
+MANIFEST_DIRNAME = '.manifest'
+
+def manifest_path(directory_output, pattern):
+    """
+    Devuelve la ruta del manifiesto asociado a un patrón.
+
+    Args:
+        directory_output (str): Directorio donde se guardan los archivos _TOTAL
+        pattern (str): Patrón base de los archivos
+
+    Returns:
+        str: Ruta del archivo JSON del manifiesto
+    """
+    return os.path.join(directory_output, MANIFEST_DIRNAME, f"{pattern}.json")
+
+def load_manifest(directory_output, pattern):
+    """
+    Carga el manifiesto de un patrón. Si no existe o está corrupto devuelve uno vacío.
+
+    Args:
+        directory_output (str): Directorio donde se guardan los archivos _TOTAL
+        pattern (str): Patrón base de los archivos
+
+    Returns:
+        dict: Manifiesto con la llave 'files' indexada por nombre de archivo
+    """
+    path = manifest_path(directory_output, pattern)
+    empty = {'pattern': pattern, 'files': {}}
+
+    if not os.path.exists(path):
+        return empty
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest.setdefault('files', {})
+        return manifest
+    except (OSError, ValueError) as e:
+        logging.warning(f"Manifiesto inválido para '{pattern}', se reconstruirá: {str(e)}")
+        return empty
+
+def save_manifest(directory_output, pattern, manifest):
+    """
+    Guarda el manifiesto de forma atómica (archivo temporal + reemplazo).
+
+    Args:
+        directory_output (str): Directorio donde se guardan los archivos _TOTAL
+        pattern (str): Patrón base de los archivos
+        manifest (dict): Manifiesto a guardar
+    """
+    path = manifest_path(directory_output, pattern)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def file_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo leyendo por bloques.
+
+    Args:
+        file_path (str): Ruta del archivo
+        chunk_size (int): Tamaño de cada bloque leído
+
+    Returns:
+        str: Hash hexadecimal del contenido
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def classify_files(csv_files, manifest):
+    """
+    Clasifica los archivos encontrados comparándolos con el manifiesto.
+
+    Un archivo se considera sin cambios si coincide tamaño y mtime; si solo
+    coincide el tamaño se compara el hash del contenido antes de reprocesarlo.
+
+    Args:
+        csv_files (list): Rutas de los archivos CSV del patrón
+        manifest (dict): Manifiesto cargado con load_manifest
+
+    Returns:
+        tuple: (pendientes, sin_cambios, eliminados) donde pendientes es una
+               lista de tuplas (ruta, hash) de archivos nuevos o modificados
+    """
+    known = manifest.get('files', {})
+    pending = []
+    unchanged = []
+
+    for file_path in csv_files:
+        name = os.path.basename(file_path)
+        stat = os.stat(file_path)
+        entry = known.get(name)
+
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime:
+            unchanged.append(file_path)
+            continue
+
+        digest = file_hash(file_path)
+        if entry and entry.get('sha256') == digest:
+            # Mismo contenido con otra fecha de modificación: solo se actualiza el mtime
+            entry['mtime'] = stat.st_mtime
+            unchanged.append(file_path)
+            continue
+
+        pending.append((file_path, digest))
+
+    current_names = {os.path.basename(file_path) for file_path in csv_files}
+    removed = sorted(name for name in known if name not in current_names)
+
+    return pending, unchanged, removed
+
+def record_file(manifest, file_path, digest, df):
+    """
+    Registra en el manifiesto un archivo procesado junto con su rango de fechas.
+
+    Args:
+        manifest (dict): Manifiesto a actualizar
+        file_path (str): Ruta del archivo procesado
+        digest (str): Hash SHA-256 del contenido
+        df (pandas.DataFrame): DataFrame estandarizado del archivo
+    """
+    dates = pd.to_datetime(df['Date'], errors='coerce').dropna()
+
+    record_file_stats(
+        manifest, file_path, digest,
+        rows=len(df),
+        date_min=dates.min().strftime('%Y-%m-%d') if not dates.empty else None,
+        date_max=dates.max().strftime('%Y-%m-%d') if not dates.empty else None
+    )
+
+def record_file_stats(manifest, file_path, digest, rows, date_min, date_max):
+    """
+    Registra en el manifiesto un archivo procesado a partir de estadísticas ya calculadas.
+
+    Args:
+        manifest (dict): Manifiesto a actualizar
+        file_path (str): Ruta del archivo procesado
+        digest (str): Hash SHA-256 del contenido
+        rows (int): Filas leídas del archivo
+        date_min (str): Fecha mínima (YYYY-MM-DD) o None
+        date_max (str): Fecha máxima (YYYY-MM-DD) o None
+    """
+    stat = os.stat(file_path)
+
+    manifest.setdefault('files', {})[os.path.basename(file_path)] = {
+        'path': file_path,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'sha256': digest,
+        'date_min': date_min,
+        'date_max': date_max,
+        'rows': rows
+    }
@@ -0,0 +1,316 @@
+import csv
+import numpy as np
+import pandas as pd
+
+# Mapeo de columnas según especificaciones
+COLUMN_MAPPING = {
+    'Fecha': 'Date',
+    'Date': 'Date',
+    'Último': 'Close',
+    'Ultimo': 'Close',
+    'Price': 'Close',
+    'Close': 'Close',
+    'Cierre': 'Close',
+    'Apertura': 'Open',
+    'Open': 'Open',
+    'Máximo': 'High',
+    'High': 'High',
+    'Mínimo': 'Low',
+    'Low': 'Low',
+    'Vol.': 'Volume',
+    'Volume': 'Volume',
+    '% var.': 'Change%',
+    'Change %': 'Change%',
+    'Change%': 'Change%'
+}
+
+# Formato de fecha de las exportaciones de investing.com según el idioma
+DATE_FORMATS = {
+    'en': '%m/%d/%Y',
+    'es': '%d.%m.%Y'
+}
+
+# Formato de las salidas _TOTAL y de los segmentos compactados
+ISO_DATE_FORMAT = '%Y-%m-%d'
+
+# Separadores de miles y decimales según el idioma de la exportación de investing.com
+LOCALE_SEPARATORS = {
+    'en': {'thousands': ',', 'decimal': '.'},
+    'es': {'thousands': '.', 'decimal': ','}
+}
+
+# Encabezados que solo aparecen en las exportaciones de es.investing.com
+SPANISH_HEADERS = {'Fecha', 'Último', 'Ultimo', 'Cierre', 'Apertura', 'Máximo', 'Mínimo', '% var.'}
+
+# Columnas estandarizadas que contienen números
+PRICE_COLUMNS = ['Close', 'Open', 'High', 'Low']
+PERCENT_COLUMNS = ['Change%']
+VOLUME_COLUMNS = ['Volume']
+
+# Potencias de 10 de los sufijos de volumen ("350K", "1.2M", "3B")
+VOLUME_SUFFIXES = {'K': 3, 'M': 6, 'B': 9}
+
+def detect_locale(columns):
+    """
+    Detecta el idioma de la exportación a partir de los encabezados originales.
+
+    Args:
+        columns (list): Encabezados del archivo antes de renombrar
+
+    Returns:
+        str: 'es' para exportaciones en español, 'en' en otro caso
+    """
+    return 'es' if SPANISH_HEADERS.intersection(columns) else 'en'
+
+def parse_numeric_column(series, locale='en'):
+    """
+    Convierte una columna de texto como "4,401.75" o "0.74%" a float64.
+
+    La conversión es vectorizada sobre toda la columna; los valores vacíos o
+    no numéricos quedan como NaN.
+
+    Args:
+        series (pandas.Series): Columna a convertir
+        locale (str): Idioma de la exportación ('en' o 'es')
+
+    Returns:
+        pandas.Series: Columna en float64
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+
+    return pd.to_numeric(_normalize_numeric(series, locale), errors='coerce').astype('float64')
+
+def _normalize_numeric(series, locale):
+    """
+    Quita separadores de miles y "%" y deja el punto como separador decimal.
+    """
+    separators = LOCALE_SEPARATORS[locale]
+    values = series.astype('string').str.strip()
+    values = values.str.replace(separators['thousands'], '', regex=False)
+    values = values.str.replace(separators['decimal'], '.', regex=False)
+    return values.str.replace('%', '', regex=False)
+
+def parse_volume_column(series, locale='en'):
+    """
+    Convierte una columna de volumen como "1.2M" o "350K" a float64 expandiendo el sufijo.
+
+    El resultado se redondea a los decimales exactos del valor expandido
+    ("2.01K" tiene 2 decimales, 2010 tiene 0), para que sea el mismo float que
+    se obtiene al volver a leer "2010.0" de una salida _TOTAL.
+
+    Args:
+        series (pandas.Series): Columna a convertir
+        locale (str): Idioma de la exportación ('en' o 'es')
+
+    Returns:
+        pandas.Series: Columna en float64
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+
+    values = series.astype('string').str.strip().str.upper()
+    suffix = values.str[-1]
+    exponent = np.zeros(len(values), dtype=np.int64)
+    for letter, power in VOLUME_SUFFIXES.items():
+        exponent[(suffix == letter).fillna(False).to_numpy(dtype=bool)] = power
+    has_suffix = exponent > 0
+    values = _normalize_numeric(values.where(~has_suffix, values.str[:-1]), locale)
+
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    scaled = numbers * 10.0 ** exponent
+    decimals = values.str.extract(r'\.(\d+)$', expand=False).str.len().fillna(0).to_numpy(dtype=np.int64)
+    digits = np.maximum(decimals - exponent, 0)
+    for n in np.unique(digits[has_suffix]):
+        mask = has_suffix & (digits == n)
+        scaled[mask] = np.round(scaled[mask], int(n))
+
+    return pd.Series(scaled, index=series.index, dtype='float64')
+
+def parse_numeric_columns(df, locale='en'):
+    """
+    Convierte a float64 todas las columnas numéricas estandarizadas presentes en el DataFrame.
+
+    Args:
+        df (pandas.DataFrame): DataFrame con columnas ya renombradas
+        locale (str): Idioma de la exportación ('en' o 'es')
+
+    Returns:
+        pandas.DataFrame: El mismo DataFrame con las columnas convertidas
+    """
+    for col in PRICE_COLUMNS + PERCENT_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_numeric_column(df[col], locale)
+
+    for col in VOLUME_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_volume_column(df[col], locale)
+
+    return df
+
+def sniff_header(file_path):
+    """
+    Lee solo la primera línea del archivo y devuelve sus encabezados originales.
+
+    Args:
+        file_path (str): Ruta del archivo CSV
+
+    Returns:
+        list: Encabezados sin BOM ni comillas
+    """
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        return next(csv.reader(f), [])
+
+def select_engine():
+    """
+    Elige el lector de CSV: pyarrow si está instalado (multihilo), si no el motor C de pandas.
+
+    Returns:
+        str: 'pyarrow' o 'c'
+    """
+    try:
+        import pyarrow.csv  # noqa: F401
+        return 'pyarrow'
+    except ImportError:
+        return 'c'
+
+def parse_date_column(series, locale='en'):
+    """
+    Convierte una columna de fechas de texto a datetime64 con el formato del idioma.
+
+    Los valores que no siguen el formato esperado se reintentan con inferencia
+    para no perder filas de exportaciones con un formato distinto.
+
+    Args:
+        series (pandas.Series): Fechas como texto
+        locale (str): Idioma de la exportación ('en' o 'es')
+
+    Returns:
+        pandas.Series: Columna datetime64; NaT para valores vacíos o inválidos
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    values = series.astype('string').str.strip()
+    dates = pd.to_datetime(values, format=DATE_FORMATS[locale], errors='coerce')
+
+    # Archivos ya estandarizados (_TOTAL, segmentos) usan fechas ISO
+    if dates.isna().all() and values.notna().any():
+        dates = pd.to_datetime(values, format=ISO_DATE_FORMAT, errors='coerce')
+
+    unparsed = dates.isna() & values.notna() & (values != '')
+    if unparsed.any():
+        dates[unparsed] = pd.to_datetime(values[unparsed], format='mixed', dayfirst=locale == 'es', errors='coerce')
+    return dates
+
+def _arrow_float(column, locale):
+    """
+    Convierte una columna de texto de pyarrow a float64 quitando separadores y '%'.
+
+    Raises:
+        pyarrow.ArrowInvalid: Si algún valor no es numérico
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    separators = LOCALE_SEPARATORS[locale]
+    values = pc.utf8_trim_whitespace(column)
+    values = pc.replace_substring(values, separators['thousands'], '')
+    values = pc.replace_substring(values, separators['decimal'], '.')
+    values = pc.replace_substring(values, '%', '')
+    return pc.cast(values, pa.float64())
+
+def _read_pyarrow(file_path, columns, locale):
+    """
+    Lee el archivo con pyarrow (multihilo) todo como texto, sin inferencia de tipos,
+    y convierte precios, porcentajes y fechas con las funciones vectorizadas de pyarrow.
+
+    Las columnas con valores que no se pueden convertir quedan como texto para
+    que parse_numeric_columns y parse_date_column las traten con coerción.
+    """
+    from pyarrow import csv as pa_csv
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    convert_options = pa_csv.ConvertOptions(
+        column_types={col: pa.string() for col in columns},
+        strings_can_be_null=True
+    )
+    table = pa_csv.read_csv(file_path, convert_options=convert_options)
+
+    for i, name in enumerate(table.column_names):
+        target = COLUMN_MAPPING.get(name)
+        column = table.column(i)
+        if target == 'Date':
+            trimmed = pc.utf8_trim_whitespace(column)
+            for date_format in (DATE_FORMATS[locale], ISO_DATE_FORMAT):
+                converted = pc.strptime(trimmed, format=date_format, unit='us', error_is_null=True)
+                if converted.null_count == column.null_count:
+                    break
+            else:
+                continue
+        elif target in PRICE_COLUMNS + PERCENT_COLUMNS:
+            try:
+                converted = _arrow_float(column, locale)
+            except pa.ArrowInvalid:
+                continue
+        else:
+            continue
+        table = table.set_column(i, name, converted)
+
+    return table.to_pandas()
+
+def _read_c(file_path, columns, locale):
+    """
+    Lee el archivo con el motor C de pandas: precios como float64 con los separadores
+    del idioma y el resto como texto.
+    """
+    separators = LOCALE_SEPARATORS[locale]
+    dtype = {col: str for col in columns}
+    prices = {col: 'float64' for col in columns if COLUMN_MAPPING.get(col) in PRICE_COLUMNS}
+    try:
+        return pd.read_csv(file_path, dtype={**dtype, **prices}, encoding='utf-8-sig',
+                           thousands=separators['thousands'], decimal=separators['decimal'])
+    except ValueError:
+        # Algún precio no es numérico: leer todo como texto y convertir con coerción
+        return pd.read_csv(file_path, dtype=dtype, encoding='utf-8-sig')
+
+def read_export(file_path, engine=None, chunksize=None):
+    """
+    Lee una exportación de investing.com con el esquema y el formato de fecha de su idioma.
+
+    Primero lee el encabezado para detectar el idioma y la columna de fecha
+    ('Date' o 'Fecha'); luego lee sin inferencia de tipos y convierte la fecha
+    con el formato conocido. Los encabezados se devuelven sin renombrar.
+
+    Args:
+        file_path (str): Ruta del archivo CSV
+        engine (str): 'pyarrow' o 'c'; por defecto el resultado de select_engine
+        chunksize (int): Si se indica, devuelve un generador de bloques de filas
+            (siempre con el motor C, pyarrow no lee por cantidad de filas)
+
+    Returns:
+        tuple: (DataFrame o generador de DataFrames, idioma)
+    """
+    columns = sniff_header(file_path)
+    locale = detect_locale(columns)
+    date_columns = [col for col in columns if COLUMN_MAPPING.get(col) == 'Date']
+
+    if chunksize:
+        def chunks():
+            dtype = {col: str for col in columns}
+            with pd.read_csv(file_path, dtype=dtype, encoding='utf-8-sig', chunksize=chunksize) as reader:
+                for chunk in reader:
+                    for col in date_columns:
+                        chunk[col] = parse_date_column(chunk[col], locale)
+                    yield chunk
+        return chunks(), locale
+
+    if (engine or select_engine()) == 'pyarrow':
+        df = _read_pyarrow(file_path, columns, locale)
+    else:
+        df = _read_c(file_path, columns, locale)
+
+    for col in date_columns:
+        df[col] = parse_date_column(df[col], locale)
+    return df, locale
@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import logging
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from columnar_store import find_newest_output, read_columnar, READ_PREFERENCE
+from csv_merger import read_and_standardize_csv
+
+# Tamaño máximo por defecto de la caché de instrumentos
+DEFAULT_CACHE_BYTES = 256 * 2**20
+
+# Salidas combinadas: "<patrón>_TOTAL.<csv|parquet|feather>"
+OUTPUT_REGEX = re.compile(r"^(?P<pattern>.+)_TOTAL\.(?:csv|parquet|feather)$")
+
+class SeriesCache:
+    """
+    Caché LRU de las salidas combinadas, con límite de memoria en bytes.
+
+    Cada instrumento se guarda completo y ordenado por fecha ascendente; las
+    consultas cortan la ventana pedida con búsqueda binaria sobre las fechas.
+    Antes de responder se compara el tamaño y el mtime de la salida más reciente
+    en disco (entre todos los formatos): si merge_csv_files la reescribió, la
+    entrada se descarta y se vuelve a leer.
+    """
+
+    def __init__(self, directory_output, max_bytes=DEFAULT_CACHE_BYTES, formats=READ_PREFERENCE):
+        self.directory_output = directory_output
+        self.max_bytes = max_bytes
+        self.formats = tuple(formats)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def instruments(self):
+        """
+        Lista los instrumentos con salida combinada en el directorio.
+        """
+        names = set()
+        for name in os.listdir(self.directory_output):
+            match = OUTPUT_REGEX.match(name)
+            if match:
+                names.add(match.group('pattern'))
+        return sorted(names)
+
+    def _load(self, pattern, fmt, path):
+        """
+        Lee la salida de un instrumento y la deja ordenada por fecha ascendente.
+        """
+        df = read_and_standardize_csv(path) if fmt == 'csv' else read_columnar(path, fmt)
+        df['Date'] = pd.to_datetime(df['Date'])
+        return df.dropna(subset=['Date']).sort_values('Date', kind='mergesort').reset_index(drop=True)
+
+    def _evict(self):
+        """
+        Descarta los instrumentos usados hace más tiempo hasta respetar el límite de memoria.
+        """
+        while self._bytes > self.max_bytes and self._entries:
+            pattern, entry = self._entries.popitem(last=False)
+            self._bytes -= entry['bytes']
+            logging.info(f"Caché: se descarta {pattern} ({entry['bytes']} bytes)")
+
+    def get(self, pattern):
+        """
+        Devuelve la serie completa de un instrumento desde la caché o desde disco.
+
+        Returns:
+            pandas.DataFrame: Datos ordenados por fecha ascendente
+
+        Raises:
+            KeyError: Si el instrumento no tiene salida combinada
+        """
+        return self._fetch(pattern)[0]
+
+    def _fetch(self, pattern):
+        """
+        Devuelve (DataFrame, fechas como arreglo datetime64) de un instrumento.
+        """
+        fmt, path = find_newest_output(self.directory_output, pattern, self.formats)
+        if fmt is None:
+            raise KeyError(f"Instrumento sin salida combinada: {pattern}")
+        stat = os.stat(path)
+        version = (path, stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            entry = self._entries.get(pattern)
+            if entry is not None and entry['version'] == version:
+                self._entries.move_to_end(pattern)
+                self.hits += 1
+                return entry['df'], entry['dates']
+            if entry is not None:
+                del self._entries[pattern]
+                self._bytes -= entry['bytes']
+            self.misses += 1
+
+        # La lectura se hace fuera del lock para no bloquear las consultas que sí están en caché
+        df = self._load(pattern, fmt, path)
+        dates = df['Date'].to_numpy()
+        size = int(df.memory_usage(index=True, deep=True).sum())
+
+        with self._lock:
+            if size <= self.max_bytes:
+                previous = self._entries.pop(pattern, None)
+                if previous is not None:
+                    self._bytes -= previous['bytes']
+                self._entries[pattern] = {'version': version, 'df': df, 'dates': dates, 'bytes': size}
+                self._bytes += size
+                self._evict()
+        return df, dates
+
+    def window(self, pattern, start=None, end=None, columns=None):
+        """
+        Devuelve las filas de un instrumento entre start y end (inclusive).
+
+        Args:
+            pattern (str): Instrumento (patrón de la salida combinada)
+            start (str): Fecha inicial (YYYY-MM-DD); None desde el principio
+            end (str): Fecha final (YYYY-MM-DD); None hasta el final
+            columns (list): Columnas además de Date; None devuelve todas
+
+        Returns:
+            pandas.DataFrame: Filas de la ventana ordenadas por fecha ascendente
+        """
+        df, dates = self._fetch(pattern)
+        first = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left'))
+        last = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right'))
+        selected = ['Date'] + [c for c in (columns or df.columns) if c != 'Date']
+        missing = [c for c in selected if c not in df.columns]
+        if missing:
+            raise KeyError(f"Columnas inexistentes en {pattern}: {missing}")
+        return df.iloc[first:max(first, last)][selected]
+
+    def stats(self):
+        """
+        Estado de la caché: instrumentos cargados, bytes usados, aciertos y fallos.
+        """
+        with self._lock:
+            return {
+                'instruments': list(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+def query(cache, instruments, start=None, end=None, columns=None):
+    """
+    Consulta una ventana de fechas de varios instrumentos.
+
+    Args:
+        cache (SeriesCache): Caché sobre el directorio de salidas combinadas
+        instruments (list): Instrumentos a consultar
+        start (str): Fecha inicial (YYYY-MM-DD)
+        end (str): Fecha final (YYYY-MM-DD)
+        columns (list): Columnas además de Date; None devuelve todas
+
+    Returns:
+        pandas.DataFrame: Filas con columna Instrument, ordenadas por (Instrument, Date)
+    """
+    frames = []
+    for pattern in instruments:
+        part = cache.window(pattern, start, end, columns)
+        frames.append(part.assign(Instrument=pattern))
+    if not frames:
+        return pd.DataFrame(columns=['Instrument', 'Date'] + list(columns or []))
+    df = pd.concat(frames, ignore_index=True)
+    return df[['Instrument'] + [c for c in df.columns if c != 'Instrument']]
+
+def _split(values):
+    """
+    Une los parámetros repetidos o separados por comas de la URL en una lista.
+    """
+    items = []
+    for value in values or []:
+        items.extend(v.strip() for v in value.split(',') if v.strip())
+    return items
+
+def make_handler(cache):
+    """
+    Crea el manejador HTTP de las consultas sobre una caché.
+
+    Rutas:
+        GET /instruments  Lista de instrumentos disponibles
+        GET /query?instruments=A,B&start=YYYY-MM-DD&end=YYYY-MM-DD&columns=Close,Open[&format=csv]
+        GET /stats        Estado de la caché
+    """
+    class QueryHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type='application/json'):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _error(self, status, message):
+            self._send(status, json.dumps({'error': message}, ensure_ascii=False))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+
+            if url.path == '/instruments':
+                return self._send(200, json.dumps(cache.instruments(), ensure_ascii=False))
+            if url.path == '/stats':
+                return self._send(200, json.dumps(cache.stats(), ensure_ascii=False))
+            if url.path != '/query':
+                return self._error(404, f"Ruta no encontrada: {url.path}")
+
+            instruments = _split(params.get('instruments'))
+            if not instruments:
+                return self._error(400, "Falta el parámetro instruments")
+            start = params.get('start', [None])[0]
+            end = params.get('end', [None])[0]
+            columns = _split(params.get('columns')) or None
+
+            try:
+                df = query(cache, instruments, start, end, columns)
+            except KeyError as e:
+                return self._error(404, str(e.args[0]))
+            except ValueError as e:
+                return self._error(400, str(e))
+
+            df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+            if params.get('format', ['json'])[0] == 'csv':
+                return self._send(200, df.to_csv(index=False), 'text/csv')
+            return self._send(200, df.to_json(orient='records', force_ascii=False))
+
+        def log_message(self, format, *args):
+            logging.info(f"{self.address_string()} - {format % args}")
+
+    return QueryHandler
+
+def serve(directory_output, host='127.0.0.1', port=8765, max_bytes=DEFAULT_CACHE_BYTES):
+    """
+    Inicia el servidor HTTP de consultas (bloqueante).
+    """
+    cache = SeriesCache(directory_output, max_bytes)
+    server = ThreadingHTTPServer((host, port), make_handler(cache))
+    print(f"Sirviendo consultas de {directory_output} en http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor HTTP de consultas sobre las salidas combinadas")
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output'),
+                        help="Directorio con los archivos _TOTAL")
+    parser.add_argument('--host', default='127.0.0.1', help="Dirección de escucha")
+    parser.add_argument('--port', type=int, default=8765, help="Puerto de escucha")
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_BYTES // 2**20,
+                        help="Memoria máxima de la caché en MB")
+    args = parser.parse_args()
+    serve(args.output, args.host, args.port, args.cache_mb * 2**20)
@@ -0,0 +1,116 @@
+import os
+import re
+import hashlib
+
+# Subdirectorio del directorio de datos donde se guardan los segmentos compactados
+SEGMENTS_DIRNAME = 'segments'
+
+# Número de copia asignado a los segmentos: menor que el de cualquier exportación,
+# así las descargas nuevas siempre tienen prioridad sobre los datos compactados
+SEGMENT_COPY = -1
+
+# Nombre de segmento: "<año>_<inicio>_<fin>-<hash>.csv" o "tail_<inicio>_<fin>-<hash>.csv"
+SEGMENT_REGEX = re.compile(
+    r"^(?P<kind>\d{4}|tail)_(?P<start>\d{4}-\d{2}-\d{2})_(?P<end>\d{4}-\d{2}-\d{2})-(?P<digest>[0-9a-f]{8})\.csv$"
+)
+
+def segment_dir(directory_data, pattern):
+    """
+    Devuelve el directorio de segmentos de un patrón.
+    """
+    return os.path.join(directory_data, SEGMENTS_DIRNAME, pattern)
+
+def is_segment(file_path):
+    """
+    Indica si la ruta es un segmento compactado y no una exportación original.
+    """
+    parent = os.path.dirname(os.path.dirname(os.path.abspath(file_path)))
+    return os.path.basename(parent) == SEGMENTS_DIRNAME and bool(SEGMENT_REGEX.match(os.path.basename(file_path)))
+
+def list_segments(directory_data):
+    """
+    Lista los segmentos de todos los patrones del directorio de datos.
+
+    Args:
+        directory_data (str): Directorio de las exportaciones
+
+    Returns:
+        dict: {patrón: [rutas de segmentos ordenadas por fecha]}
+    """
+    root = os.path.join(directory_data, SEGMENTS_DIRNAME)
+    if not os.path.isdir(root):
+        return {}
+
+    segments = {}
+    with os.scandir(root) as patterns:
+        for pattern in patterns:
+            if not pattern.is_dir():
+                continue
+            paths = []
+            with os.scandir(pattern.path) as entries:
+                for entry in entries:
+                    match = SEGMENT_REGEX.match(entry.name)
+                    if entry.is_file() and match:
+                        paths.append((match.group('start'), entry.path))
+            if paths:
+                segments[pattern.name] = [path for _, path in sorted(paths)]
+    return segments
+
+def split_segments(df):
+    """
+    Divide la serie combinada de un patrón en segmentos anuales que no se solapan.
+
+    Cada año completo anterior al de la fecha más reciente es un segmento
+    sellado; el año en curso forma el segmento "tail", el único que cambia
+    cuando llegan descargas nuevas.
+
+    Args:
+        df (pandas.DataFrame): Datos combinados sin fechas repetidas
+
+    Returns:
+        list: Tuplas (tipo, DataFrame) donde tipo es el año ('2019') o 'tail',
+              cada DataFrame ordenado por fecha ascendente
+    """
+    df = df.dropna(subset=['Date']).sort_values('Date', kind='mergesort').reset_index(drop=True)
+    if df.empty:
+        return []
+
+    years = df['Date'].dt.year
+    last_year = years.iloc[-1]
+    segments = []
+    for year, part in df.groupby(years, sort=True):
+        kind = 'tail' if year == last_year else str(year)
+        segments.append((kind, part.reset_index(drop=True)))
+    return segments
+
+def render_segment(kind, df):
+    """
+    Genera el nombre y el contenido CSV de un segmento.
+
+    El nombre incluye el rango de fechas y un hash del contenido: un segmento
+    nunca se modifica, si sus datos cambian se escribe otro con otro nombre.
+
+    Returns:
+        tuple: (nombre de archivo, contenido en bytes)
+    """
+    out = df.copy()
+    out['Date'] = out['Date'].dt.strftime('%Y-%m-%d')
+    content = out.to_csv(index=False).encode('utf-8')
+    digest = hashlib.sha256(content).hexdigest()[:8]
+    name = f"{kind}_{out['Date'].iloc[0]}_{out['Date'].iloc[-1]}-{digest}.csv"
+    return name, content
+
+def write_segment(directory, name, content):
+    """
+    Escribe un segmento de forma atómica (archivo temporal y luego reemplazo).
+
+    Returns:
+        str: Ruta del segmento
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,164 @@
+import os
+import csv
+import heapq
+import shutil
+import logging
+import tempfile
+import itertools
+import pandas as pd
+from conflicts import group_conflicts
+
+# Orden canónico de las columnas en la salida
+CANONICAL_COLUMNS = ['Date', 'Close', 'Open', 'High', 'Low', 'Volume', 'Change%']
+
+# Máximo de runs abiertos a la vez durante el merge k-way
+MAX_OPEN_RUNS = 128
+
+# Filas de la salida que se acumulan antes de pasarlas al validador
+VALIDATION_BLOCK = 50000
+
+def _write_run(chunk, columns, run_path, priority):
+    """
+    Escribe un chunk ya estandarizado como run ordenado por fecha descendente y sin fechas repetidas.
+
+    La primera columna del run es la prioridad de su archivo de origen.
+    """
+    chunk = chunk.dropna(subset=['Date'])
+    chunk = chunk.drop_duplicates(subset=['Date'], keep='first')
+    chunk = chunk.sort_values('Date', ascending=False, kind='mergesort')
+
+    run = chunk.reindex(columns=columns)
+    run.insert(0, '_priority', priority)
+    run.to_csv(run_path, header=False, index=False, date_format='%Y-%m-%d')
+
+def _read_run(run_path):
+    """
+    Recorre un run devolviendo (fecha, -prioridad, fila) para el merge k-way.
+    """
+    with open(run_path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            yield row[1], -int(row[0]), row
+
+def _merge_runs(run_paths, output_file):
+    """
+    Combina runs intermedios conservando todas las filas y su prioridad.
+
+    Las fechas repetidas se resuelven solo en el nivel final, donde cada grupo
+    de fechas iguales se evalúa completo.
+    """
+    streams = [_read_run(path) for path in run_paths]
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        for _, _, row in heapq.merge(*streams, reverse=True):
+            writer.writerow(row)
+
+def _merge_final(run_paths, output_file, columns, precedence, sources, validator=None):
+    """
+    Combina los runs finales escribiendo una fila por fecha.
+
+    Las filas de una misma fecha llegan consecutivas y ordenadas por prioridad;
+    con 'complete' gana la que tenga menos valores vacíos. Si se recibe un
+    validador, las filas escritas se le pasan por bloques en la misma pasada.
+
+    Returns:
+        tuple: (filas escritas, registros del reporte de conflictos)
+    """
+    streams = [_read_run(path) for path in run_paths]
+    merged = heapq.merge(*streams, reverse=True)
+    value_columns = columns[1:]
+    written = 0
+    report = []
+    block = []
+
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(columns)
+        for date, group in itertools.groupby(merged, key=lambda item: item[0]):
+            rows = [(-neg_priority, row[2:]) for _, neg_priority, row in group]
+            if precedence == 'complete' and len(rows) > 1:
+                rows.sort(key=lambda item: (sum(1 for v in item[1] if v == ''), item[0]))
+            writer.writerow([date] + rows[0][1])
+            written += 1
+            if len(rows) > 1:
+                report.extend(group_conflicts(date, rows, value_columns, sources))
+            if validator is not None:
+                block.append([date] + rows[0][1])
+                if len(block) >= VALIDATION_BLOCK:
+                    validator.update(pd.DataFrame(block, columns=columns))
+                    block = []
+
+    if validator is not None:
+        if block:
+            validator.update(pd.DataFrame(block, columns=columns))
+        validator.add_conflicts(report)
+
+    return written, report
+
+def stream_merge(sources, read_chunks, output_path, columns=None, tmp_dir=None, max_open_runs=MAX_OPEN_RUNS,
+                 precedence='copy', validator=None):
+    """
+    Combina archivos por fecha con memoria acotada mediante runs ordenados y merge k-way externo.
+
+    Cada archivo se lee por chunks; cada chunk se ordena y se escribe como run
+    temporal. Los runs se combinan en uno o varios niveles (como máximo
+    max_open_runs abiertos a la vez) y las fechas repetidas se eliminan al
+    escribir la salida. Ante fechas repetidas gana el archivo que aparece
+    primero en sources (o la fila más completa con precedence='complete'), igual
+    que conflicts.resolve_duplicates en el modo en memoria.
+
+    Args:
+        sources (list): Rutas de los archivos en orden de prioridad
+        read_chunks (callable): Función que recibe una ruta y devuelve un iterador
+            de DataFrames estandarizados con 'Date' como datetime
+        output_path (str): Ruta del CSV combinado
+        columns (list): Columnas de salida; por defecto CANONICAL_COLUMNS
+        tmp_dir (str): Directorio para los runs temporales
+        max_open_runs (int): Máximo de runs abiertos por nivel de merge
+        precedence (str): Política de precedencia ('copy', 'mtime' o 'complete')
+        validator (validation.QualityValidator): Validador que recibe las filas de la salida
+
+    Returns:
+        tuple: (filas escritas, {ruta: {'rows', 'date_min', 'date_max'}}, registros
+               del reporte de conflictos)
+    """
+    columns = columns or CANONICAL_COLUMNS
+    work_dir = tempfile.mkdtemp(prefix='stream_merge_', dir=tmp_dir)
+    stats = {}
+
+    try:
+        runs = []
+        source_names = [os.path.basename(file_path) for file_path in sources]
+        for priority, file_path in enumerate(sources):
+            file_stats = {'rows': 0, 'date_min': None, 'date_max': None}
+            for chunk in read_chunks(file_path):
+                run_path = os.path.join(work_dir, f"run_{len(runs):06d}.csv")
+                _write_run(chunk, columns, run_path, priority)
+                runs.append(run_path)
+                file_stats['rows'] += len(chunk)
+
+                dates = chunk['Date'].dropna()
+                if not dates.empty:
+                    low, high = dates.min().strftime('%Y-%m-%d'), dates.max().strftime('%Y-%m-%d')
+                    file_stats['date_min'] = min(filter(None, [file_stats['date_min'], low]))
+                    file_stats['date_max'] = max(filter(None, [file_stats['date_max'], high]))
+            stats[file_path] = file_stats
+
+        # Merge por niveles: cada fila conserva la prioridad de su archivo
+        level = 0
+        while len(runs) > max_open_runs:
+            merged = []
+            for start in range(0, len(runs), max_open_runs):
+                merged_path = os.path.join(work_dir, f"level{level}_{len(merged):06d}.csv")
+                _merge_runs(runs[start:start + max_open_runs], merged_path)
+                merged.append(merged_path)
+            logging.info(f"Merge externo nivel {level}: {len(runs)} runs -> {len(merged)}")
+            runs = merged
+            level += 1
+
+        tmp_output = f"{output_path}.tmp"
+        written, report = _merge_final(runs, tmp_output, columns, precedence, source_names, validator)
+        os.replace(tmp_output, output_path)
+        return written, stats, report
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,320 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+# Las fechas se guardan como días desde esta época en int32
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+# Columnas numéricas de las series, en el orden de las salidas _TOTAL
+SERIES_COLUMNS = ['Close', 'Open', 'High', 'Low', 'Volume', 'Change%']
+
+# Nombre del almacén de series dentro del directorio de salida
+SERIES_DIRNAME = 'series'
+
+# Índice del almacén: instrumento -> [inicio, fin) dentro de los arreglos concatenados
+INDEX_FILENAME = 'index.json'
+
+def to_days(dates):
+    """
+    Convierte fechas a días desde EPOCH en int32.
+
+    Args:
+        dates: Fechas (Series, DatetimeIndex, arreglo datetime64 o texto)
+
+    Returns:
+        numpy.ndarray: Días en int32
+    """
+    values = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[D]')
+    return (values - EPOCH).astype(np.int32)
+
+def from_days(days):
+    """
+    Convierte días desde EPOCH a datetime64[D].
+    """
+    return EPOCH + np.asarray(days, dtype='timedelta64[D]')
+
+def _day(value):
+    """
+    Convierte una fecha opcional a día desde EPOCH para búsquedas binarias.
+    """
+    if value is None:
+        return None
+    return int((np.datetime64(pd.Timestamp(value).date(), 'D') - EPOCH).astype(np.int32))
+
+def _bounds(days, start=None, end=None):
+    """
+    Posiciones [inicio, fin) de las fechas entre start y end (inclusive) en un arreglo ordenado.
+    """
+    first = 0 if start is None else int(np.searchsorted(days, _day(start), side='left'))
+    last = len(days) if end is None else int(np.searchsorted(days, _day(end), side='right'))
+    return first, max(first, last)
+
+class TimeSeries:
+    """
+    Serie de un instrumento: fechas en int32 y una columna float por campo.
+
+    Las fechas están ordenadas de forma ascendente y sin repetir. Los arreglos
+    pueden ser vistas de un almacén mapeado en memoria, por lo que window y
+    las lecturas no copian datos.
+    """
+
+    def __init__(self, name, days, values):
+        self.name = name
+        self.days = days
+        self.values = values
+
+    @classmethod
+    def from_frame(cls, name, df, dtype='float32'):
+        """
+        Crea la serie a partir de una salida combinada (columnas Date, Close, ...).
+
+        Args:
+            name (str): Nombre del instrumento
+            df (pandas.DataFrame): Datos combinados con 'Date'
+            dtype (str): 'float32' o 'float64' para las columnas numéricas
+
+        Returns:
+            TimeSeries: Serie ordenada por fecha; las columnas ausentes quedan en NaN
+        """
+        df = df.dropna(subset=['Date'])
+        days = to_days(df['Date'])
+        order = np.argsort(days, kind='stable')
+        days = days[order]
+
+        # Si hay fechas repetidas se conserva la primera aparición, como en drop_duplicates
+        keep = np.ones(len(days), dtype=bool)
+        keep[1:] = days[1:] != days[:-1]
+        order = order[keep]
+
+        values = {}
+        for col in SERIES_COLUMNS:
+            if col in df.columns:
+                column = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=dtype, na_value=np.nan)
+                values[col] = column[order]
+            else:
+                values[col] = np.full(len(order), np.nan, dtype=dtype)
+        return cls(name, days[keep], values)
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def dates(self):
+        """
+        Fechas como datetime64[D].
+        """
+        return from_days(self.days)
+
+    @property
+    def nbytes(self):
+        """
+        Bytes ocupados por las fechas y las columnas.
+        """
+        return self.days.nbytes + sum(v.nbytes for v in self.values.values())
+
+    def window(self, start=None, end=None):
+        """
+        Devuelve la serie entre start y end (inclusive) como vistas, sin copiar.
+
+        Args:
+            start (str): Fecha inicial (YYYY-MM-DD); None desde el principio
+            end (str): Fecha final (YYYY-MM-DD); None hasta el final
+
+        Returns:
+            TimeSeries: Serie con vistas de los arreglos originales
+        """
+        first, last = _bounds(self.days, start, end)
+        return TimeSeries(self.name, self.days[first:last],
+                          {col: values[first:last] for col, values in self.values.items()})
+
+    def to_frame(self, columns=None):
+        """
+        Convierte la serie a DataFrame con 'Date' como datetime64.
+
+        Args:
+            columns (list): Columnas a incluir; None incluye todas
+
+        Returns:
+            pandas.DataFrame: Datos de la serie
+        """
+        data = {'Date': pd.to_datetime(self.dates)}
+        for col in columns or SERIES_COLUMNS:
+            data[col] = self.values[col]
+        return pd.DataFrame(data)
+
+class Panel:
+    """
+    Columnas de varios instrumentos alineadas sobre un mismo eje de fechas.
+
+    Cada columna es una matriz (fechas × instrumentos), así que una ventana de
+    fechas o la serie de un instrumento son vistas de la matriz. El panel se
+    arma una vez con build (que sí copia) y se puede guardar y volver a abrir
+    mapeado en memoria.
+    """
+
+    def __init__(self, names, days, values):
+        self.names = list(names)
+        self.days = days
+        self.values = values
+        self._positions = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def build(cls, series, columns=('Close',), how='inner'):
+        """
+        Alinea varias series sobre sus fechas comunes o sobre la unión de fechas.
+
+        Args:
+            series (list): Objetos TimeSeries
+            columns (tuple): Columnas a incluir en el panel
+            how (str): 'inner' (fechas presentes en todas las series) u
+                'outer' (todas las fechas, NaN donde falte el instrumento)
+
+        Returns:
+            Panel: Panel alineado
+        """
+        if how not in ('inner', 'outer'):
+            raise ValueError(f"how debe ser 'inner' u 'outer': {how}")
+
+        days = None
+        for s in series:
+            if days is None:
+                days = s.days
+            elif how == 'inner':
+                days = np.intersect1d(days, s.days, assume_unique=True)
+            else:
+                days = np.union1d(days, s.days)
+        days = np.asarray(days if days is not None else [], dtype=np.int32)
+
+        values = {}
+        for col in columns:
+            dtype = np.result_type(*[s.values[col].dtype for s in series]) if series else np.float32
+            matrix = np.full((len(days), len(series)), np.nan, dtype=dtype)
+            for i, s in enumerate(series):
+                positions = np.searchsorted(days, s.days)
+                found = positions < len(days)
+                found[found] = days[positions[found]] == s.days[found]
+                matrix[positions[found], i] = s.values[col][found]
+            values[col] = matrix
+        return cls([s.name for s in series], days, values)
+
+    @property
+    def dates(self):
+        return from_days(self.days)
+
+    def column(self, col, start=None, end=None):
+        """
+        Matriz (fechas × instrumentos) de una columna entre start y end, como vista.
+        """
+        first, last = _bounds(self.days, start, end)
+        return self.values[col][first:last]
+
+    def instrument(self, name, col='Close', start=None, end=None):
+        """
+        Valores de un instrumento entre start y end, como vista de la matriz.
+        """
+        return self.column(col, start, end)[:, self._positions[name]]
+
+    def to_frame(self, col='Close', start=None, end=None):
+        """
+        DataFrame con una columna por instrumento e índice de fechas.
+        """
+        first, last = _bounds(self.days, start, end)
+        return pd.DataFrame(self.values[col][first:last], columns=self.names,
+                            index=pd.to_datetime(from_days(self.days[first:last])))
+
+    def save(self, directory):
+        """
+        Guarda el panel en un directorio (.npy por columna), reemplazando el anterior.
+        """
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'days.npy'), self.days)
+        for col, matrix in self.values.items():
+            np.save(os.path.join(tmp_dir, f"{col}.npy"), matrix)
+        with open(os.path.join(tmp_dir, INDEX_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump({'names': self.names, 'columns': list(self.values)}, f, ensure_ascii=False)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Abre un panel guardado; con mmap las matrices se leen bajo demanda del disco.
+        """
+        mode = 'r' if mmap else None
+        with open(os.path.join(directory, INDEX_FILENAME), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        days = np.load(os.path.join(directory, 'days.npy'), mmap_mode=mode)
+        values = {col: np.load(os.path.join(directory, f"{col}.npy"), mmap_mode=mode) for col in index['columns']}
+        return cls(index['names'], days, values)
+
+def write_series_store(frames, store_dir, dtype='float32'):
+    """
+    Escribe las series de todos los instrumentos en un almacén NumPy compacto.
+
+    Las series se concatenan en un arreglo por columna (days.npy, Close.npy, ...)
+    y index.json guarda el tramo [inicio, fin) de cada instrumento, de modo que
+    al abrirlo mapeado cada serie es una vista de esos arreglos. El almacén se
+    genera en un directorio temporal y luego reemplaza al anterior.
+
+    Args:
+        frames (dict): {instrumento: DataFrame combinado}
+        store_dir (str): Directorio del almacén
+        dtype (str): 'float32' o 'float64' para las columnas numéricas
+
+    Returns:
+        int: Total de filas escritas
+    """
+    series = [TimeSeries.from_frame(name, df, dtype) for name, df in sorted(frames.items())]
+
+    index = {}
+    offset = 0
+    for s in series:
+        index[s.name] = [offset, offset + len(s)]
+        offset += len(s)
+
+    tmp_dir = f"{store_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    days = np.concatenate([s.days for s in series]) if series else np.empty(0, dtype=np.int32)
+    np.save(os.path.join(tmp_dir, 'days.npy'), days.astype(np.int32))
+    for col in SERIES_COLUMNS:
+        values = np.concatenate([s.values[col] for s in series]) if series else np.empty(0, dtype=dtype)
+        np.save(os.path.join(tmp_dir, f"{col}.npy"), values)
+    with open(os.path.join(tmp_dir, INDEX_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return offset
+
+def load_series_store(store_dir, names=None, mmap=True):
+    """
+    Abre el almacén de series.
+
+    Args:
+        store_dir (str): Directorio del almacén
+        names (list): Instrumentos a cargar; None carga todos
+        mmap (bool): Mapear los arreglos en memoria en lugar de leerlos completos
+
+    Returns:
+        dict: {instrumento: TimeSeries} con vistas de los arreglos del almacén
+    """
+    mode = 'r' if mmap else None
+    with open(os.path.join(store_dir, INDEX_FILENAME), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+
+    days = np.load(os.path.join(store_dir, 'days.npy'), mmap_mode=mode)
+    columns = {col: np.load(os.path.join(store_dir, f"{col}.npy"), mmap_mode=mode) for col in SERIES_COLUMNS}
+
+    series = {}
+    for name in names or index:
+        if name not in index:
+            raise KeyError(f"Instrumento no encontrado en el almacén de series: {name}")
+        start, end = index[name]
+        series[name] = TimeSeries(name, days[start:end], {col: values[start:end] for col, values in columns.items()})
+    return series
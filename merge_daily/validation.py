@@ -0,0 +1,179 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+# Subdirectorio de la salida donde se guardan los reportes de calidad
+VALIDATION_DIRNAME = 'validation'
+
+# Columnas de precio que se validan
+PRICE_COLUMNS = ['Close', 'Open', 'High', 'Low']
+
+# Días hábiles faltantes seguidos a partir de los cuales se reporta un hueco
+MAX_GAP_DAYS = 5
+
+# Un día de la semana forma parte del calendario si tiene al menos esta fracción
+# de las filas del día con más datos
+WEEKDAY_MIN_SHARE = 0.1
+
+# Máximo de fechas de ejemplo por chequeo en el reporte
+SAMPLE_SIZE = 100
+
+# Instrumentos que pueden cotizar en negativo (rendimientos de bonos): solo se reportan los ceros
+NEGATIVE_ALLOWED_KEYWORDS = ('Yield',)
+
+# Chequeos por fila, en el orden en que aparecen en el reporte
+ROW_CHECKS = ('high_below_low', 'nonpositive_price', 'close_outside_range')
+
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+class QualityValidator:
+    """
+    Valida la serie combinada de un patrón en una sola pasada sobre los datos ya cargados.
+
+    update recibe bloques de filas (el DataFrame completo en la combinación en
+    memoria o bloques de la escritura en streaming) y evalúa todos los
+    chequeos por fila con operaciones vectorizadas. Entre bloques solo se
+    conservan los contadores, las fechas de ejemplo y las fechas en int32 para
+    calcular al final los huecos contra el calendario del instrumento.
+    """
+
+    def __init__(self, pattern, max_gap=MAX_GAP_DAYS, sample_size=SAMPLE_SIZE):
+        self.pattern = pattern
+        self.max_gap = max_gap
+        self.sample_size = sample_size
+        self.rows = 0
+        self._counts = {check: 0 for check in ROW_CHECKS}
+        self._samples = {check: [] for check in ROW_CHECKS}
+        self._days = []
+        self._conflict_dates = set()
+        self._allow_negative = any(keyword in pattern for keyword in NEGATIVE_ALLOWED_KEYWORDS)
+
+    def _column(self, df, col):
+        if col not in df.columns:
+            return np.full(len(df), np.nan)
+        return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def update(self, df):
+        """
+        Evalúa un bloque de filas con columnas estandarizadas (Date, Close, Open, High, Low).
+        """
+        dates = pd.to_datetime(df['Date'], errors='coerce').to_numpy(dtype='datetime64[D]')
+        valid = ~np.isnat(dates)
+        close, open_, high, low = (self._column(df, col) for col in PRICE_COLUMNS)
+        prices = np.column_stack([close, open_, high, low])
+
+        # Las comparaciones con NaN son falsas: los valores vacíos no se reportan
+        with np.errstate(invalid='ignore'):
+            nonpositive = ((prices == 0) if self._allow_negative else (prices <= 0)).any(axis=1)
+            masks = {
+                'high_below_low': high < low,
+                'nonpositive_price': nonpositive,
+                # Un cero de relleno en High/Low ya se reporta arriba; no se cuenta dos veces
+                'close_outside_range': ((close > high) | (close < low)) & ~nonpositive
+            }
+
+        for check, mask in masks.items():
+            mask &= valid
+            self._counts[check] += int(mask.sum())
+            room = self.sample_size - len(self._samples[check])
+            if room > 0 and mask.any():
+                self._samples[check].extend(str(d) for d in dates[mask][:room])
+
+        self.rows += int(valid.sum())
+        self._days.append(dates[valid].astype(np.int64).astype(np.int32))
+
+    def add_conflicts(self, report):
+        """
+        Registra las fechas repetidas con valores distintos (reporte de conflictos de la combinación).
+
+        Args:
+            report: DataFrame de conflicts.resolve_duplicates o lista de registros del streaming
+        """
+        if report is None or len(report) == 0:
+            return
+        dates = report['Date'] if isinstance(report, pd.DataFrame) else [r['Date'] for r in report]
+        self._conflict_dates.update(pd.to_datetime(pd.Series(dates)).dt.strftime('%Y-%m-%d'))
+
+    def _gaps(self, days):
+        """
+        Infiere el calendario del instrumento y devuelve (máscara semanal, huecos).
+        """
+        if len(days) < 2:
+            return '1111100', []
+
+        # 1970-01-01 fue jueves: (días + 3) % 7 da 0 = lunes
+        counts = np.bincount((days + 3) % 7, minlength=7)
+        weekmask = counts >= WEEKDAY_MIN_SHARE * counts.max()
+        mask = ''.join('1' if trading else '0' for trading in weekmask)
+
+        dates = days.astype('datetime64[D]')
+        missing = np.busday_count(dates[:-1] + 1, dates[1:], weekmask=mask)
+        positions = np.flatnonzero(missing > self.max_gap)
+        gaps = [{'after': str(dates[i]), 'before': str(dates[i + 1]), 'missing_days': int(missing[i])}
+                for i in positions]
+        return mask, gaps
+
+    def report(self):
+        """
+        Genera el reporte de calidad del patrón.
+
+        Returns:
+            dict: Reporte serializable a JSON con un resumen por chequeo
+        """
+        days = np.unique(np.concatenate(self._days)) if self._days else np.empty(0, dtype=np.int32)
+        weekmask, gaps = self._gaps(days)
+        conflict_dates = sorted(self._conflict_dates)
+
+        checks = {}
+        for check in ROW_CHECKS:
+            checks[check] = {'count': self._counts[check], 'dates': self._samples[check]}
+        checks['conflicting_duplicates'] = {'count': len(conflict_dates), 'dates': conflict_dates[:self.sample_size]}
+        checks['gaps'] = {
+            'count': len(gaps),
+            'max_gap': self.max_gap,
+            'largest': max((g['missing_days'] for g in gaps), default=0),
+            'gaps': sorted(gaps, key=lambda g: -g['missing_days'])[:self.sample_size]
+        }
+
+        return {
+            'pattern': self.pattern,
+            'rows': self.rows,
+            'date_min': str(days[0].astype('datetime64[D]')) if len(days) else None,
+            'date_max': str(days[-1].astype('datetime64[D]')) if len(days) else None,
+            'calendar': [name for name, flag in zip(WEEKDAY_NAMES, weekmask) if flag == '1'],
+            'checks': checks,
+            'ok': all(check['count'] == 0 for check in checks.values())
+        }
+
+def validate_dataframe(df, pattern, conflicts=None, max_gap=MAX_GAP_DAYS):
+    """
+    Valida un DataFrame combinado completo.
+
+    Returns:
+        dict: Reporte de calidad
+    """
+    validator = QualityValidator(pattern, max_gap)
+    validator.update(df)
+    validator.add_conflicts(conflicts)
+    return validator.report()
+
+def write_validation_report(report, directory_output, pattern):
+    """
+    Guarda el reporte de calidad del patrón en output/validation/<patrón>_validation.json.
+
+    Returns:
+        str: Ruta del reporte
+    """
+    path = os.path.join(directory_output, VALIDATION_DIRNAME, f"{pattern}_validation.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+    if not report['ok']:
+        issues = ', '.join(f"{name}={check['count']}" for name, check in report['checks'].items() if check['count'])
+        logging.warning(f"Problemas de calidad en '{pattern}': {issues}, ver {path}")
+    return path
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# Variables de entorno con la configuración, para que la hereden los procesos hijos
+METRICS_ENV = 'ETL_METRICS_FILE'
+PROMETHEUS_ENV = 'ETL_METRICS_PROMETHEUS'
+
+_lock = threading.Lock()
+
+def configure(path=None, prometheus=None):
+    """
+    Activa el registro de métricas en un archivo JSON lines.
+
+    Args:
+        path (str): Archivo JSON lines donde se agregan las mediciones; None las desactiva
+        prometheus (str): Archivo de texto en formato Prometheus que se genera con
+            write_prometheus al terminar la ejecución
+    """
+    for env, value in ((METRICS_ENV, path), (PROMETHEUS_ENV, prometheus)):
+        if value:
+            os.environ[env] = os.path.abspath(value)
+        else:
+            os.environ.pop(env, None)
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+def enabled():
+    return bool(os.environ.get(METRICS_ENV))
+
+def record(stage, key=None, seconds=None, rows=None, bytes=None, status='ok', **labels):
+    """
+    Agrega una medición al archivo de métricas si está activado.
+
+    Args:
+        stage (str): Etapa medida ('browser_start', 'page_load', 'parse', ...)
+        key (str): Endpoint, patrón o indicador al que corresponde
+        seconds (float): Duración de la etapa
+        rows (int): Filas procesadas
+        bytes (int): Bytes leídos o escritos
+        status (str): 'ok' o 'error'
+    """
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return
+
+    entry = {
+        'ts': datetime.now().isoformat(timespec='milliseconds'),
+        'stage': stage,
+        'key': key,
+        'seconds': round(seconds, 6) if seconds is not None else None,
+        'rows': rows,
+        'bytes': bytes,
+        'status': status,
+        'pid': os.getpid()
+    }
+    entry.update(labels)
+    line = json.dumps(entry, ensure_ascii=False) + '\n'
+
+    # Una sola escritura en modo append por línea: los procesos del pool pueden escribir a la vez
+    with _lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+@contextmanager
+def timer(stage, key=None, **labels):
+    """
+    Mide la duración de un bloque y la registra con record.
+
+    El bloque recibe un dict donde puede anotar 'rows' y 'bytes'. Si el bloque
+    lanza una excepción la medición se registra con status 'error'.
+    """
+    measurement = {'rows': None, 'bytes': None}
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield measurement
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        record(stage, key, time.perf_counter() - start, measurement['rows'], measurement['bytes'], status, **labels)
+
+def file_size(path):
+    """
+    Tamaño de un archivo en bytes o None si no existe.
+    """
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def write_prometheus(path=None, output=None):
+    """
+    Resume el archivo JSON lines en un archivo de texto con formato Prometheus.
+
+    Por etapa y clave genera etl_stage_seconds_total, etl_stage_runs_total,
+    etl_stage_errors_total, etl_rows_total y etl_bytes_total.
+
+    Returns:
+        str: Ruta del archivo generado o None si no hay métricas
+    """
+    path = path or os.environ.get(METRICS_ENV)
+    output = output or os.environ.get(PROMETHEUS_ENV)
+    if not path or not output or not os.path.exists(path):
+        return None
+
+    totals = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            labels = (entry['stage'], entry.get('key') or '')
+            total = totals.setdefault(labels, {'seconds': 0.0, 'runs': 0, 'errors': 0, 'rows': 0, 'bytes': 0})
+            total['seconds'] += entry.get('seconds') or 0.0
+            total['runs'] += 1
+            total['errors'] += entry.get('status') == 'error'
+            total['rows'] += entry.get('rows') or 0
+            total['bytes'] += entry.get('bytes') or 0
+
+    metrics = [
+        ('etl_stage_seconds_total', 'seconds', 'Tiempo total por etapa en segundos'),
+        ('etl_stage_runs_total', 'runs', 'Ejecuciones por etapa'),
+        ('etl_stage_errors_total', 'errors', 'Ejecuciones con error por etapa'),
+        ('etl_rows_total', 'rows', 'Filas procesadas por etapa'),
+        ('etl_bytes_total', 'bytes', 'Bytes procesados por etapa')
+    ]
+    lines = []
+    for name, field, description in metrics:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for (stage, key), total in sorted(totals.items()):
+            lines.append(f'{name}{{stage="{_escape(stage)}",key="{_escape(key)}"}} {total[field]:g}')
+
+    tmp = f"{output}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp, output)
+    return output
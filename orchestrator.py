@@ -0,0 +1,452 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Los módulos de cada etapa se importan por nombre desde su carpeta, igual que
+# cuando cada script se ejecuta por separado
+for _subdir in ('data_daily', 'data_different_daily', 'merge_daily'):
+    _path = os.path.join(ROOT_DIR, _subdir)
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+import metrics
+
+# Etapas del pipeline
+STAGES = ('download', 'merge', 'scrape', 'clean')
+
+# Huella de las entradas de cada tarea ejecutada con éxito
+STATE_FILENAME = '.orchestrator_state.json'
+
+class Task:
+    """
+    Tarea del DAG.
+
+    `run` se ejecuta sin argumentos cuando terminaron todas las tareas de `deps`.
+    `inputs` devuelve los archivos de entrada: si su huella no cambió desde la
+    última ejecución exitosa y existen todos los archivos de `outputs`, la tarea
+    se omite. Si `inputs` no devuelve archivos no hay nada que procesar y la
+    tarea también se omite. Las tareas sin `inputs` (las que leen de la web)
+    siempre se ejecutan.
+    """
+
+    def __init__(self, name, run, deps=(), inputs=None, outputs=None):
+        self.name = name
+        self.run = run
+        self.deps = list(deps)
+        self.inputs = inputs
+        self.outputs = outputs
+
+def fingerprint(paths):
+    """
+    Huella de un conjunto de archivos a partir de su ruta, tamaño y fecha de modificación.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, ROOT_DIR)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+        except FileNotFoundError:
+            digest.update(f"{os.path.relpath(path, ROOT_DIR)}|missing\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def validate_dag(tasks):
+    """
+    Verifica que todas las dependencias existan y que no haya ciclos.
+
+    Raises:
+        ValueError: Si una dependencia no existe o el grafo tiene un ciclo
+    """
+    for task in tasks.values():
+        for dep in task.deps:
+            if dep not in tasks:
+                raise ValueError(f"La tarea '{task.name}' depende de '{dep}', que no existe")
+
+    pending = {name: len(task.deps) for name, task in tasks.items()}
+    dependents = {name: [] for name in tasks}
+    for task in tasks.values():
+        for dep in task.deps:
+            dependents[dep].append(task.name)
+
+    ready = [name for name, count in pending.items() if count == 0]
+    visited = 0
+    while ready:
+        name = ready.pop()
+        visited += 1
+        for dependent in dependents[name]:
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                ready.append(dependent)
+
+    if visited != len(tasks):
+        cycle = sorted(name for name, count in pending.items() if count > 0)
+        raise ValueError(f"El grafo de tareas tiene un ciclo entre: {cycle}")
+
+def _load_state(state_path):
+    if state_path and os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def _save_state(state_path, state):
+    if not state_path:
+        return
+    tmp = f"{state_path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, state_path)
+
+def run_dag(tasks, workers=8, state_path=None, force=False):
+    """
+    Ejecuta las tareas respetando sus dependencias.
+
+    Cada tarea se lanza en cuanto terminan sus dependencias, sin esperar al
+    resto de su etapa; las tareas independientes corren en paralelo. Si una
+    tarea falla, las que dependen de ella quedan bloqueadas.
+
+    Args:
+        tasks (list): Tareas del DAG
+        workers (int): Tareas en ejecución simultánea
+        state_path (str): Archivo con las huellas de la última ejecución
+        force (bool): Ejecutar aunque las entradas no hayan cambiado
+
+    Returns:
+        dict: Estado de cada tarea: 'ok', 'skipped', 'failed' o 'blocked'
+    """
+    tasks = {task.name: task for task in tasks}
+    validate_dag(tasks)
+    state = _load_state(state_path)
+
+    status = {}
+    pending = {name: set(task.deps) for name, task in tasks.items()}
+    dependents = {name: [] for name in tasks}
+    for task in tasks.values():
+        for dep in task.deps:
+            dependents[dep].append(task.name)
+    ready = deque(sorted(name for name, deps in pending.items() if not deps))
+
+    def finish(name, result):
+        status[name] = result
+        for dependent in dependents[name]:
+            pending[dependent].discard(name)
+            if not pending[dependent]:
+                ready.append(dependent)
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while ready or running:
+            while ready:
+                name = ready.popleft()
+                task = tasks[name]
+
+                if any(status[dep] in ('failed', 'blocked') for dep in task.deps):
+                    print(f"[{name}] Bloqueada por una dependencia fallida")
+                    finish(name, 'blocked')
+                    continue
+
+                inputs = task.inputs() if task.inputs is not None else None
+                if inputs is not None and not inputs:
+                    print(f"[{name}] Sin archivos de entrada, se omite")
+                    finish(name, 'skipped')
+                    continue
+
+                digest = fingerprint(inputs) if inputs is not None else None
+                outputs_exist = task.outputs is None or all(os.path.exists(path) for path in task.outputs())
+                if digest is not None and not force and outputs_exist and state.get(name) == digest:
+                    print(f"[{name}] Sin cambios en las entradas, se omite")
+                    finish(name, 'skipped')
+                    continue
+
+                print(f"[{name}] Iniciando")
+                running[executor.submit(_timed, task)] = (name, digest)
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, digest = running.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[{name}] Error: {e}")
+                    state.pop(name, None)
+                    finish(name, 'failed')
+                else:
+                    print(f"[{name}] Completada")
+                    if digest is not None:
+                        state[name] = digest
+                    finish(name, 'ok')
+                _save_state(state_path, state)
+
+    return status
+
+def _timed(task):
+    """
+    Ejecuta una tarea registrando su duración total como etapa 'task'.
+    """
+    with metrics.timer('task', task.name):
+        return task.run()
+
+def _run_merge(cpu_pool, directory_data, directory_output, pattern, index):
+    """
+    Combina un patrón en el pool de procesos y falla si la combinación falló.
+    Sin archivos de entrada no hay nada que combinar.
+    """
+    from csv_merger import merge_csv_files
+
+    if not index.get(pattern):
+        return
+
+    os.makedirs(directory_output, exist_ok=True)
+    result = cpu_pool.submit(merge_csv_files, directory_data, directory_output, pattern,
+                             incremental=True, index=index).result()
+    if result is False:
+        raise RuntimeError(f"No se pudo combinar '{pattern}'")
+
+def download_index(endpoint):
+    """
+    Índice para csv_merger con las ventanas descargadas de un endpoint.
+
+    Cada archivo <download_id>_<año>.csv se trata como una copia cuyo número
+    es la fecha inicial de la ventana (AAAAMMDD), de modo que ante fechas
+    repetidas gana la ventana más reciente. El resto de una ventana truncada
+    (<download_id>_<AAAAMMDD>.csv) queda ordenado por su fecha inicial.
+    """
+    regex = re.compile(rf"^{re.escape(endpoint['download_id'])}_(\d{{4}}|\d{{8}})\.csv$")
+    files = []
+    if os.path.isdir(endpoint['destino']):
+        with os.scandir(endpoint['destino']) as entries:
+            for entry in entries:
+                match = regex.match(entry.name)
+                if match and entry.is_file():
+                    inicio = match.group(1)
+                    files.append((int(inicio) * 10000 + 101 if len(inicio) == 4 else int(inicio), entry.path))
+    return {endpoint['download_id']: sorted(files)}
+
+class SeleniumFallback:
+    """
+    Navegador compartido por las tareas de scraping para las URLs que no se
+    pueden obtener por HTTP. Se inicia en el primer uso y se usa de a una tarea.
+    """
+
+    def __init__(self, download_dir, chrome_driver_path, user_data_dir, profile_dir, liviano=True):
+        self.args = (download_dir, chrome_driver_path, user_data_dir, profile_dir, liviano)
+        self.driver = None
+        self._lock = threading.Lock()
+
+    def scrape(self, url, detener):
+        from scrape_investing import configurar_driver, scrape_table
+
+        with self._lock:
+            if self.driver is None:
+                self.driver = configurar_driver(*self.args)
+            return scrape_table(self.driver, url, detener=detener)
+
+    def cerrar(self):
+        if self.driver is not None:
+            self.driver.quit()
+            self.driver = None
+
+def build_tasks(args, stages, cpu_pool, resources):
+    """
+    Arma las tareas del pipeline para las etapas seleccionadas.
+
+    - download:<TIPO>/<ID> descarga las ventanas pendientes de un endpoint de EndPoint.csv
+    - merge:<TIPO>/<ID> combina las ventanas de ese endpoint en cuanto terminan sus descargas
+    - merge:<patrón> combina las exportaciones de merge_daily/data
+    - scrape:<slug> descarga la tabla de un indicador
+    - clean:<slug> limpia el indicador en cuanto termina su descarga
+
+    `resources` recibe los objetos compartidos que hay que cerrar al terminar.
+    """
+    tasks = []
+
+    if 'download' in stages or 'merge' in stages:
+        import pandas as pd
+        from bot import construir_endpoints
+
+        endpoints = construir_endpoints(pd.read_csv(args.endpoints), args.descargas)
+
+        if 'download' in stages:
+            from bot import configurar_driver, descargar_tarea, descargar_endpoints
+            from functools import partial
+            from backfill_planner import BackfillPlanner
+            from download_scheduler import DownloadScheduler
+
+            perfiles = args.perfil or [(os.path.join(ROOT_DIR, 'data_daily', '.chrome', 'sesion_0'), 'Default')]
+            crear_drivers = [
+                partial(configurar_driver, chrome_driver_path=args.chromedriver, user_data_dir=user_data_dir, profile_dir=profile_dir,
+                        liviano=not args.navegador_completo)
+                for user_data_dir, profile_dir in perfiles
+            ]
+            planner = BackfillPlanner(os.path.join(args.descargas, "backfill_state.json"), args.tiempo)
+            scheduler = DownloadScheduler(crear_drivers, descargar_tarea, args.descargas, args.intervalo_host)
+            resources.append(scheduler)
+
+            for clave, endpoint in endpoints.items():
+                tasks.append(Task(
+                    f"download:{clave}",
+                    partial(descargar_endpoints, {clave: endpoint}, planner, scheduler, args.modo)
+                ))
+
+        if 'merge' in stages:
+            from columnar_store import output_path
+
+            for clave, endpoint in endpoints.items():
+                tipo = clave.split('/')[0]
+                directory_output = os.path.join(args.merge_output, tipo)
+
+                def index(endpoint=endpoint):
+                    return download_index(endpoint)
+
+                tasks.append(Task(
+                    f"merge:{clave}",
+                    lambda endpoint=endpoint, directory_output=directory_output, index=index: _run_merge(
+                        cpu_pool, endpoint['destino'], directory_output, endpoint['download_id'], index()),
+                    deps=[f"download:{clave}"] if 'download' in stages else [],
+                    inputs=lambda index=index: [path for files in index().values() for _, path in files],
+                    outputs=lambda endpoint=endpoint, directory_output=directory_output: [
+                        output_path(directory_output, endpoint['download_id'])]
+                ))
+
+    if 'merge' in stages and os.path.isdir(args.merge_data):
+        from csv_merger import build_directory_index, discover_patterns
+        from columnar_store import output_path
+
+        data_index = build_directory_index(args.merge_data)
+        for pattern in discover_patterns(data_index):
+            index = {pattern: data_index[pattern]}
+            tasks.append(Task(
+                f"merge:{pattern}",
+                lambda pattern=pattern, index=index: _run_merge(cpu_pool, args.merge_data, args.merge_output, pattern, index),
+                inputs=lambda index=index, pattern=pattern: [path for _, path in index[pattern]],
+                outputs=lambda pattern=pattern: [output_path(args.merge_output, pattern)]
+            ))
+
+    if 'scrape' in stages or 'clean' in stages:
+        from scrape_investing import URLS
+        from clean_data import load_rules, processed_path, clean_file, DEFAULT_RULE
+
+        os.makedirs(args.indicadores, exist_ok=True)
+        os.makedirs(args.clean, exist_ok=True)
+        urls = {url.split('/')[-1]: url for url in URLS}
+        rules = load_rules()
+        slugs = set(urls)
+        if 'clean' in stages:
+            slugs.update(name[:-4] for name in os.listdir(args.indicadores) if name.endswith('.csv'))
+
+        if 'scrape' in stages:
+            from scrape_investing import scrape_url, crear_sesion_http
+
+            fallback = SeleniumFallback(args.indicadores, args.chromedriver,
+                                        os.path.join(ROOT_DIR, 'data_different_daily', '.chrome'), 'Default',
+                                        liviano=not args.navegador_completo)
+            resources.append(fallback)
+
+            def scrape(url, rule):
+                if not scrape_url(url, args.indicadores, args.clean, not args.completo, crear_sesion_http(),
+                                  fallback.scrape, rule):
+                    raise RuntimeError(f"No se pudieron obtener datos para {url}")
+
+            for slug, url in sorted(urls.items()):
+                rule = rules.get(slug, DEFAULT_RULE)
+                tasks.append(Task(f"scrape:{slug}", lambda url=url, rule=rule: scrape(url, rule)))
+
+        if 'clean' in stages:
+            for slug in sorted(slugs):
+                input_file = os.path.join(args.indicadores, f"{slug}.csv")
+                output_file = processed_path(slug, args.clean)
+                rule = rules.get(slug, DEFAULT_RULE)
+                tasks.append(Task(
+                    f"clean:{slug}",
+                    lambda input_file=input_file, output_file=output_file, rule=rule: cpu_pool.submit(
+                        clean_file, input_file, output_file, rule).result(),
+                    deps=[f"scrape:{slug}"] if 'scrape' in stages and slug in urls else [],
+                    inputs=lambda input_file=input_file: [input_file],
+                    outputs=lambda output_file=output_file: [output_file]
+                ))
+
+    return tasks
+
+def run_pipeline(args):
+    """
+    Ejecuta el pipeline completo o las etapas seleccionadas y muestra un resumen.
+
+    Returns:
+        dict: Estado de cada tarea
+    """
+    stages = [stage.strip() for stage in args.etapas.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Etapas no soportadas: {sorted(unknown)}")
+
+    resources = []
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as cpu_pool:
+        try:
+            tasks = build_tasks(args, stages, cpu_pool, resources)
+            print(f"{len(tasks)} tareas en las etapas: {', '.join(stages)}")
+            status = run_dag(tasks, args.hilos, os.path.join(ROOT_DIR, STATE_FILENAME), args.forzar)
+        finally:
+            for resource in resources:
+                resource.cerrar()
+
+    print("\nResumen:")
+    for result in ('ok', 'skipped', 'failed', 'blocked'):
+        names = [name for name, value in status.items() if value == result]
+        print(f"- {result}: {len(names)}")
+        if result in ('failed', 'blocked'):
+            for name in sorted(names):
+                print(f"    {name}")
+    return status
+
+def _root_path(path):
+    return path if os.path.isabs(path) else os.path.join(ROOT_DIR, path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ejecuta el pipeline ETL completo: descargas, combinación, scraping y limpieza")
+    parser.add_argument('--etapas', default=','.join(STAGES),
+                        help="Etapas separadas por comas: download, merge, scrape, clean")
+    parser.add_argument('--modo', choices=('backfill', 'diario'), default='diario',
+                        help="backfill descarga toda la historia; diario solo la ventana que contiene hoy")
+    parser.add_argument('--tiempo', type=int, default=10, help="Años por ventana de descarga")
+    parser.add_argument('--endpoints', default='data_daily/EndPoint.csv', type=_root_path)
+    parser.add_argument('--descargas', default='data_daily/downloads', type=_root_path,
+                        help="Directorio de las descargas diarias (una carpeta por TIPO)")
+    parser.add_argument('--merge-data', default='merge_daily/data', type=_root_path,
+                        help="Directorio con exportaciones a combinar por patrón")
+    parser.add_argument('--merge-output', default='merge_daily/output', type=_root_path,
+                        help="Directorio de los archivos _TOTAL")
+    parser.add_argument('--indicadores', default='data_different_daily/output', type=_root_path,
+                        help="Directorio de las tablas de indicadores")
+    parser.add_argument('--clean', default='data_different_daily/clean_data', type=_root_path,
+                        help="Directorio de los indicadores procesados")
+    parser.add_argument('--chromedriver', default=None,
+                        help="Ruta de chromedriver; por defecto lo resuelve Selenium")
+    parser.add_argument('--perfil', nargs=2, action='append', metavar=('USER_DATA_DIR', 'PROFILE'),
+                        help="Perfil de Chrome para una sesión de descarga; repetir para más sesiones")
+    parser.add_argument('--navegador-completo', action='store_true',
+                        help="Abrir Chrome con ventana y cargando imágenes, fuentes y publicidad")
+    parser.add_argument('--intervalo-host', type=float, default=5.0,
+                        help="Segundos mínimos entre descargas al mismo host")
+    parser.add_argument('--workers', type=int, default=2, help="Procesos para combinar y limpiar")
+    parser.add_argument('--hilos', type=int, default=8, help="Tareas en ejecución simultánea")
+    parser.add_argument('--completo', action='store_true',
+                        help="Descargar la historia completa de los indicadores en lugar de solo lo nuevo")
+    parser.add_argument('--forzar', action='store_true',
+                        help="Ejecutar las tareas aunque sus entradas no hayan cambiado")
+    parser.add_argument('--metrics', help="Archivo JSON lines donde registrar los tiempos de cada etapa")
+    parser.add_argument('--prometheus', help="Archivo de texto Prometheus con el resumen de las métricas")
+    args = parser.parse_args()
+
+    metrics.configure(args.metrics, args.prometheus)
+    status = run_pipeline(args)
+    metrics.write_prometheus()
+    sys.exit(1 if any(value in ('failed', 'blocked') for value in status.values()) else 0)